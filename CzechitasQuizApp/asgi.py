@@ -11,6 +11,7 @@ import os
 
 from django.core.asgi import get_asgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CzechitasQuizApp.settings')
+settings_module = 'CzechitasQuizApp.production' if 'WEBSITE_HOSTNAME' in os.environ else 'CzechitasQuizApp.settings'
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
 
 application = get_asgi_application()
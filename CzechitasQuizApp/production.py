@@ -1,7 +1,9 @@
 import os
 
+from quiz.db_pool import get_pool_options
+
 from .settings import *  # noqa
-from .settings import BASE_DIR
+from .settings import BASE_DIR, TEMPLATES
 
 # Configure the domain name using the environment variable
 # that Azure automatically creates for us.
@@ -9,8 +11,22 @@ ALLOWED_HOSTS = [os.environ['WEBSITE_HOSTNAME']] if 'WEBSITE_HOSTNAME' in os.env
 CSRF_TRUSTED_ORIGINS = ['https://' + os.environ['WEBSITE_HOSTNAME']] if 'WEBSITE_HOSTNAME' in os.environ else []
 DEBUG = True
 
+# The cached template loader is only on by default with DEBUG off, so it is forced on here
+TEMPLATES = [{
+    **TEMPLATES[0],
+    'APP_DIRS': False,
+    'OPTIONS': {
+        **TEMPLATES[0]['OPTIONS'],
+        'loaders': [('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ])],
+    },
+}]
+
 # WhiteNoise configuration
 MIDDLEWARE = [
+    'quiz.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     # Add whitenoise middleware after the security middleware
     'whitenoise.middleware.WhiteNoiseMiddleware',
@@ -20,12 +36,34 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quiz.db_routing.PrimaryPinMiddleware',
 ]
 
 SESSION_ENGINE = "django.contrib.sessions.backends.cache"
+# Sessions, rate limits, admission control, content versions and answer keys need a cache shared by all workers.
+# Without Redis it is kept in the database, in a table created by "manage.py createcachetable".
+if 'REDIS_URL' in os.environ:
+    CACHES = {
+        "default": {
+            "BACKEND": "django_redis.cache.RedisCache",
+            "LOCATION": os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.db.DatabaseCache",
+            "LOCATION": "quiz_cache",
+        }
+    }
+SHARED_CACHE_REQUIRED = True
 STORAGES = {
     "default": {
-        "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
+        # Uploads historically live next to the collected static files; they are served by quiz.views.MediaView
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+        "OPTIONS": {
+            "location": os.path.join(BASE_DIR, 'staticfiles'),
+        },
     },
     "staticfiles": {
         "BACKEND": "whitenoise.storage.CompressedManifestStaticFilesStorage",
@@ -44,8 +82,38 @@ DATABASES = {
         'HOST': conn_str_params['host'],
         'USER': conn_str_params['user'],
         'PASSWORD': conn_str_params['password'],
+        'CONN_HEALTH_CHECKS': True,
     }
 }
+# Each worker process keeps a pool of open connections, sized so that all workers together stay within the
+# connections the server allows. gunicorn.conf.py exports the number of workers it starts as WEB_CONCURRENCY; set it
+# yourself for other servers with more workers, e.g. uvicorn --workers.
+if os.getenv("DATABASE_POOL", "True") == "True":
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {'pool': {
+        **get_pool_options(workers=int(os.getenv("WEB_CONCURRENCY", 1)), threads=int(os.getenv("WEB_THREADS", 4)),
+                           max_connections=int(os.getenv("DATABASE_MAX_CONNECTIONS", 40))),
+        'check': ConnectionPool.check_connection,
+    }}
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv("CONN_MAX_AGE", 600))
+# Optional read replica, given by a connection string of the same form
+if 'AZURE_POSTGRESQL_REPLICA_CONNECTIONSTRING' in os.environ:
+    replica_conn_str_params = {pair.split('=')[0]: pair.split('=')[1]
+                               for pair in os.environ['AZURE_POSTGRESQL_REPLICA_CONNECTIONSTRING'].split(' ')}
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': replica_conn_str_params['dbname'],
+        'HOST': replica_conn_str_params['host'],
+        'USER': replica_conn_str_params['user'],
+        'PASSWORD': replica_conn_str_params['password'],
+        'CONN_HEALTH_CHECKS': True,
+        'CONN_MAX_AGE': DATABASES['default'].get('CONN_MAX_AGE', 0),
+        'OPTIONS': DATABASES['default'].get('OPTIONS', {}),
+        'TEST': {'MIRROR': 'default'},
+    }
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
 
 RECAPTCHA_PUBLIC_KEY = os.getenv("RECAPTCHA_PUBLIC_KEY", "")
 RECAPTCHA_PRIVATE_KEY = os.getenv("RECAPTCHA_PRIVATE_KEY", "")
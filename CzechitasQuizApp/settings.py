@@ -50,6 +50,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'quiz.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -57,6 +58,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'quiz.db_routing.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'CzechitasQuizApp.urls'
@@ -79,6 +81,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'CzechitasQuizApp.wsgi.application'
+ASGI_APPLICATION = 'CzechitasQuizApp.asgi.application'
+
+# Serve the student-facing views (quiz list, question, quiz review) with their async implementations,
+# only useful when running under an ASGI server, see README
+QUIZ_ASYNC_VIEWS = os.getenv("QUIZ_ASYNC_VIEWS", False) == "True"
 
 
 # Database
@@ -90,6 +97,19 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+# A second SQLite file standing in for a read replica, to try the replica routing locally
+if os.getenv("REPLICA_DATABASE_NAME"):
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / os.getenv("REPLICA_DATABASE_NAME"),
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['quiz.db_routing.ReplicaRouter']
+# Read-only views read from this alias when it is configured
+REPLICA_DATABASE = 'replica' if 'replica' in DATABASES else None
+# How long (in seconds) a client keeps reading from the primary after it has written something
+REPLICA_PIN_SECONDS = int(os.getenv("REPLICA_PIN_SECONDS", 10))
 
 
 # Password validation
@@ -137,12 +157,81 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 STATICFILES_DIRS = (str(BASE_DIR.joinpath('static')),)
 MEDIA_ROOT = BASE_DIR / "media/"
 
+# Resized WebP variants generated for image attachments of questions, see quiz/derivatives.py
+ATTACHMENT_DERIVATIVE_WIDTHS = (160, 320, 640, 1600)
+# Size of the process pool building derivatives after upload, 0 builds them synchronously
+ATTACHMENT_DERIVATIVE_WORKERS = int(os.getenv("ATTACHMENT_DERIVATIVE_WORKERS", 2))
+
+# Uploaded files are never overwritten under the same name, so browsers may keep them for a long time
+MEDIA_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+# Hand the file transfer over to the front proxy: None, "x-sendfile" (Apache) or "x-accel-redirect" (nginx)
+MEDIA_SENDFILE = os.getenv("MEDIA_SENDFILE")
+# Internal nginx location mapped to the directory of the default storage, used with "x-accel-redirect". That is
+# MEDIA_ROOT in development and staticfiles/ in production, see STORAGES in production.py
+MEDIA_SENDFILE_PREFIX = os.getenv("MEDIA_SENDFILE_PREFIX", "/protected-media/")
+# Seconds the access level of a media file is cached; changes of the attachments delete it at once
+MEDIA_ACCESS_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Custom endpoint of an OpenAI compatible API, e.g. a local stand-in, None uses the official API
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
+# OpenAI clients are reused per API key, these configure their connection pools
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", 120))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", 5))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", 20))
+OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", 5))
+OPENAI_CLIENT_CACHE_SIZE = 32
+# How often (in seconds) streamed AI feedback is saved to the answer before the response is complete
+AI_FEEDBACK_FLUSH_INTERVAL = 1.0
+# ChatGPT logs older than this many days are moved to the compressed archive by archive_chatgpt_logs
+CHATGPT_LOG_RETENTION_DAYS = int(os.getenv("CHATGPT_LOG_RETENTION_DAYS", 90))
+
+# Admission control of answer submissions, see quiz.admission
+SUBMISSION_ADMISSION_CONTROL = os.getenv("SUBMISSION_ADMISSION_CONTROL", "True") == "True"
+# Submissions one student may send per second on average, and at once
+SUBMISSION_RATE = float(os.getenv("SUBMISSION_RATE", 1))
+SUBMISSION_BURST = int(os.getenv("SUBMISSION_BURST", 1))
+# Submissions processed at the same time by all workers together, the rest is told to retry
+SUBMISSION_MAX_CONCURRENT = int(os.getenv("SUBMISSION_MAX_CONCURRENT", 20))
+SUBMISSION_RETRY_AFTER = int(os.getenv("SUBMISSION_RETRY_AFTER", 2))
+# Seconds after which the slot of a submission is freed even if its worker died
+SUBMISSION_SLOT_TIMEOUT = 60
+# Text answers are appended to a local file and stored by the flush_answer_buffer command, see quiz.answer_buffer
+TEXT_ANSWER_WRITE_BEHIND = os.getenv("TEXT_ANSWER_WRITE_BEHIND", "False") == "True"
+TEXT_ANSWER_BUFFER_DIR = os.getenv("TEXT_ANSWER_BUFFER_DIR", BASE_DIR / "answer_buffer")
+
+# Request, database, AI and cache metrics at /metrics, for superusers or with "Authorization: Bearer <METRICS_TOKEN>"
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+# Set when more than one process serves the app: the content versions, the cached fragments and answer keys are then
+# only invalidated everywhere with a cache all processes share (not the default process-local LocMemCache)
+SHARED_CACHE_REQUIRED = os.getenv("SHARED_CACHE_REQUIRED", "False") == "True"
+# Seconds the correct options of a question are cached for scoring; changes of the options delete them at once
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Also fill the old UserAnswer.selected_options table, for external readers which still use it
+SELECTED_OPTIONS_M2M_WRITES = os.getenv("SELECTED_OPTIONS_M2M_WRITES", "False") == "True"
+
+# Number of students shown in the course leaderboard
+LEADERBOARD_SIZE = 50
+# Only the newest matches of a search are ranked and shown
+SEARCH_MAX_RESULTS = int(os.getenv("SEARCH_MAX_RESULTS", 1000))
+# Estimated Jaccard similarity of the character shingles above which text answers are graded together
+ANSWER_CLUSTER_SIMILARITY = float(os.getenv("ANSWER_CLUSTER_SIMILARITY", 0.8))
+
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = "/"
 
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
 
 
+# Queries slower than the threshold are logged as JSON lines with the code which issued them, see slow_query_report
+SLOW_QUERY_LOG = os.getenv("SLOW_QUERY_LOG", "True") == "True"
+SLOW_QUERY_THRESHOLD_MS = float(os.getenv("SLOW_QUERY_THRESHOLD_MS", 200))
+# Share of the slow queries which are logged
+SLOW_QUERY_SAMPLE_RATE = float(os.getenv("SLOW_QUERY_SAMPLE_RATE", 1))
+SLOW_QUERY_LOG_FILE = os.getenv("SLOW_QUERY_LOG_FILE", "slow_queries.log")
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -151,6 +240,9 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            '()': 'quiz.slow_queries.JsonFormatter',
+        },
     },
     'handlers': {
         'file': {
@@ -161,6 +253,15 @@ LOGGING = {
             'backupCount': 5,  # Keep 5 backup log files
             'formatter': 'verbose',
         },
+        'slow_queries': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': SLOW_QUERY_LOG_FILE,
+            'maxBytes': 1024 * 1024 * 20,
+            'backupCount': 5,
+            'formatter': 'json',
+            'delay': True,
+        },
     },
     'loggers': {
         'django': {
@@ -168,6 +269,11 @@ LOGGING = {
             'level': 'ERROR',
             'propagate': True,
         },
+        'quiz.slow_queries': {
+            'handlers': ['slow_queries'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }
 
@@ -0,0 +1,46 @@
+# Gunicorn reads this file from the working directory, see the Deployment section of the README.
+import gc
+import multiprocessing
+import os
+import shutil
+import tempfile
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+# "gthread" for the WSGI app, "uvicorn.workers.UvicornWorker" for the ASGI app with QUIZ_ASYNC_VIEWS=True
+worker_class = os.getenv("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.getenv("WEB_THREADS", 4))
+# production.py sizes the database pool of each worker from these, so it has to see the numbers used here.
+os.environ["WEB_CONCURRENCY"] = str(workers)
+os.environ["WEB_THREADS"] = str(threads)
+wsgi_app = ("CzechitasQuizApp.asgi:application" if "uvicorn" in worker_class.lower()
+            else "CzechitasQuizApp.wsgi:application")
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 120))
+graceful_timeout = 30
+keepalive = 5
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+preload_app = os.getenv("GUNICORN_PRELOAD", "True") == "True"
+accesslog = "-"
+
+# The workers write their metrics into files in this directory and /metrics sums them (quiz.metrics). It has to be
+# set before the app is loaded and is emptied on every start, so counters of earlier runs are not summed in.
+metrics_dir = os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "quiz-metrics"))
+shutil.rmtree(metrics_dir, ignore_errors=True)
+os.makedirs(metrics_dir, exist_ok=True)
+
+
+def when_ready(server):
+    if not preload_app:
+        return
+    from quiz.warmup import warm_up
+
+    server.log.info("Warmed up before forking workers: %s", warm_up())
+    # Objects created so far are never collected, so the collector does not touch (and copy) the shared pages.
+    gc.freeze()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)
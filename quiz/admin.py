@@ -1,3 +1,49 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 
-# Register your models here.
+from .cloning import clone_course, clone_quiz
+from .models import Course, Quiz, Question, Option
+from .regrade import regrade_questions
+
+
+@admin.action(description="Přepočítat body odpovědí")
+def regrade_points(modeladmin, request, queryset):
+    if queryset.model is Quiz:
+        queryset = Question.objects.filter(quiz__in=queryset)
+    changes = regrade_questions(queryset)
+    for change in changes[:20]:
+        modeladmin.message_user(request, str(change), messages.INFO)
+    modeladmin.message_user(request, f"Body byly změněny u {len(changes)} odpovědí.", messages.SUCCESS)
+
+
+@admin.action(description="Klonovat včetně otázek a možností")
+def clone(modeladmin, request, queryset):
+    clone_function = clone_course if queryset.model is Course else clone_quiz
+    clones = [clone_function(x) for x in queryset]
+    modeladmin.message_user(request, f"Vytvořeno kopií: {len(clones)} ({', '.join(x.title for x in clones)}).",
+                            messages.SUCCESS)
+
+
+class OptionInline(admin.TabularInline):
+    model = Option
+    extra = 0
+
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ["title"]
+    actions = [clone]
+
+
+@admin.register(Quiz)
+class QuizAdmin(admin.ModelAdmin):
+    list_display = ["title", "course", "deadline"]
+    list_filter = ["course"]
+    actions = [regrade_points, clone]
+
+
+@admin.register(Question)
+class QuestionAdmin(admin.ModelAdmin):
+    list_display = ["text", "quiz", "type", "order"]
+    list_filter = ["quiz", "type"]
+    inlines = [OptionInline]
+    actions = [regrade_points]
@@ -0,0 +1,104 @@
+import functools
+import logging
+import math
+import random
+import time
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.shortcuts import render
+
+logger = logging.getLogger(__name__)
+
+BUCKET_KEY = "quiz:admission:bucket:{user_id}"
+SLOT_KEY = "quiz:admission:slot:{slot}"
+STATS_KEY = "quiz:admission:{outcome}"
+OUTCOMES = ("admitted", "rejected_rate", "rejected_overload")
+
+
+def _count(outcome: str):
+    key = STATS_KEY.format(outcome=outcome)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_admission_stats() -> dict:
+    values = cache.get_many([STATS_KEY.format(outcome=x) for x in OUTCOMES])
+    return {"in_flight": len(cache.get_many(_slot_keys())),
+            **{x: values.get(STATS_KEY.format(outcome=x), 0) for x in OUTCOMES}}
+
+
+def take_token(user_id: int) -> float:
+    # Token bucket of one user, returns how many seconds to wait when it is empty. The state is read and written
+    # without a lock; a lost update lets one extra request through, which is fine for stopping repeated submits.
+    rate, burst = settings.SUBMISSION_RATE, settings.SUBMISSION_BURST
+    key = BUCKET_KEY.format(user_id=user_id)
+    now = time.time()
+    tokens, updated_at = cache.get(key, (burst, now))
+    tokens = min(burst, tokens + (now - updated_at) * rate)
+    if tokens < 1:
+        return (1 - tokens) / rate
+    cache.set(key, (tokens - 1, now), math.ceil(burst / rate) + 1)
+    return 0
+
+
+def _slot_keys() -> list:
+    return [SLOT_KEY.format(slot=x) for x in range(settings.SUBMISSION_MAX_CONCURRENT)]
+
+
+def acquire_slot() -> Optional[tuple]:
+    # One key per slot in the shared cache works as a semaphore over all workers. Every key has a timeout of its own,
+    # which bounds how long the slot of a killed worker stays taken and never frees slots of running submissions.
+    keys = _slot_keys()
+    taken = cache.get_many(keys)
+    free = [x for x in keys if x not in taken]
+    # Workers racing for the same free slot would all lose but one.
+    random.shuffle(free)
+    token = uuid.uuid4().hex
+    for key in free:
+        if cache.add(key, token, settings.SUBMISSION_SLOT_TIMEOUT):
+            return key, token
+    return None
+
+
+def release_slot(slot: tuple):
+    key, token = slot
+    # After its timeout the slot may belong to another submission already.
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def _reject(request, status: int, retry_after: float, outcome: str):
+    _count(outcome)
+    logger.info("Submission of user %s rejected (%s), retry after %.1f s", request.user.pk, outcome, retry_after)
+    response = render(request, "submission_rejected.html", {"retry_after": math.ceil(retry_after),
+                                                            "overload": outcome == "rejected_overload"},
+                      status=status)
+    response["Retry-After"] = str(math.ceil(retry_after))
+    return response
+
+
+def admission_control(view_func):
+    # Rejects a submission at once instead of letting it queue in front of the database: 429 when the user submits
+    # too often, 503 when too many submissions are being processed.
+    @functools.wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if not settings.SUBMISSION_ADMISSION_CONTROL:
+            return view_func(request, *args, **kwargs)
+        wait = take_token(request.user.pk)
+        if wait:
+            return _reject(request, 429, wait, "rejected_rate")
+        slot = acquire_slot()
+        if slot is None:
+            return _reject(request, 503, settings.SUBMISSION_RETRY_AFTER, "rejected_overload")
+        _count("admitted")
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            release_slot(slot)
+    return wrapper
@@ -0,0 +1,57 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, TYPE_CHECKING
+
+from django.conf import settings
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+# One client per (api key, base url) and process, so consecutive requests reuse the kept-alive TLS connections.
+# Evicted clients are only dropped, not closed: another thread may still be streaming a response through one, and its
+# connections are closed once the last reference is gone.
+_clients = OrderedDict()
+_clients_lock = threading.Lock()
+
+
+def _create_client(api_key: str, base_url: Optional[str]) -> "OpenAI":
+    # openai pulls in httpx and pydantic, so it is only imported by the processes which actually call the API.
+    import httpx
+    from openai import OpenAI
+
+    timeout = httpx.Timeout(settings.OPENAI_TIMEOUT, connect=settings.OPENAI_CONNECT_TIMEOUT)
+    limits = httpx.Limits(max_connections=settings.OPENAI_MAX_CONNECTIONS,
+                          max_keepalive_connections=settings.OPENAI_MAX_KEEPALIVE_CONNECTIONS)
+    return OpenAI(api_key=api_key, base_url=base_url, timeout=timeout,
+                  http_client=httpx.Client(timeout=timeout, limits=limits))
+
+
+def get_openai_client(api_key: str, base_url: Optional[str] = None) -> "OpenAI":
+    key = (api_key, base_url)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _create_client(api_key, base_url)
+            # Keys removed in other processes are never evicted there, so the registry is bounded as well.
+            while len(_clients) > settings.OPENAI_CLIENT_CACHE_SIZE:
+                _clients.popitem(last=False)
+        else:
+            _clients.move_to_end(key)
+    return client
+
+
+def evict_openai_clients(api_key: str):
+    with _clients_lock:
+        for key in [x for x in _clients if x[0] == api_key]:
+            del _clients[key]
+
+
+def _forget_clients_after_fork():
+    # Connections inherited from the parent process must not be shared, so the child starts with fresh clients.
+    global _clients_lock
+    _clients.clear()
+    _clients_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_clients_after_fork)
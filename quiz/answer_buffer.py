@@ -0,0 +1,199 @@
+import fcntl
+import glob
+import json
+import logging
+import os
+import time
+import uuid
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .leaderboard import rebuild_course_scores
+from .models import Question, SearchDocument, UserAnswer
+from .search import index_documents
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_FILE = "active.jsonl"
+PENDING_PATTERN = "pending-*.jsonl"
+# Entries which could not be inserted are moved here, so they never block the following files
+FAILED_PREFIX = "failed-"
+# The latest buffered entry of every question of a user, so pages never read the buffer files
+BUFFERED_ANSWERS_KEY = "quiz:buffered_answers:{user_id}"
+
+
+def _path(name: str) -> str:
+    return os.path.join(settings.TEXT_ANSWER_BUFFER_DIR, name)
+
+
+def append_text_answer(user_id: int, question_id: int, answer_text: str) -> dict:
+    entry = {"submission_id": str(uuid.uuid4()), "user_id": user_id, "question_id": question_id,
+             "answer_text": answer_text, "answered_on": timezone.now().isoformat()}
+    line = (json.dumps(entry, ensure_ascii=False) + "\n").encode()
+    os.makedirs(settings.TEXT_ANSWER_BUFFER_DIR, exist_ok=True)
+    while True:
+        with open(_path(ACTIVE_FILE), "ab") as file:
+            fcntl.flock(file, fcntl.LOCK_EX)
+            # The flusher may have renamed the file while this process waited for the lock; the entry must go
+            # to the file the flusher has not taken yet.
+            try:
+                current = os.stat(_path(ACTIVE_FILE)).st_ino == os.fstat(file.fileno()).st_ino
+            except FileNotFoundError:
+                current = False
+            if current:
+                file.write(line)
+                file.flush()
+                # The student is told the answer was saved, so it has to survive a crash of the machine as well.
+                os.fsync(file.fileno())
+                key = BUFFERED_ANSWERS_KEY.format(user_id=user_id)
+                cache.set(key, {**cache.get(key, {}), question_id: entry}, None)
+                return entry
+
+
+def _read_entries(path: str) -> list:
+    entries = []
+    try:
+        with open(path, "rb") as file:
+            for line in file:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A line being written right now is incomplete, it is read again next time.
+                    pass
+    except FileNotFoundError:
+        pass
+    return entries
+
+
+def get_buffered_answers(user_id: int, question_ids: Optional[list] = None) -> dict:
+    # The latest buffered answer of every question, so students see their answers before they are flushed.
+    if not settings.TEXT_ANSWER_WRITE_BEHIND:
+        return {}
+    answers = cache.get(BUFFERED_ANSWERS_KEY.format(user_id=user_id), {})
+    return {x: y for x, y in answers.items() if question_ids is None or x in question_ids}
+
+
+def build_user_answer(entry: dict, user, question: Question) -> UserAnswer:
+    # Unsaved stand-in of a buffered answer for rendering.
+    return UserAnswer(user=user, question=question, quiz_id=question.quiz_id, answer_text=entry["answer_text"],
+                      answered_on=parse_datetime(entry["answered_on"]), submission_id=entry["submission_id"])
+
+
+def merge_buffered_answers(answers: list, user, quiz_id: int) -> list:
+    # Buffered answers are newer than any stored attempt of the same question, so they replace them.
+    buffered = get_buffered_answers(user.pk)
+    if not buffered:
+        return answers
+    questions = Question.objects.filter(quiz=quiz_id, pk__in=buffered)
+    merged = {x.question_id: x for x in answers}
+    merged.update({x.pk: build_user_answer(buffered[x.pk], user, x) for x in questions})
+    return sorted(merged.values(), key=lambda x: x.question.order or 0)
+
+
+def get_buffered_stamp(user_id: int) -> list:
+    return sorted(x["submission_id"] for x in get_buffered_answers(user_id).values())
+
+
+def _rotate_active_file() -> Optional[str]:
+    try:
+        file = open(_path(ACTIVE_FILE), "rb")
+    except FileNotFoundError:
+        return None
+    with file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        if os.fstat(file.fileno()).st_size == 0:
+            return None
+        pending = _path(f"pending-{time.time_ns()}-{os.getpid()}.jsonl")
+        os.rename(_path(ACTIVE_FILE), pending)
+    return pending
+
+
+def _forget_flushed(entries: list):
+    # Holds the lock of the active file, so no answer of this machine is added to the index in the meantime.
+    os.makedirs(settings.TEXT_ANSWER_BUFFER_DIR, exist_ok=True)
+    with open(_path(ACTIVE_FILE), "ab") as file:
+        fcntl.flock(file, fcntl.LOCK_EX)
+        for user_id in {x["user_id"] for x in entries}:
+            key = BUFFERED_ANSWERS_KEY.format(user_id=user_id)
+            flushed = {x["submission_id"] for x in entries if x["user_id"] == user_id}
+            answers = {x: y for x, y in cache.get(key, {}).items() if y["submission_id"] not in flushed}
+            if answers:
+                cache.set(key, answers, None)
+            else:
+                cache.delete(key)
+
+
+def _insert_batch(entries: list) -> int:
+    submission_ids = [x["submission_id"] for x in entries]
+    with transaction.atomic():
+        # Entries of a replayed file may already be in the database.
+        stored = {str(x) for x in UserAnswer.objects.filter(submission_id__in=submission_ids)
+                  .values_list("submission_id", flat=True)}
+        entries = sorted((x for x in entries if x["submission_id"] not in stored), key=lambda x: x["answered_on"])
+        if not entries:
+            return 0
+        question_keys = {x[0]: x[1:] for x in Question.objects.filter(pk__in={x["question_id"] for x in entries})
+                         .values_list("pk", "quiz_id", "quiz__course_id")}
+        deleted = [x["submission_id"] for x in entries if x["question_id"] not in question_keys]
+        if deleted:
+            logger.warning("Skipping buffered answers of deleted questions: %s", ", ".join(deleted))
+            entries = [x for x in entries if x["question_id"] in question_keys]
+            if not entries:
+                return 0
+        pairs = {(x["user_id"], x["question_id"]) for x in entries}
+        attempt_numbers = {
+            (x["user_id"], x["question_id"]): x["attempt_number__max"]
+            for x in UserAnswer.objects.filter(user_id__in={x[0] for x in pairs}, question_id__in={x[1] for x in pairs})
+            .values("user_id", "question_id").annotate(Max("attempt_number"))}
+        user_answers = []
+        for entry in entries:
+            key = entry["user_id"], entry["question_id"]
+            # Same numbering as the pre_save signal, which bulk_create skips.
+            attempt_numbers[key] = (attempt_numbers.get(key) or 1) + 1
+            quiz_id, course_id = question_keys[entry["question_id"]]
+            user_answers.append(UserAnswer(user_id=entry["user_id"], question_id=entry["question_id"], quiz_id=quiz_id,
+                                           course_id=course_id, answer_text=entry["answer_text"],
+                                           submission_id=entry["submission_id"], attempt_number=attempt_numbers[key]))
+        created = UserAnswer.objects.bulk_create(user_answers)
+        # bulk_create fills auto_now_add with the current time, the time of the submission is kept instead.
+        for user_answer, entry in zip(created, entries):
+            user_answer.answered_on = parse_datetime(entry["answered_on"])
+        UserAnswer.objects.bulk_update(created, ["answered_on"])
+        index_documents(SearchDocument.ANSWER, created)
+        # A new attempt replaces the points of the previous one in the leaderboard.
+        rebuild_course_scores({x[1] for x in question_keys.values()}, {x[0] for x in pairs})
+    return len(created)
+
+
+def _insert_or_quarantine(entries: list, path: str) -> int:
+    try:
+        return _insert_batch(entries)
+    except IntegrityError:
+        if len(entries) > 1:
+            # One bad entry must not hold back the others of its batch.
+            return sum(_insert_or_quarantine([x], path) for x in entries)
+        failed_path = os.path.join(os.path.dirname(path), FAILED_PREFIX + os.path.basename(path))
+        logger.exception("Buffered answer %s could not be inserted, it is moved to %s", entries[0]["submission_id"],
+                         failed_path)
+    with open(failed_path, "ab") as file:
+        file.write((json.dumps(entries[0], ensure_ascii=False) + "\n").encode())
+    return 0
+
+
+def flush_buffer(batch_size: int = 500) -> int:
+    # Files left behind by a crashed flusher are replayed first; already inserted entries are skipped.
+    _rotate_active_file()
+    inserted = 0
+    for path in sorted(glob.glob(_path(PENDING_PATTERN))):
+        entries = _read_entries(path)
+        for start in range(0, len(entries), batch_size):
+            inserted += _insert_or_quarantine(entries[start:start + batch_size], path)
+        os.remove(path)
+        _forget_flushed(entries)
+    return inserted
@@ -6,4 +6,5 @@ class QuizConfig(AppConfig):
     name = 'quiz'
 
     def ready(self):
+        import quiz.checks
         import quiz.signals
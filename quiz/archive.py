@@ -0,0 +1,290 @@
+import hashlib
+import io
+import json
+import os
+import time
+import zipfile
+from collections import Counter, defaultdict
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, Optional
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import FileField, QuerySet
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
+
+from .cache import bump_content_version, delete_answer_keys, delete_media_access
+from .cloning import QUIZ_FIELDS, QUESTION_FIELDS, OPTION_FIELDS
+from .derivatives import schedule_derivatives
+from .leaderboard import rebuild_course_scores
+from .models import Course, Quiz, Question, Option, UserAnswer, SearchDocument
+from .search import index_documents
+
+FORMAT_VERSION = 1
+BATCH_SIZE = 1000
+CHUNK_SIZE = 1024 * 1024
+FILES_DIR = "files/"
+# The AI API key is a secret of the instance, it never leaves it.
+COURSE_FIELDS = ["title", "description", "ai_prompt_format", "ai_model", "attachment"]
+USER_FIELDS = ["username", "email", "first_name", "last_name"]
+ANSWER_FIELDS = ["attempt_number", "answered_on", "answer_text", "admin_feedback", "admin_feedback_on", "ai_feedback",
+                 "ai_feedback_on", "points", "missing_answers"]
+
+
+class ArchiveEncoder(DjangoJSONEncoder):
+    def default(self, o):
+        # DjangoJSONEncoder drops the microseconds, which would make every imported time differ from the stored one.
+        if isinstance(o, datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def _batches(iterable: Iterable, size: int = BATCH_SIZE) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _values(instance, fields: list) -> dict:
+    values = {}
+    for name in fields:
+        value = getattr(instance, name)
+        values[name] = (value.name or None) if isinstance(value, FieldFile) else value
+    return values
+
+
+def _write_jsonl(archive: zipfile.ZipFile, name: str, records: Iterable) -> int:
+    count = 0
+    with archive.open(name, "w", force_zip64=True) as target:
+        for record in records:
+            target.write(json.dumps(record, cls=ArchiveEncoder, ensure_ascii=False).encode() + b"\n")
+            count += 1
+    return count
+
+
+def _write_file(archive: zipfile.ZipFile, name: str) -> dict:
+    # Attachments are mostly images and PDFs which are compressed already, so they are stored as they are.
+    info = zipfile.ZipInfo(FILES_DIR + name, time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    digest = hashlib.sha256()
+    size = 0
+    with default_storage.open(name, "rb") as source, archive.open(info, "w", force_zip64=True) as target:
+        while chunk := source.read(CHUNK_SIZE):
+            digest.update(chunk)
+            size += len(chunk)
+            target.write(chunk)
+    return {"name": name, "size": size, "sha256": digest.hexdigest()}
+
+
+def _attachment_names(course: Course) -> set:
+    names = {course.attachment.name}
+    names.update(Quiz.objects.filter(course=course).values_list("attachment", flat=True))
+    for field in ["attachment_1", "attachment_2", "attachment_3"]:
+        names.update(Question.objects.filter(quiz__course=course).values_list(field, flat=True))
+    return {x for x in names if x}
+
+
+def export_course(course: Course, fileobj, include_answers: bool = False) -> dict:
+    # Rows are read with iterators and written line by line, files in chunks, so memory does not grow with the course.
+    counts = {}
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as archive:
+        counts["courses"] = _write_jsonl(archive, "course.jsonl", [_values(course, COURSE_FIELDS)])
+        counts["quizzes"] = _write_jsonl(archive, "quizzes.jsonl", (
+            {"id": x.pk, **_values(x, QUIZ_FIELDS)}
+            for x in Quiz.objects.filter(course=course).order_by("pk").iterator(BATCH_SIZE)))
+        counts["questions"] = _write_jsonl(archive, "questions.jsonl", (
+            {"id": x.pk, "quiz": x.quiz_id, **_values(x, QUESTION_FIELDS)}
+            for x in Question.objects.filter(quiz__course=course).order_by("pk").iterator(BATCH_SIZE)))
+        counts["options"] = _write_jsonl(archive, "options.jsonl", (
+            {"id": x.pk, "question": x.question_id, **_values(x, OPTION_FIELDS)}
+            for x in Option.objects.filter(question__quiz__course=course).order_by("pk").iterator(BATCH_SIZE)))
+        if include_answers:
+            answers = UserAnswer.objects.filter(course=course)
+            users = User.objects.filter(pk__in=answers.values("user_id")) | User.objects.filter(
+                pk__in=answers.values("admin_feedback_by_id"))
+            counts["users"] = _write_jsonl(archive, "users.jsonl", (
+                _values(x, USER_FIELDS) for x in users.order_by("pk").iterator(BATCH_SIZE)))
+            counts["answers"] = _write_jsonl(archive, "answers.jsonl", (
+                {"user": x.user.username, "question": x.question_id, "selected_options": x.selected_option_ids,
+                 "admin_feedback_by": x.admin_feedback_by.username if x.admin_feedback_by else None,
+                 **_values(x, ANSWER_FIELDS)}
+                for x in answers.select_related("user", "admin_feedback_by").order_by("pk").iterator(BATCH_SIZE)))
+        files = [_write_file(archive, x) for x in sorted(_attachment_names(course)) if default_storage.exists(x)]
+        counts["attachments"] = _write_jsonl(archive, "attachments.jsonl", files)
+        archive.writestr("manifest.json", json.dumps({"format": FORMAT_VERSION, "course": course.title,
+                                                      "exported_at": timezone.now(), "counts": counts},
+                                                     cls=ArchiveEncoder, ensure_ascii=False, indent=2))
+    return counts
+
+
+def _read_jsonl(archive: zipfile.ZipFile, name: str) -> Iterator[dict]:
+    if name not in archive.NameToInfo:
+        return
+    with archive.open(name) as source:
+        for line in io.TextIOWrapper(source, encoding="utf-8"):
+            if line.strip():
+                yield json.loads(line)
+
+
+def _same_file(name: str, record: dict) -> bool:
+    if default_storage.size(name) != record["size"]:
+        return False
+    digest = hashlib.sha256()
+    with default_storage.open(name, "rb") as stored:
+        while chunk := stored.read(CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest() == record["sha256"]
+
+
+def _store_file(archive: zipfile.ZipFile, record: dict) -> str:
+    # A different file stored under the same name gets a name derived from the content, so importing the archive
+    # again finds it there instead of storing another copy.
+    directory, filename = os.path.split(record["name"])
+    candidates = [record["name"], os.path.join(directory, record["sha256"][:16], filename)]
+    for name in candidates:
+        if not default_storage.exists(name):
+            break
+        if _same_file(name, record):
+            return name
+    with archive.open(FILES_DIR + record["name"]) as source:
+        content = File(source, name=filename)
+        content.size = record["size"]
+        return default_storage.save(name, content)
+
+
+def _import_files(archive: zipfile.ZipFile, counts: Counter) -> dict:
+    names = {}
+    for record in _read_jsonl(archive, "attachments.jsonl"):
+        names[record["name"]] = _store_file(archive, record)
+        counts["attachments"] += 1
+    return names
+
+
+def _model_values(model, record: dict, fields: list, file_names: dict) -> dict:
+    values = {}
+    for name in fields:
+        field = model._meta.get_field(name)
+        value = field.to_python(record.get(name))
+        if isinstance(field, FileField) and value:
+            value = file_names.get(value, value)
+        values[name] = value
+    return values
+
+
+def _import_objects(name: str, model, records: Iterable, fields: list, existing: QuerySet, natural_key,
+                    file_names: dict, counts: Counter, parents: Optional[dict] = None, **values) -> dict:
+    # Rows are matched with the existing ones by their natural key; matched rows are only written when they differ.
+    candidates = defaultdict(list)
+    for instance in existing.order_by("pk"):
+        candidates[natural_key(instance)].append(instance)
+    imported, created, changed = {}, [], []
+    for record in records:
+        instance = model(**_model_values(model, record, fields, file_names), **values,
+                         **{f"{x}_id": ids[record[x]].pk for x, ids in (parents or {}).items()})
+        matches = candidates.get(natural_key(instance))
+        if not matches:
+            created.append(instance)
+        else:
+            match = matches.pop(0)
+            instance.pk = match.pk
+            if _values(match, fields) != _values(instance, fields):
+                changed.append(instance)
+        imported[record["id"]] = instance
+    model.objects.bulk_create(created, batch_size=BATCH_SIZE)
+    model.objects.bulk_update(changed, fields, batch_size=BATCH_SIZE)
+    counts[f"{name} created"] += len(created)
+    counts[f"{name} updated"] += len(changed)
+    return imported
+
+
+def _import_users(archive: zipfile.ZipFile, counts: Counter) -> dict:
+    # Students missing on this instance get accounts without a password; existing accounts are not changed.
+    user_ids = {}
+    for batch in _batches(_read_jsonl(archive, "users.jsonl")):
+        existing = dict(User.objects.filter(username__in=[x["username"] for x in batch]).values_list("username", "pk"))
+        created = User.objects.bulk_create([User(password=make_password(None), **{x: record[x] for x in USER_FIELDS})
+                                            for record in batch if record["username"] not in existing])
+        existing.update((x.username, x.pk) for x in created)
+        user_ids.update(existing)
+        counts["users created"] += len(created)
+    return user_ids
+
+
+def _import_answers(archive: zipfile.ZipFile, course: Course, questions: dict, options: dict, counts: Counter):
+    user_ids = _import_users(archive, counts)
+    fields = ANSWER_FIELDS + ["selected_option_ids", "admin_feedback_by_id"]
+    for batch in _batches(_read_jsonl(archive, "answers.jsonl")):
+        answers = []
+        for record in batch:
+            question = questions[record["question"]]
+            answers.append(UserAnswer(user_id=user_ids[record["user"]], question_id=question.pk,
+                                      quiz_id=question.quiz_id, course_id=course.pk,
+                                      # Answers may still refer to options deleted since, like chosen_options.
+                                      selected_option_ids=sorted(options[x].pk for x in record["selected_options"]
+                                                                 if x in options),
+                                      admin_feedback_by_id=user_ids.get(record["admin_feedback_by"]),
+                                      **_model_values(UserAnswer, record, ANSWER_FIELDS, {})))
+        existing = {(x.user_id, x.question_id, x.attempt_number): x for x in UserAnswer.objects.filter(
+            user_id__in={x.user_id for x in answers}, question_id__in={x.question_id for x in answers})}
+        created, changed = [], []
+        for answer in answers:
+            match = existing.get((answer.user_id, answer.question_id, answer.attempt_number))
+            if match is None:
+                created.append(answer)
+            elif _values(match, fields) != _values(answer, fields):
+                answer.pk = match.pk
+                changed.append(answer)
+        answered_on = [x.answered_on for x in created]
+        UserAnswer.objects.bulk_create(created)
+        # bulk_create fills auto_now_add with the current time, the time of the original answer is kept instead.
+        for answer, value in zip(created, answered_on):
+            answer.answered_on = value
+        UserAnswer.objects.bulk_update(created, ["answered_on"])
+        UserAnswer.objects.bulk_update(changed, fields)
+        index_documents(SearchDocument.ANSWER, created + changed)
+        counts["answers created"] += len(created)
+        counts["answers updated"] += len(changed)
+
+
+def import_course(fileobj) -> tuple:
+    counts = Counter()
+    with zipfile.ZipFile(fileobj) as archive:
+        manifest = json.loads(archive.read("manifest.json"))
+        if manifest.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported archive format {manifest.get('format')}.")
+        # Storage is not transactional; files stored by a failed import are found again by the next one.
+        file_names = _import_files(archive, counts)
+        with transaction.atomic():
+            record, = _read_jsonl(archive, "course.jsonl")
+            values = _model_values(Course, record, COURSE_FIELDS, file_names)
+            course = Course.objects.filter(title=values["title"]).order_by("pk").first() or Course(**values)
+            counts["courses created" if course.pk is None else "courses updated"] += 1
+            for name, value in values.items():
+                setattr(course, name, value)
+            course.save()
+            quizzes = _import_objects("quizzes", Quiz, _read_jsonl(archive, "quizzes.jsonl"), QUIZ_FIELDS,
+                                      Quiz.objects.filter(course=course), lambda x: x.title, file_names, counts,
+                                      course_id=course.pk)
+            questions = _import_objects("questions", Question, _read_jsonl(archive, "questions.jsonl"),
+                                        QUESTION_FIELDS, Question.objects.filter(quiz__course=course),
+                                        lambda x: (x.quiz_id, x.text), file_names, counts, {"quiz": quizzes})
+            options = _import_objects("options", Option, _read_jsonl(archive, "options.jsonl"), OPTION_FIELDS,
+                                      Option.objects.filter(question__quiz__course=course),
+                                      lambda x: (x.question_id, x.text), file_names, counts,
+                                      {"question": questions})
+            _import_answers(archive, course, questions, options, counts)
+            # The bulk writes skip the signals which keep these up to date.
+            index_documents(SearchDocument.QUESTION, questions.values())
+            index_documents(SearchDocument.OPTION, options.values())
+            rebuild_course_scores([course.pk])
+            bump_content_version(course.pk)
+            delete_answer_keys([x.pk for x in questions.values()])
+            delete_media_access(file_names.values())
+            transaction.on_commit(lambda: schedule_derivatives(list(file_names.values())))
+    return course, counts
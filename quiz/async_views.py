@@ -0,0 +1,139 @@
+from abc import ABC, abstractmethod
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.db.models import Max, Q
+from django.http import Http404
+from django.shortcuts import render, aget_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views import View
+
+from .answer_buffer import build_user_answer, get_buffered_answers, get_buffered_stamp, merge_buffered_answers
+from .cache import get_content_version, make_request_etag
+from .db_routing import ReplicaReadMixin
+from .models import Course, Option, Question, Quiz, UserAnswer
+from .views import QuestionView
+
+
+class AsyncLoginRequiredMixin:
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class AsyncConditionalGetMixin(ABC):
+    # Database work happens through the async ORM; the template is rendered in the sync thread because
+    # templates may still follow lazy relations.
+    template_name = None
+
+    @abstractmethod
+    async def _aget_etag_parts(self):
+        pass
+
+    @abstractmethod
+    async def aget_context_data(self) -> dict:
+        pass
+
+    async def get(self, request, *args, **kwargs):
+        etag_parts = await self._aget_etag_parts()
+        if etag_parts is None:
+            raise Http404
+        etag = make_request_etag(request, self.__class__.__name__, etag_parts)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            context = await self.aget_context_data()
+            response = await sync_to_async(render)(request, self.template_name, context)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class AsyncQuizListView(ReplicaReadMixin, AsyncLoginRequiredMixin, AsyncConditionalGetMixin, View):
+    template_name = 'quiz_list.html'
+
+    async def _aget_etag_parts(self):
+        course_id = self.kwargs["course_id"]
+        stamp_filters = {"course": course_id}
+        if not self.request.user.is_superuser:
+            stamp_filters["user"] = self.request.user
+        return [course_id, await sync_to_async(get_content_version)(course_id),
+                *await UserAnswer.aget_version_stamp(**stamp_filters)]
+
+    async def aget_context_data(self) -> dict:
+        course = await aget_object_or_404(Course, pk=self.kwargs["course_id"])
+        quizzes = [x async for x in Quiz.objects.filter(course=course)]
+        # The progress helpers issue many small queries; one thread hop for all of them is cheaper than one per query.
+        quiz_questions = await sync_to_async(course.get_quiz_question_counts)(self.request.user)
+        quiz_completion = await sync_to_async(course.quiz_completion_info)(self.request.user)
+        return {"course": course, "quizzes": quizzes, "quiz_questions": quiz_questions,
+                "quiz_completion": quiz_completion}
+
+
+class AsyncQuestionView(ReplicaReadMixin, AsyncLoginRequiredMixin, AsyncConditionalGetMixin, View):
+    template_name = 'question.html'
+
+    async def _aget_etag_parts(self):
+        self.question = await (Question.objects.select_related("quiz__course")
+                               .filter(pk=self.kwargs["question_id"]).afirst())
+        if self.question is None:
+            return None
+        return [self.question.pk, await sync_to_async(get_content_version)(self.question.quiz.course_id),
+                *await UserAnswer.aget_version_stamp(user=self.request.user, quiz=self.question.quiz_id),
+                *await sync_to_async(get_buffered_stamp)(self.request.user.pk)]
+
+    async def _aget_neighbour_question(self, order_filter: Q, order_by: str):
+        answered_questions = (UserAnswer.objects.filter(quiz=self.question.quiz_id, user=self.request.user)
+                              .values_list("question_id", flat=True))
+        return await (Question.objects.filter(quiz=self.question.quiz_id).filter(order_filter)
+                      .exclude(id__in=answered_questions).order_by(order_by).afirst())
+
+    async def aget_context_data(self) -> dict:
+        question = self.question
+        context = {"quiz": question.quiz, "question": question,
+                   "next_question": await self._aget_neighbour_question(Q(order__gt=question.order), "order"),
+                   "previous_question": await self._aget_neighbour_question(Q(order__lt=question.order), "-order"),
+                   "attempts_remaining": question.max_attempts, "allow_answer": True, "continue": False,
+                   "content_version": await sync_to_async(get_content_version)(question.quiz.course_id)}
+        user_answer = await (UserAnswer.objects.filter(user=self.request.user, question=question)
+                             .order_by("attempt_number").alast())
+        buffered_answer = (await sync_to_async(get_buffered_answers)(self.request.user.pk, [question.pk])).get(
+            question.pk)
+        if buffered_answer:
+            context.update(QuestionView._get_user_answer_context(
+                question, user_answer.attempt_number if user_answer else 1,
+                build_user_answer(buffered_answer, self.request.user, question), []))
+        elif user_answer is not None:
+            selected_options = [x async for x in Option.objects.filter(pk__in=user_answer.selected_option_ids)]
+            context.update(QuestionView._get_user_answer_context(question, user_answer.attempt_number, user_answer,
+                                                                 selected_options))
+        return context
+
+    async def post(self, request, *args, **kwargs):
+        # Submissions keep using the sync implementation, which evaluates and stores the answer in one thread.
+        return await sync_to_async(QuestionView.as_view())(request, *args, **kwargs)
+
+
+class AsyncUserTestReviewView(ReplicaReadMixin, AsyncLoginRequiredMixin, AsyncConditionalGetMixin, View):
+    template_name = 'user_quiz_review.html'
+
+    async def _aget_etag_parts(self):
+        quiz_id = self.kwargs["quiz_id"]
+        course_id = await Quiz.objects.filter(pk=quiz_id).values_list("course_id", flat=True).afirst()
+        if course_id is None:
+            return None
+        return [quiz_id, await sync_to_async(get_content_version)(course_id),
+                *await UserAnswer.aget_version_stamp(user=self.request.user, quiz=quiz_id),
+                *await sync_to_async(get_buffered_stamp)(self.request.user.pk)]
+
+    async def aget_context_data(self) -> dict:
+        user_answers = UserAnswer.objects.filter(quiz=self.kwargs["quiz_id"], user=self.request.user)
+        last_attempts = {x["question_id"]: x["attempt_number__max"] async for x in
+                         user_answers.values("question_id").annotate(Max("attempt_number"))}
+        answers = [x async for x in user_answers.select_related("user", "question", "admin_feedback_by")
+                   .prefetch_related("question__option_set").order_by("question__order")
+                   if x.attempt_number == last_attempts[x.question_id]]
+        return {"answers": await sync_to_async(merge_buffered_answers)(answers, self.request.user,
+                                                                       self.kwargs["quiz_id"])}
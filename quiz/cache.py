@@ -0,0 +1,70 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.http import quote_etag
+
+from .metrics import count_cache_lookup
+
+CONTENT_VERSION_KEY = "quiz:content_version:{course_id}"
+ANSWER_KEY_KEY = "quiz:answer_key:{question_id}"
+MEDIA_ACCESS_KEY = "quiz:media_access:{name_hash}"
+# Backends whose invalidations are not seen by the other worker processes
+PROCESS_LOCAL_BACKENDS = {"django.core.cache.backends.locmem.LocMemCache",
+                          "django.core.cache.backends.dummy.DummyCache"}
+
+
+def is_cache_process_local() -> bool:
+    return settings.CACHES["default"]["BACKEND"] in PROCESS_LOCAL_BACKENDS
+
+
+def _content_version_key(course_id: int) -> str:
+    return CONTENT_VERSION_KEY.format(course_id=course_id)
+
+
+def get_content_version(course_id: int) -> int:
+    key = _content_version_key(course_id)
+    version = cache.get(key)
+    count_cache_lookup("content_version", version is not None)
+    if version is None:
+        # Seeding with the current time keeps versions unique even after the cache has been flushed,
+        # so an ETag issued before the flush can never match content rendered after it.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_content_version(course_id: int):
+    key = _content_version_key(course_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def get_answer_key_cache_key(question_id: int) -> str:
+    return ANSWER_KEY_KEY.format(question_id=question_id)
+
+
+def delete_answer_keys(question_ids):
+    cache.delete_many([get_answer_key_cache_key(x) for x in question_ids])
+
+
+def get_media_access_cache_key(name: str) -> str:
+    # File names may contain characters which are not valid in cache keys.
+    return MEDIA_ACCESS_KEY.format(name_hash=hashlib.sha1(name.encode()).hexdigest())
+
+
+def delete_media_access(names):
+    cache.delete_many([get_media_access_cache_key(x) for x in names if x])
+
+
+def make_etag(*parts) -> str:
+    return hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def make_request_etag(request, view_name: str, parts) -> str:
+    # The CSRF cookie is part of the ETag, so a page cached before login never replays a stale form token.
+    return quote_etag(make_etag(view_name, request.user.pk, request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+                                *parts))
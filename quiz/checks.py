@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+from .cache import is_cache_process_local
+
+
+@register(Tags.caches)
+def check_shared_cache(app_configs, **kwargs):
+    if settings.SHARED_CACHE_REQUIRED and is_cache_process_local():
+        return [Error("The default cache is local to each process, so the workers would miss each other's "
+                      "invalidations of content versions, cached fragments and answer keys.",
+                      hint="Set REDIS_URL or configure a DatabaseCache (manage.py createcachetable).",
+                      id="quiz.E001")]
+    return []
@@ -0,0 +1,59 @@
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .cache import bump_content_version
+from .models import Course, Quiz, Question, Option, SearchDocument
+from .search import index_documents
+
+QUIZ_FIELDS = ["title", "deadline", "ai_prompt_quiz_text", "attachment"]
+QUESTION_FIELDS = ["text", "type", "order", "example_answer", "ai_feedback_enabled", "attachment_1", "attachment_2",
+                   "attachment_3", "max_attempts"]
+OPTION_FIELDS = ["text", "is_correct", "feedback", "option_order"]
+COURSE_FIELDS = ["description", "ai_prompt_format", "ai_api_key", "ai_model", "attachment"]
+
+
+def _copy(instance, fields: list, **values):
+    # Attachments are copied by name, so the clone refers to the same stored file (and its derivatives).
+    return type(instance)(**{x: getattr(instance, x) for x in fields}, **values)
+
+
+def _clone_quizzes(quizzes: QuerySet, course: Course, title: Optional[str] = None) -> list:
+    quizzes = list(quizzes.order_by("pk"))
+    clones = [_copy(x, QUIZ_FIELDS, course=course) for x in quizzes]
+    if title is not None:
+        for clone in clones:
+            clone.title = title
+    clones = Quiz.objects.bulk_create(clones)
+    cloned_quizzes = {x.pk: y for x, y in zip(quizzes, clones)}
+
+    questions = list(Question.objects.filter(quiz__in=quizzes).order_by("pk"))
+    question_clones = Question.objects.bulk_create([_copy(x, QUESTION_FIELDS, quiz=cloned_quizzes[x.quiz_id])
+                                                    for x in questions])
+    cloned_questions = {x.pk: y for x, y in zip(questions, question_clones)}
+
+    options = Option.objects.filter(question__quiz__in=quizzes).order_by("pk")
+    option_clones = Option.objects.bulk_create([_copy(x, OPTION_FIELDS, question=cloned_questions[x.question_id])
+                                                for x in options])
+
+    # bulk_create skips the signals which keep the search index and the content version.
+    index_documents(SearchDocument.QUESTION, question_clones)
+    index_documents(SearchDocument.OPTION, option_clones)
+    bump_content_version(course.pk)
+    return clones
+
+
+def clone_quiz(quiz: Quiz, course: Optional[Course] = None, title: Optional[str] = None) -> Quiz:
+    with transaction.atomic():
+        clone, = _clone_quizzes(Quiz.objects.filter(pk=quiz.pk), course or quiz.course,
+                                f"{quiz.title} (kopie)" if title is None else title)
+    return clone
+
+
+def clone_course(course: Course, title: Optional[str] = None) -> Course:
+    with transaction.atomic():
+        clone = _copy(course, COURSE_FIELDS, title=f"{course.title} (kopie)" if title is None else title)
+        clone.save()
+        _clone_quizzes(course.quiz_set.all(), clone)
+    return clone
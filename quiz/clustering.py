@@ -0,0 +1,168 @@
+import re
+from collections import Counter
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional, TYPE_CHECKING
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Exists, OuterRef, QuerySet
+from django.utils import timezone
+
+from .leaderboard import rebuild_course_scores
+from .models import ChatGPTLog, Question, SearchDocument, UserAnswer
+from .search import index_documents
+
+if TYPE_CHECKING:
+    import numpy
+
+SHINGLE_SIZE = 5
+BANDS = 32
+ROWS = 4
+# Mersenne prime 2 ** 31 - 1: with shingle hashes and coefficients below it, a * hash + b stays below 2 ** 63, so the
+# permutations are computed exactly in 64-bit integers.
+PRIME = 2 ** 31 - 1
+SEED = 42
+
+
+@dataclass
+class AnswerCluster:
+    representative: UserAnswer
+    members: list
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+    @property
+    def graded_count(self) -> int:
+        return sum(1 for x in self.members if x.admin_feedback)
+
+
+def normalize_text(text: Optional[str]) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def _shingle_hashes(texts: list) -> tuple:
+    # Rolling hashes of all character shingles of all texts at once; short texts are padded to one shingle.
+    import numpy as np
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    texts = [x.ljust(SHINGLE_SIZE) for x in texts]
+    lengths = np.array([len(x) for x in texts])
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    powers = np.array([1_000_003 ** x % 2 ** 64 for x in range(SHINGLE_SIZE - 1, -1, -1)], dtype=np.uint64)
+    hashes = sliding_window_view(codes, SHINGLE_SIZE) @ powers
+    owners = np.repeat(np.arange(len(texts)), lengths)[:len(hashes)]
+    ends = np.cumsum(lengths)
+    # Windows crossing into the next text are dropped.
+    valid = np.arange(len(hashes)) + SHINGLE_SIZE <= ends[owners]
+    hashes, owners = hashes[valid], owners[valid]
+    return hashes % np.uint64(PRIME), owners
+
+
+def minhash_signatures(texts: list) -> "numpy.ndarray":
+    import numpy as np
+
+    hashes, owners = _shingle_hashes(texts)
+    starts = np.searchsorted(owners, np.arange(len(texts)))
+    generator = np.random.default_rng(SEED)
+    a = generator.integers(1, PRIME, BANDS * ROWS, dtype=np.uint64)
+    b = generator.integers(0, PRIME, BANDS * ROWS, dtype=np.uint64)
+    signatures = np.empty((len(texts), BANDS * ROWS), dtype=np.uint64)
+    for permutation in range(BANDS * ROWS):
+        signatures[:, permutation] = np.minimum.reduceat((a[permutation] * hashes + b[permutation]) % PRIME, starts)
+    return signatures
+
+
+def _find(parents: list, item: int) -> int:
+    while parents[item] != item:
+        parents[item] = parents[parents[item]]
+        item = parents[item]
+    return item
+
+
+def cluster_texts(texts: list, threshold: Optional[float] = None) -> list:
+    # Groups of indexes of near-identical texts. Texts sharing a band of their MinHash signature are candidates,
+    # and a candidate joins a group only if the signatures estimate a Jaccard similarity of at least threshold.
+    import numpy as np
+
+    if threshold is None:
+        threshold = settings.ANSWER_CLUSTER_SIMILARITY
+    if not texts:
+        return []
+    signatures = minhash_signatures([normalize_text(x) for x in texts])
+    parents = list(range(len(texts)))
+    band_weights = np.random.default_rng(SEED + 1).integers(1, 2 ** 63, ROWS, dtype=np.uint64) | np.uint64(1)
+    for band in range(BANDS):
+        buckets = signatures[:, band * ROWS:(band + 1) * ROWS] @ band_weights
+        order = np.argsort(buckets, kind="stable")
+        sorted_buckets = buckets[order]
+        new_bucket = np.concatenate(([True], sorted_buckets[1:] != sorted_buckets[:-1]))
+        leaders = order[np.maximum.accumulate(np.where(new_bucket, np.arange(len(order)), 0))]
+        previous = np.where(new_bucket, order, np.roll(order, 1))
+        # Every member is compared with the first member of its bucket and with its predecessor.
+        for others in (leaders, previous):
+            similar = (signatures[order] == signatures[others]).mean(axis=1) >= threshold
+            for item, other in zip(order[similar & (order != others)].tolist(),
+                                   others[similar & (order != others)].tolist()):
+                parents[_find(parents, item)] = _find(parents, other)
+    groups = {}
+    for item in range(len(texts)):
+        groups.setdefault(_find(parents, item), []).append(item)
+    return sorted(groups.values(), key=lambda x: (-len(x), x[0]))
+
+
+def get_last_text_answers(question_id: int) -> QuerySet:
+    later_attempts = UserAnswer.objects.filter(user=OuterRef("user_id"), question=OuterRef("question_id"),
+                                               attempt_number__gt=OuterRef("attempt_number"))
+    return (UserAnswer.objects.filter(question_id=question_id).filter(~Exists(later_attempts))
+            .select_related("user", "admin_feedback_by", "question__quiz__course").order_by("pk"))
+
+
+def cluster_answers(question: Question, threshold: Optional[float] = None) -> list:
+    answers = list(get_last_text_answers(question.pk))
+    clusters = []
+    for indexes in cluster_texts([x.answer_text for x in answers], threshold):
+        members = [answers[x] for x in indexes]
+        # The most frequent wording stands for the cluster, the earliest answer if there is a tie.
+        counts = Counter(normalize_text(x.answer_text) for x in members)
+        representative = min(members, key=lambda x: (-counts[normalize_text(x.answer_text)], x.pk))
+        clusters.append(AnswerCluster(representative, members))
+    return clusters
+
+
+def grade_answers(question: Question, answer_ids: list, feedback: Optional[str], points: Optional[Decimal],
+                  coach: User) -> int:
+    user_answers = UserAnswer.objects.filter(question=question, pk__in=answer_ids)
+    if feedback and feedback.strip():
+        values = {"admin_feedback": feedback, "admin_feedback_on": timezone.now(), "admin_feedback_by": coach,
+                  "points": points or 0}
+    else:
+        values = {"admin_feedback": None, "admin_feedback_on": None, "admin_feedback_by": None, "points": None}
+    with transaction.atomic():
+        user_ids = set(user_answers.values_list("user_id", flat=True))
+        count = user_answers.update(**values)
+        # update() skips the signals which maintain the leaderboard and the search index.
+        rebuild_course_scores([question.quiz.course_id], user_ids)
+        index_documents(SearchDocument.ANSWER, user_answers)
+    return count
+
+
+def request_cluster_ai_feedback(question: Question, threshold: Optional[float] = None) -> int:
+    # One request per cluster; its response is copied to the members which have no AI feedback yet.
+    requests = 0
+    for cluster in cluster_answers(question, threshold):
+        missing = [x.pk for x in cluster.members if not x.ai_feedback]
+        if not missing:
+            continue
+        representative = cluster.representative
+        if not representative.ai_feedback:
+            ChatGPTLog.send_request(representative)
+            requests += 1
+        with transaction.atomic():
+            user_answers = UserAnswer.objects.filter(pk__in=missing).exclude(pk=representative.pk)
+            user_answers.update(ai_feedback=representative.ai_feedback, ai_feedback_on=representative.ai_feedback_on)
+            index_documents(SearchDocument.ANSWER, user_answers)
+    return requests
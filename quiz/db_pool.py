@@ -0,0 +1,32 @@
+import os
+
+
+def get_pool_options(workers: int, threads: int, max_connections: int) -> dict:
+    # Every worker process has a pool of its own, so the server budget is split between the workers. A worker never
+    # needs more connections than it has threads serving requests.
+    max_size = max(1, min(threads, max_connections // max(workers, 1)))
+    return {
+        "min_size": min(int(os.getenv("DATABASE_POOL_MIN_SIZE", 1)), max_size),
+        "max_size": max_size,
+        # Seconds a request waits for a free connection before it fails
+        "timeout": float(os.getenv("DATABASE_POOL_TIMEOUT", 10)),
+        # Idle connections above min_size are closed after this many seconds
+        "max_idle": float(os.getenv("DATABASE_POOL_MAX_IDLE", 300)),
+        # Connections are recycled after this many seconds, so server side resources are freed now and then
+        "max_lifetime": float(os.getenv("DATABASE_POOL_MAX_LIFETIME", 1800)),
+    }
+
+
+def get_pool_stats(alias: str = "default") -> dict:
+    from django.db import connections
+
+    pool = getattr(connections[alias], "pool", None)
+    if pool is None:
+        return {}
+    stats = pool.get_stats()
+    requests = stats.get("requests_num", 0)
+    return {
+        **stats,
+        "connections_in_use": stats.get("pool_size", 0) - stats.get("pool_available", 0),
+        "requests_wait_ms_avg": stats.get("requests_wait_ms", 0) / requests if requests else 0,
+    }
@@ -0,0 +1,70 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+
+PRIMARY_PIN_COOKIE = "primary_until"
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+@contextmanager
+def replica_reads():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    # Only code running inside replica_reads() reads from the replica, everything else stays on the primary.
+    def db_for_read(self, model, **hints):
+        # The database cache holds content versions, which must never lag behind.
+        if settings.REPLICA_DATABASE and _replica_reads.get() and model._meta.app_label != "django_cache":
+            return settings.REPLICA_DATABASE
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+def is_pinned_to_primary(request) -> bool:
+    try:
+        return float(request.COOKIES.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+class PrimaryPinMiddleware(MiddlewareMixin):
+    # After a write the client reads from the primary for a while, so it sees its own changes despite replica lag.
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and settings.REPLICA_DATABASE:
+            response.set_cookie(PRIMARY_PIN_COOKIE, str(time.time() + settings.REPLICA_PIN_SECONDS),
+                                max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite="Lax")
+        return response
+
+
+class ReplicaReadMixin:
+    # Marks a view as read-only: its GET requests are served from the replica unless the client has just written.
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in SAFE_METHODS or is_pinned_to_primary(request):
+            return super().dispatch(request, *args, **kwargs)
+        if self.view_is_async:
+            return self._adispatch_from_replica(request, *args, **kwargs)
+        with replica_reads():
+            response = super().dispatch(request, *args, **kwargs)
+            # Template responses are rendered lazily; their querysets must still be evaluated on the replica.
+            if hasattr(response, "render") and not response.is_rendered:
+                response.render()
+        return response
+
+    async def _adispatch_from_replica(self, request, *args, **kwargs):
+        with replica_reads():
+            return await super().dispatch(request, *args, **kwargs)
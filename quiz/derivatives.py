@@ -0,0 +1,126 @@
+import hashlib
+import io
+import logging
+import multiprocessing
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+DERIVATIVE_EXTENSIONS = ("png", "jpg", "jpeg")
+
+_executor = None
+
+
+def is_derivable(name: str) -> bool:
+    return name.lower().endswith(DERIVATIVE_EXTENSIONS)
+
+
+def derivative_name(content_hash: str, width: int) -> str:
+    return f"derivatives/{content_hash[:2]}/{content_hash}_{width}.webp"
+
+
+def render_derivatives(source_path: str, storage_root: str, widths: tuple) -> tuple:
+    # Runs in a worker process, so it must not touch the ORM or Django settings.
+    from PIL import Image, ImageOps
+
+    with open(source_path, "rb") as source_file:
+        data = source_file.read()
+    content_hash = hashlib.sha256(data).hexdigest()
+    with Image.open(io.BytesIO(data)) as original:
+        image = ImageOps.exif_transpose(original)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "A" in image.getbands() or "transparency" in image.info else "RGB")
+        variants = {}
+        for width in sorted(widths):
+            target_width = min(width, image.width)
+            if str(target_width) in variants:
+                continue
+            name = derivative_name(content_hash, target_width)
+            target_path = os.path.join(storage_root, name)
+            # Derivatives are content-addressed, so identical uploads share the files that already exist.
+            if not os.path.exists(target_path):
+                resized = image.copy()
+                resized.thumbnail((target_width, image.height))
+                os.makedirs(os.path.dirname(target_path), exist_ok=True)
+                with tempfile.NamedTemporaryFile(dir=os.path.dirname(target_path), suffix=".webp",
+                                                 delete=False) as target_file:
+                    resized.save(target_file, "WEBP", quality=80, method=4)
+                os.replace(target_file.name, target_path)
+            variants[str(target_width)] = name
+    return content_hash, variants
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # Spawned workers do not inherit the threads and open connections of the web server process.
+        _executor = ProcessPoolExecutor(max_workers=settings.ATTACHMENT_DERIVATIVE_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+    return _executor
+
+
+def _store_derivatives(source: str, content_hash: str, variants: dict):
+    from .models import AttachmentDerivative
+
+    AttachmentDerivative.objects.update_or_create(source=source, defaults={"content_hash": content_hash,
+                                                                           "variants": variants})
+
+
+def _store_future_result(source: str, future):
+    try:
+        _store_derivatives(source, *future.result())
+    except Exception:
+        logger.exception("Building derivatives of %s failed", source)
+    finally:
+        # Callbacks run on the executor's management thread, which would otherwise keep its connection open.
+        connection.close()
+
+
+def _derivative_job(source: str) -> tuple:
+    return default_storage.path(source), default_storage.location, tuple(settings.ATTACHMENT_DERIVATIVE_WIDTHS)
+
+
+def schedule_derivatives(sources: list):
+    from .models import AttachmentDerivative
+
+    sources = [x for x in sources if is_derivable(x)]
+    existing = set(AttachmentDerivative.objects.filter(source__in=sources).values_list("source", flat=True))
+    for source in sources:
+        if source in existing:
+            continue
+        if settings.ATTACHMENT_DERIVATIVE_WORKERS == 0:
+            try:
+                _store_derivatives(source, *render_derivatives(*_derivative_job(source)))
+            except Exception:
+                logger.exception("Building derivatives of %s failed", source)
+        else:
+            future = _get_executor().submit(render_derivatives, *_derivative_job(source))
+            future.add_done_callback(partial(_store_future_result, source))
+
+
+def build_derivatives(sources: list, workers: int) -> int:
+    jobs = [(source, _derivative_job(source)) for source in sources if is_derivable(source)]
+    built = 0
+    if workers == 0:
+        results = ((source, partial(render_derivatives, *job)) for source, job in jobs)
+    else:
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        results = [(source, executor.submit(render_derivatives, *job).result) for source, job in jobs]
+    try:
+        for source, result in results:
+            try:
+                _store_derivatives(source, *result())
+                built += 1
+            except Exception:
+                logger.exception("Building derivatives of %s failed", source)
+    finally:
+        if workers != 0:
+            executor.shutdown()
+    return built
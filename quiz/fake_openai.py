@@ -0,0 +1,78 @@
+import json
+import ssl
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeOpenAIHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connection_count += 1
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.request_count += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for token in self.server.tokens:
+            time.sleep(self.server.token_delay)
+            self._send_event({"choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+        self._send_event({"choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": len(self.server.tokens),
+                                                   "total_tokens": 10 + len(self.server.tokens)}})
+        self._send_chunk(b"data: [DONE]\n\n")
+        self._send_chunk(b"")
+
+    def _send_event(self, data: dict):
+        data = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4", **data}
+        self._send_chunk(f"data: {json.dumps(data)}\n\n".encode())
+
+    def _send_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+
+class FakeOpenAIServer:
+    # Local stand-in for the streaming chat completions API, used by tests and benchmarks.
+    def __init__(self, tokens=("Dobrá ", "odpověď."), token_delay: float = 0.0, certfile: str = None,
+                 keyfile: str = None):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), FakeOpenAIHandler)
+        self.server.daemon_threads = True
+        self.server.tokens = list(tokens)
+        self.server.token_delay = token_delay
+        self.server.request_count = 0
+        self.server.connection_count = 0
+        self.scheme = "http"
+        if certfile:
+            context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+            context.load_cert_chain(certfile, keyfile)
+            self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+            self.scheme = "https"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"{self.scheme}://127.0.0.1:{self.server.server_port}/v1"
+
+    @property
+    def request_count(self) -> int:
+        return self.server.request_count
+
+    @property
+    def connection_count(self) -> int:
+        return self.server.connection_count
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.server.shutdown()
+        self.server.server_close()
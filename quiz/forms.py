@@ -4,7 +4,7 @@ from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
 from django_recaptcha.fields import ReCaptchaField
 
-from .models import Course, Quiz, Question
+from .models import Course, Quiz, Question, SearchDocument
 
 
 class CourseForm(forms.ModelForm):
@@ -26,6 +26,24 @@ class QuestionForm(forms.ModelForm):
                   "attachment_3"]
 
 
+class SearchForm(forms.Form):
+    q = forms.CharField(max_length=200, label="Hledaný text")
+    course = forms.ModelChoiceField(Course.objects.all(), required=False, label="Kurz", empty_label="Všechny kurzy",
+                                    widget=forms.Select(attrs={"class": "form-control mr-2"}))
+    kind = forms.ChoiceField(choices=[("", "Vše"), *SearchDocument.KINDS], required=False, label="Hledat v",
+                             widget=forms.Select(attrs={"class": "form-control"}))
+
+
+class ClusterFeedbackForm(forms.Form):
+    answer_ids = forms.TypedMultipleChoiceField(coerce=int, required=False)
+    feedback = forms.CharField(required=False)
+    points = forms.DecimalField(max_digits=3, decimal_places=2, required=False)
+
+    def __init__(self, *args, answer_ids=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields["answer_ids"].choices = [(x, x) for x in answer_ids]
+
+
 class UserForm(forms.ModelForm):
     class Meta:
         model = User
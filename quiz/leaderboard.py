@@ -0,0 +1,85 @@
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import CourseScore, Question, UserAnswer
+
+
+def get_question_score(user_id: int, question_id: int) -> Decimal:
+    points = (UserAnswer.objects.filter(user_id=user_id, question_id=question_id).order_by("-attempt_number")
+              .values_list("points", flat=True).first())
+    return points or Decimal(0)
+
+
+def get_course_id(question_id: int) -> int:
+    return Question.objects.filter(pk=question_id).values_list("quiz__course_id", flat=True).get()
+
+
+def add_course_score(course_id: int, user_id: int, delta: Decimal, create: bool = True):
+    # The delta is applied in the database, so concurrent submissions of one student never overwrite each other.
+    if not delta and not create:
+        return
+    scores = CourseScore.objects.filter(course_id=course_id, user_id=user_id)
+    if scores.update(points=F("points") + delta, updated_at=timezone.now()) or not create:
+        return
+    try:
+        with transaction.atomic():
+            CourseScore.objects.create(course_id=course_id, user_id=user_id, points=delta)
+    except IntegrityError:
+        scores.update(points=F("points") + delta, updated_at=timezone.now())
+
+
+def calculate_course_scores(course_ids: Optional[Iterable] = None, user_ids: Optional[Iterable] = None) -> dict:
+    user_answers = UserAnswer.objects.all()
+    if course_ids is not None:
+        user_answers = user_answers.filter(course_id__in=course_ids)
+    if user_ids is not None:
+        user_answers = user_answers.filter(user_id__in=user_ids)
+    last_attempts = {}
+    for course_id, user_id, question_id, points in (
+            user_answers.order_by("attempt_number")
+            .values_list("course_id", "user_id", "question_id", "points").iterator()):
+        last_attempts[course_id, user_id, question_id] = points or Decimal(0)
+    scores = {}
+    for (course_id, user_id, _), points in last_attempts.items():
+        scores[course_id, user_id] = scores.get((course_id, user_id), Decimal(0)) + points
+    return scores
+
+
+def rebuild_course_scores(course_ids: Optional[Iterable] = None, user_ids: Optional[Iterable] = None) -> int:
+    scores = calculate_course_scores(course_ids, user_ids)
+    existing = CourseScore.objects.all()
+    if course_ids is not None:
+        existing = existing.filter(course_id__in=course_ids)
+    if user_ids is not None:
+        existing = existing.filter(user_id__in=user_ids)
+    with transaction.atomic():
+        existing.delete()
+        CourseScore.objects.bulk_create(CourseScore(course_id=course_id, user_id=user_id, points=points)
+                                        for (course_id, user_id), points in scores.items())
+    return len(scores)
+
+
+def find_score_mismatches(course_ids: Optional[Iterable] = None) -> list:
+    expected = calculate_course_scores(course_ids)
+    stored = CourseScore.objects.all()
+    if course_ids is not None:
+        stored = stored.filter(course_id__in=course_ids)
+    stored = {(x.course_id, x.user_id): x.points for x in stored}
+    return [(course_id, user_id, stored.get((course_id, user_id)), expected.get((course_id, user_id)))
+            for course_id, user_id in sorted(set(expected) | set(stored))
+            if stored.get((course_id, user_id), Decimal(0)) != expected.get((course_id, user_id), Decimal(0))]
+
+
+def get_top_scores(course_id: int, limit: int = 50) -> list:
+    scores = list(CourseScore.objects.filter(course_id=course_id).select_related("user")
+                  .order_by("-points", "user__username")[:limit])
+    rank = 0
+    for position, score in enumerate(scores, start=1):
+        if position == 1 or score.points != scores[position - 2].points:
+            rank = position
+        score.rank = rank
+    return scores
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from quiz.models import ChatGPTLog
+from quiz.retention import archive_chatgpt_logs
+
+
+class Command(BaseCommand):
+    help = ("Moves ChatGPT logs older than the retention period into the compressed archive table. Meant to be run "
+            "periodically, e.g. from cron.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.CHATGPT_LOG_RETENTION_DAYS,
+                            help="Archive logs older than this many days.")
+        parser.add_argument("--batch-size", type=int, default=500)
+        parser.add_argument("--max-batches", type=int, default=None,
+                            help="Stop after this many batches, to bound the run time of one scheduled run.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many logs would be archived.")
+
+    def handle(self, *args, **options):
+        older_than = timezone.now() - timedelta(days=options["days"])
+        if options["dry_run"]:
+            count = ChatGPTLog.objects.filter(created_at__lt=older_than).count()
+            self.stdout.write(f"Would archive {count} logs created before {older_than:%Y-%m-%d %H:%M}.")
+            return
+        count = archive_chatgpt_logs(older_than, batch_size=options["batch_size"],
+                                     max_batches=options["max_batches"])
+        self.stdout.write(f"Archived {count} logs created before {older_than:%Y-%m-%d %H:%M}.")
@@ -0,0 +1,92 @@
+import asyncio
+import statistics
+import time
+from importlib import import_module
+
+import httpx
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY, BACKEND_SESSION_KEY, HASH_SESSION_KEY
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+
+from quiz.models import Question
+
+
+class Command(BaseCommand):
+    help = ("Simulates a classroom of students opening the same question at once and reports throughput and latency "
+            "for each server URL, e.g. the sync gunicorn stack and the uvicorn stack side by side.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="Base URLs of running servers, e.g. http://127.0.0.1:8000")
+        parser.add_argument("--question", type=int, required=True)
+        parser.add_argument("--students", type=int, default=30)
+        parser.add_argument("--requests", type=int, default=10, help="Page loads per student.")
+        parser.add_argument("--submit", action="store_true",
+                            help="Every student also submits a text answer once, the question must be a text one.")
+
+    def _create_session_cookies(self, students: int) -> list:
+        # Sessions are written straight to the session store shared with the servers, so no logins are needed.
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        cookies = []
+        for number in range(students):
+            user, created = User.objects.get_or_create(username=f"benchmark-student-{number}")
+            if created:
+                user.set_unusable_password()
+                user.save()
+            session = session_store()
+            session[SESSION_KEY] = str(user.pk)
+            session[BACKEND_SESSION_KEY] = "django.contrib.auth.backends.ModelBackend"
+            session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+            session.save()
+            cookies.append({settings.SESSION_COOKIE_NAME: session.session_key})
+        return cookies
+
+    @staticmethod
+    async def _student(client: httpx.AsyncClient, path: str, page_loads: int, submit: bool, question_id: int,
+                       start: asyncio.Event, latencies: list, errors: list):
+        await start.wait()
+        for number in range(page_loads):
+            started = time.perf_counter()
+            try:
+                if submit and number == page_loads // 2:
+                    response = await client.post(path, data={"question_id": question_id, "answer_text": "Benchmark"},
+                                                 headers={"X-CSRFToken": client.cookies.get("csrftoken", ""),
+                                                          "Referer": str(client.base_url)})
+                else:
+                    response = await client.get(path)
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+            except httpx.HTTPError as error:
+                errors.append(error)
+
+    async def _run(self, base_url: str, cookies: list, path: str, options: dict) -> tuple:
+        start = asyncio.Event()
+        latencies, errors = [], []
+        limits = httpx.Limits(max_connections=1, max_keepalive_connections=1)
+        clients = [httpx.AsyncClient(base_url=base_url, cookies=x, limits=limits, timeout=60) for x in cookies]
+        tasks = [asyncio.create_task(self._student(client, path, options["requests"], options["submit"],
+                                                   options["question"], start, latencies, errors))
+                 for client in clients]
+        started = time.perf_counter()
+        start.set()
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        for client in clients:
+            await client.aclose()
+        return elapsed, latencies, errors
+
+    def handle(self, *args, **options):
+        Question.objects.get(pk=options["question"])
+        cookies = self._create_session_cookies(options["students"])
+        path = reverse("question", kwargs={"question_id": options["question"]})
+        self.stdout.write(f"{'server':40} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8} {'errors':>7}")
+        for base_url in options["urls"]:
+            elapsed, latencies, errors = asyncio.run(self._run(base_url, cookies, path, options))
+            if len(latencies) > 1:
+                quantiles = statistics.quantiles(latencies, n=100)
+                p50, p95, maximum = quantiles[49] * 1000, quantiles[94] * 1000, max(latencies) * 1000
+            else:
+                p50 = p95 = maximum = float("nan")
+            self.stdout.write(f"{base_url:40} {len(latencies) / elapsed:8.1f} {p50:8.1f} {p95:8.1f} {maximum:8.1f} "
+                              f"{len(errors):7}")
@@ -0,0 +1,60 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.db.utils import ConnectionHandler
+
+from quiz.db_pool import get_pool_options
+
+
+class Command(BaseCommand):
+    help = ("Measures the database part of a request (connect if needed, a few queries, request end) with a new "
+            "connection per request, persistent health-checked connections and, on Postgres, a connection pool.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Alias whose connection settings are used.")
+        parser.add_argument("--requests", type=int, default=200)
+        parser.add_argument("--queries", type=int, default=3, help="Queries per request.")
+
+    def _variants(self, settings_dict: dict) -> dict:
+        base = {**settings_dict, "OPTIONS": {k: v for k, v in settings_dict["OPTIONS"].items() if k != "pool"}}
+        variants = {
+            "new connection": {**base, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False},
+            "persistent": {**base, "CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True},
+        }
+        if settings_dict["ENGINE"] == "django.db.backends.postgresql":
+            variants["pool"] = {**base, "CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": True,
+                                "OPTIONS": {**base["OPTIONS"],
+                                            "pool": get_pool_options(workers=1, threads=1, max_connections=1)}}
+        return variants
+
+    @staticmethod
+    def _request(connection, queries: int):
+        # The same steps as django.db.close_old_connections at the start and the end of every request.
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            for _ in range(queries):
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+        connection.close_if_unusable_or_obsolete()
+
+    def handle(self, *args, **options):
+        settings_dict = connections[options["database"]].settings_dict
+        self.stdout.write(f"{'variant':16} {'mean ms':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for name, variant in self._variants(settings_dict).items():
+            alias = f"benchmark_{name.replace(' ', '_')}"
+            handler = ConnectionHandler({"default": dict(variant), alias: variant})
+            connection = handler[alias]
+            self._request(connection, options["queries"])
+            latencies = []
+            for _ in range(options["requests"]):
+                started = time.perf_counter()
+                self._request(connection, options["queries"])
+                latencies.append((time.perf_counter() - started) * 1000)
+            connection.close()
+            if getattr(connection, "pool", None):
+                connection.close_pool()
+            quantiles = statistics.quantiles(latencies, n=100)
+            self.stdout.write(f"{name:16} {statistics.mean(latencies):8.2f} {quantiles[49]:8.2f} "
+                              f"{quantiles[94]:8.2f}")
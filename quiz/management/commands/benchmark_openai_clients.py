@@ -0,0 +1,53 @@
+import os
+import subprocess
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from openai import OpenAI
+
+from quiz.ai_clients import get_openai_client
+from quiz.fake_openai import FakeOpenAIServer
+
+
+class Command(BaseCommand):
+    help = ("Compares a new OpenAI client per call with the pooled clients of quiz.ai_clients against a local HTTPS "
+            "stand-in of the API.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--calls", type=int, default=50)
+        parser.add_argument("--http", action="store_true", help="Use plain HTTP instead of a self-signed HTTPS server.")
+
+    @staticmethod
+    def _call(client: OpenAI):
+        stream = client.chat.completions.create(model="gpt-4", messages=[{"role": "user", "content": "Hi"}],
+                                                stream=True)
+        "".join(part.choices[0].delta.content or "" for part in stream if part.choices)
+
+    def _measure(self, server: FakeOpenAIServer, calls: int, new_client_per_call: bool) -> tuple:
+        connections = server.connection_count
+        started = time.perf_counter()
+        for _ in range(calls):
+            if new_client_per_call:
+                with OpenAI(api_key="benchmark", base_url=server.base_url) as client:
+                    self._call(client)
+            else:
+                self._call(get_openai_client("benchmark", server.base_url))
+        return (time.perf_counter() - started) / calls * 1000, server.connection_count - connections
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            certfile = keyfile = None
+            if not options["http"]:
+                certfile, keyfile = os.path.join(directory, "cert.pem"), os.path.join(directory, "key.pem")
+                subprocess.run(["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes", "-days", "1",
+                                "-subj", "/CN=127.0.0.1", "-addext", "subjectAltName=IP:127.0.0.1",
+                                "-keyout", keyfile, "-out", certfile], check=True, capture_output=True)
+                # httpx trusts SSL_CERT_FILE, so both client variants accept the self-signed certificate.
+                os.environ["SSL_CERT_FILE"] = certfile
+            with FakeOpenAIServer(tokens=["Ok"], certfile=certfile, keyfile=keyfile) as server:
+                self._call(get_openai_client("benchmark", server.base_url))
+                self.stdout.write(f"{'variant':24} {'ms per call':>12} {'connections':>12}")
+                for name, new_client_per_call in (("new client per call", True), ("pooled client", False)):
+                    per_call, connections = self._measure(server, options["calls"], new_client_per_call)
+                    self.stdout.write(f"{name:24} {per_call:12.2f} {connections:12}")
@@ -0,0 +1,75 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from quiz.models import Question, SearchDocument
+from quiz.search import SearchResults
+
+WORDS = ("seznam slovník funkce cyklus podmínka proměnná řetězec výjimka třída metoda modul soubor generátor "
+         "dekorátor iterace rekurze import lambda tuple množina hodnota klíč index výsledek vstup výstup chyba "
+         "program knihovna parametr argument návratová objekt instance atribut dědičnost").split()
+RARE_WORDS = ["comprehension", "asyncio", "metaclass"]
+QUERIES = ["funkce", "seznam slovník", "comprehension", "metaclass výjimka", "dekor"]
+
+
+class Command(BaseCommand):
+    help = ("Fills the search index with synthetic answers inside a transaction which is rolled back at the end, "
+            "and compares full-text searches with a LIKE scan of the same documents.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--question", type=int, required=True, help="Question the synthetic answers belong to.")
+        parser.add_argument("--answers", type=int, default=1_000_000)
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def _fill(self, question: Question, answers: int, batch_size: int):
+        generator = random.Random(0)
+        # Object ids above the real ones, so the synthetic documents never collide with indexed answers.
+        first_id = 10 ** 12
+        for start in range(0, answers, batch_size):
+            documents = []
+            for object_id in range(first_id + start, first_id + min(start + batch_size, answers)):
+                words = generator.choices(WORDS, k=generator.randint(5, 60))
+                if generator.random() < 0.001:
+                    words.append(generator.choice(RARE_WORDS))
+                documents.append(SearchDocument(kind=SearchDocument.ANSWER, object_id=object_id,
+                                                course_id=question.quiz.course_id, quiz_id=question.quiz_id,
+                                                question_id=question.pk, text=" ".join(words)))
+            SearchDocument.objects.bulk_create(documents)
+
+    @staticmethod
+    def _measure(function, iterations: int) -> tuple:
+        latencies = []
+        for _ in range(iterations):
+            started = time.perf_counter()
+            function()
+            latencies.append((time.perf_counter() - started) * 1000)
+        return statistics.mean(latencies), max(latencies)
+
+    def handle(self, *args, **options):
+        question = Question.objects.select_related("quiz").get(pk=options["question"])
+        with transaction.atomic():
+            started = time.perf_counter()
+            self._fill(question, options["answers"], options["batch_size"])
+            self.stdout.write(f"Indexed {options['answers']} answers in {time.perf_counter() - started:.1f} s")
+            self.stdout.write(f"{'query':22} {'matches':>9} {'fts ms':>9} {'fts max':>9} {'like ms':>9}")
+            for query in QUERIES:
+                def full_text_search():
+                    results = SearchResults(query)
+                    return results.count(), results[0:20]
+
+                def like_scan():
+                    documents = SearchDocument.objects.all()
+                    for term in query.split():
+                        documents = documents.filter(text__icontains=term)
+                    return documents.count(), list(documents[:20])
+
+                matches = full_text_search()[0]
+                fts_mean, fts_max = self._measure(full_text_search, options["iterations"])
+                # The scan is much slower, a few runs are enough.
+                like_mean = self._measure(like_scan, min(options["iterations"], 3))[0]
+                self.stdout.write(f"{query:22} {matches:9} {fts_mean:9.2f} {fts_max:9.2f} {like_mean:9.2f}")
+            transaction.set_rollback(True)
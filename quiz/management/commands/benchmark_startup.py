@@ -0,0 +1,79 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+HEAVY_MODULES = ["openai", "httpx", "pydantic", "markdown", "PIL", "numpy"]
+
+# Runs in a fresh interpreter, the same steps a worker takes before it serves the first request.
+WORKER_BOOT = """
+import json, resource, sys, time
+started = time.perf_counter()
+import django
+imported = time.perf_counter()
+django.setup()
+set_up = time.perf_counter()
+from django.conf import settings
+from django.template import engines
+from django.urls import get_resolver
+get_resolver().url_patterns
+for engine in engines.all():
+    getattr(engine, "engine", None) and engine.engine.template_libraries
+loaded = time.perf_counter()
+with open("/proc/self/status") as status:
+    rss = next((int(x.split()[1]) for x in status if x.startswith("VmRSS:")), 0)
+print(json.dumps({"import_ms": (imported - started) * 1000, "setup_ms": (set_up - imported) * 1000,
+                  "total_ms": (loaded - started) * 1000, "rss_mb": rss / 1024, "modules": len(sys.modules),
+                  "heavy": [x for x in %(heavy)r if x in sys.modules]}))
+"""
+
+
+class Command(BaseCommand):
+    help = ("Boots the app the way a worker does in fresh interpreters and reports import and django.setup() time, "
+            "memory and which heavy optional dependencies got imported.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--max-total-ms", type=float, default=None,
+                            help="Fail if the median boot takes longer, e.g. in CI.")
+        parser.add_argument("--max-rss-mb", type=float, default=None, help="Fail if the median RSS is higher.")
+        parser.add_argument("--importtime", action="store_true", help="Also list the slowest imports of one run.")
+
+    @staticmethod
+    def _boot(importtime: bool = False) -> subprocess.CompletedProcess:
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+        return subprocess.run([sys.executable, *(["-X", "importtime"] if importtime else []), "-c",
+                               WORKER_BOOT % {"heavy": HEAVY_MODULES}], env=env, capture_output=True, text=True,
+                              check=True, cwd=settings.BASE_DIR)
+
+    def _slowest_imports(self, stderr: str, count: int = 15) -> list:
+        imports = []
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line.removeprefix("import time:").split("|")
+            imports.append((int(cumulative) / 1000, name.rstrip()))
+        return sorted(imports, reverse=True)[:count]
+
+    def handle(self, *args, **options):
+        runs = [json.loads(self._boot().stdout) for _ in range(options["runs"])]
+        medians = {key: statistics.median(x[key] for x in runs)
+                   for key in ("import_ms", "setup_ms", "total_ms", "rss_mb", "modules")}
+        self.stdout.write(f"import django     {medians['import_ms']:8.1f} ms")
+        self.stdout.write(f"django.setup()    {medians['setup_ms']:8.1f} ms")
+        self.stdout.write(f"ready to serve    {medians['total_ms']:8.1f} ms")
+        self.stdout.write(f"RSS               {medians['rss_mb']:8.1f} MB")
+        self.stdout.write(f"modules           {medians['modules']:8.0f}")
+        self.stdout.write(f"heavy modules     {', '.join(runs[0]['heavy']) or '-'}")
+        if options["importtime"]:
+            self.stdout.write("\nslowest imports (cumulative ms):")
+            for milliseconds, name in self._slowest_imports(self._boot(importtime=True).stderr):
+                self.stdout.write(f"{milliseconds:8.1f} {name}")
+        if options["max_total_ms"] is not None and medians["total_ms"] > options["max_total_ms"]:
+            raise CommandError(f"Boot took {medians['total_ms']:.1f} ms, the limit is {options['max_total_ms']} ms.")
+        if options["max_rss_mb"] is not None and medians["rss_mb"] > options["max_rss_mb"]:
+            raise CommandError(f"RSS is {medians['rss_mb']:.1f} MB, the limit is {options['max_rss_mb']} MB.")
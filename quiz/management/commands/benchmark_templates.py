@@ -0,0 +1,60 @@
+import copy
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+
+from quiz.cache import bump_content_version
+from quiz.models import Question
+from quiz.views import AdminQuizReviewView, QuestionView
+
+UNCACHED_LOADERS = ["django.template.loaders.filesystem.Loader", "django.template.loaders.app_directories.Loader"]
+
+
+class Command(BaseCommand):
+    help = ("Measures rendering of the question page and the admin quiz review with and without the cached template "
+            "loader and with cold and warm fragment caches.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--question", type=int, required=True)
+        parser.add_argument("--iterations", type=int, default=200)
+
+    @staticmethod
+    def _templates(cached_loader: bool) -> list:
+        templates = copy.deepcopy(settings.TEMPLATES)
+        loaders = [("django.template.loaders.cached.Loader", UNCACHED_LOADERS)] if cached_loader else UNCACHED_LOADERS
+        templates[0].update({"APP_DIRS": False})
+        templates[0]["OPTIONS"]["loaders"] = loaders
+        return templates
+
+    def _measure(self, view, kwargs: dict, user: User, course_id: int, iterations: int, warm_fragments: bool):
+        factory = RequestFactory()
+        latencies = []
+        for _ in range(iterations + 1):
+            if not warm_fragments:
+                bump_content_version(course_id)
+            request = factory.get("/")
+            request.user = user
+            started = time.perf_counter()
+            view(request, **kwargs).render()
+            latencies.append((time.perf_counter() - started) * 1000)
+        # The first render fills the template and fragment caches, it is not part of the result.
+        return statistics.mean(latencies[1:]), statistics.quantiles(latencies[1:], n=100)[94]
+
+    def handle(self, *args, **options):
+        question = Question.objects.select_related("quiz").get(pk=options["question"])
+        user = User.objects.filter(is_superuser=True).first()
+        pages = [("question", QuestionView.as_view(), {"question_id": question.pk}),
+                 ("admin review", AdminQuizReviewView.as_view(), {"quiz_id": question.quiz_id})]
+        variants = [("uncached loader", False, False), ("cached loader", True, False),
+                    ("cached loader + fragments", True, True)]
+        self.stdout.write(f"{'page':14} {'variant':28} {'mean ms':>8} {'p95 ms':>8}")
+        for page, view, kwargs in pages:
+            for name, cached_loader, warm_fragments in variants:
+                with override_settings(TEMPLATES=self._templates(cached_loader)):
+                    mean, p95 = self._measure(view, kwargs, user, question.quiz.course_id, options["iterations"],
+                                              warm_fragments)
+                self.stdout.write(f"{page:14} {name:28} {mean:8.2f} {p95:8.2f}")
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from quiz.derivatives import build_derivatives, is_derivable
+from quiz.models import AttachmentDerivative, Question
+
+
+class Command(BaseCommand):
+    help = "Builds resized variants of image attachments of questions that do not have them yet."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.ATTACHMENT_DERIVATIVE_WORKERS or 1,
+                            help="Number of worker processes, 0 builds the derivatives in this process.")
+        parser.add_argument("--force", action="store_true", help="Rebuild derivatives that already exist.")
+
+    def handle(self, *args, **options):
+        sources = set()
+        for names in Question.objects.values_list("attachment_1", "attachment_2", "attachment_3"):
+            sources.update(x for x in names if x and is_derivable(x))
+        if not options["force"]:
+            sources -= set(AttachmentDerivative.objects.values_list("source", flat=True))
+        built = build_derivatives(sorted(sources), options["workers"])
+        self.stdout.write(f"Built derivatives for {built} of {len(sources)} attachments.")
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.cloning import clone_course, clone_quiz
+from quiz.models import Course, Quiz
+
+
+class Command(BaseCommand):
+    help = "Copies a course or a quiz with all its questions and options, e.g. for the next semester."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, help="Clone a course with all its quizzes.")
+        parser.add_argument("--quiz", type=int, help="Clone a single quiz.")
+        parser.add_argument("--to-course", type=int, help="Course the cloned quiz is added to, its own by default.")
+        parser.add_argument("--title", help="Title of the clone, the original title with \"(kopie)\" by default.")
+
+    def handle(self, *args, **options):
+        if bool(options["course"]) == bool(options["quiz"]):
+            raise CommandError("Select either --course or --quiz.")
+        start = time.perf_counter()
+        try:
+            if options["course"]:
+                clone = clone_course(Course.objects.get(pk=options["course"]), options["title"])
+            else:
+                course = Course.objects.get(pk=options["to_course"]) if options["to_course"] else None
+                clone = clone_quiz(Quiz.objects.get(pk=options["quiz"]), course, options["title"])
+        except (Course.DoesNotExist, Quiz.DoesNotExist) as error:
+            raise CommandError(error)
+        self.stdout.write(f"Created {type(clone).__name__.lower()} {clone.pk} \"{clone.title}\" "
+                          f"in {(time.perf_counter() - start) * 1000:.0f} ms.")
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.archive import export_course
+from quiz.models import Course
+
+
+class Command(BaseCommand):
+    help = "Writes a course with its quizzes, questions, options and attachments into a zip archive."
+
+    def add_arguments(self, parser):
+        parser.add_argument("course", type=int)
+        parser.add_argument("path", help="Path of the archive, e.g. python-2026.zip.")
+        parser.add_argument("--answers", action="store_true", help="Include the answers and their students.")
+
+    def handle(self, *args, **options):
+        try:
+            course = Course.objects.get(pk=options["course"])
+        except Course.DoesNotExist:
+            raise CommandError(f"Course {options['course']} does not exist.")
+        with open(options["path"], "wb") as archive:
+            counts = export_course(course, archive, include_answers=options["answers"])
+        self.stdout.write(", ".join(f"{count} {name}" for name, count in counts.items()))
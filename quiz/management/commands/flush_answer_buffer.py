@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from quiz.answer_buffer import flush_buffer
+
+
+class Command(BaseCommand):
+    help = ("Stores the text answers buffered by the write-behind mode. Run it once to replay the buffer after a "
+            "crash, or with --loop next to the web server on every machine.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--loop", action="store_true", help="Keep flushing until stopped.")
+        parser.add_argument("--interval", type=float, default=1.0, help="Seconds between flushes with --loop.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        while True:
+            inserted = flush_buffer(options["batch_size"])
+            if inserted or not options["loop"]:
+                self.stdout.write(f"Stored {inserted} buffered answers.")
+            if not options["loop"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,23 @@
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.archive import import_course
+
+
+class Command(BaseCommand):
+    help = ("Imports a course archive written by export_course. Rows are matched with the existing ones by their "
+            "natural keys, so importing the same archive again changes nothing.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["path"], "rb") as archive:
+                course, counts = import_course(archive)
+        except (OSError, ValueError, zipfile.BadZipFile) as error:
+            raise CommandError(error)
+        self.stdout.write(f"Imported course {course.pk} \"{course.title}\".")
+        for name, count in sorted(counts.items()):
+            self.stdout.write(f"{name}: {count}")
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.leaderboard import find_score_mismatches, rebuild_course_scores
+
+
+class Command(BaseCommand):
+    help = "Recalculates the course leaderboards from the answers, or only reports the scores which differ."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--course", type=int, action="append", default=None, help="Only this course.")
+        parser.add_argument("--check", action="store_true",
+                            help="Only report the differences, exits with an error if there are any.")
+
+    def handle(self, *args, **options):
+        if options["check"]:
+            mismatches = find_score_mismatches(options["course"])
+            for course_id, user_id, stored, expected in mismatches:
+                self.stdout.write(f"course {course_id}, user {user_id}: stored {stored}, expected {expected}")
+            if mismatches:
+                raise CommandError(f"{len(mismatches)} scores differ from the answers.")
+            self.stdout.write("All scores match the answers.")
+            return
+        count = rebuild_course_scores(options["course"])
+        self.stdout.write(f"Rebuilt {count} scores.")
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from quiz.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuilds the full-text search index of questions, options and answers from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = rebuild_search_index(options["batch_size"])
+        self.stdout.write(f"Indexed {count} documents.")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from quiz.models import Question
+from quiz.regrade import regrade_questions
+
+
+class Command(BaseCommand):
+    help = "Recalculates points of multiple choice answers after the correct options of questions changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--quiz", type=int, action="append", default=[], help="Regrade all questions of a quiz.")
+        parser.add_argument("--question", type=int, action="append", default=[], help="Regrade a single question.")
+        parser.add_argument("--dry-run", action="store_true", help="Only report the changes, do not save them.")
+        parser.add_argument("--chunk-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        if not options["quiz"] and not options["question"]:
+            raise CommandError("Select the questions to regrade with --quiz or --question.")
+        questions = (Question.objects.filter(quiz_id__in=options["quiz"])
+                     | Question.objects.filter(pk__in=options["question"]))
+        changes = regrade_questions(questions, dry_run=options["dry_run"], chunk_size=options["chunk_size"])
+        for change in changes:
+            self.stdout.write(str(change))
+        verb = "Would change" if options["dry_run"] else "Changed"
+        self.stdout.write(f"{verb} points of {len(changes)} answers.")
@@ -0,0 +1,61 @@
+import glob
+import json
+from collections import Counter
+from dataclasses import dataclass, field
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+@dataclass
+class QueryStats:
+    statement: str
+    count: int = 0
+    estimated_count: float = 0
+    total_ms: float = 0
+    max_ms: float = 0
+    call_sites: Counter = field(default_factory=Counter)
+
+
+class Command(BaseCommand):
+    help = "Summarizes the slow query log: the queries which took the most time and the code which issued them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=settings.SLOW_QUERY_LOG_FILE,
+                            help="Slow query log, its rotated files are read as well.")
+        parser.add_argument("--top", type=int, default=10)
+        parser.add_argument("--since", help="Only queries logged at or after this ISO time, e.g. 2026-10-19T08:00.")
+        parser.add_argument("--order-by", choices=["total", "count", "max"], default="total")
+
+    def handle(self, *args, **options):
+        paths = sorted(glob.glob(glob.escape(options["file"]) + ".*")) + glob.glob(glob.escape(options["file"]))
+        if not paths:
+            raise CommandError(f"No slow query log at {options['file']}.")
+        queries = {}
+        for path in paths:
+            with open(path, encoding="utf-8") as log:
+                for line in log:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if options["since"] and entry["time"] < options["since"]:
+                        continue
+                    stats = queries.setdefault(entry["fingerprint"], QueryStats(entry["statement"]))
+                    stats.count += 1
+                    # Sampled queries stand for 1 / sample rate queries each.
+                    stats.estimated_count += 1 / entry.get("sample_rate", 1)
+                    stats.total_ms += entry["duration_ms"] / entry.get("sample_rate", 1)
+                    stats.max_ms = max(stats.max_ms, entry["duration_ms"])
+                    stats.call_sites[entry["call_site"]] += 1
+        order = {"total": lambda x: x.total_ms, "count": lambda x: x.estimated_count,
+                 "max": lambda x: x.max_ms}[options["order_by"]]
+        top = sorted(queries.items(), key=lambda x: order(x[1]), reverse=True)[:options["top"]]
+        for fingerprint, stats in top:
+            self.stdout.write(f"{fingerprint}  ~{stats.estimated_count:.0f} queries ({stats.count} logged), "
+                              f"~{stats.total_ms / 1000:.1f} s total, {stats.total_ms / stats.estimated_count:.0f} ms "
+                              f"avg, {stats.max_ms:.0f} ms max")
+            for call_site, count in stats.call_sites.most_common(3):
+                self.stdout.write(f"    {count:>6}  {call_site}")
+            self.stdout.write(f"    {stats.statement[:300]}")
+        self.stdout.write(f"{len(queries)} distinct slow queries in {len(paths)} files.")
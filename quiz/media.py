@@ -0,0 +1,92 @@
+import posixpath
+import re
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .cache import get_media_access_cache_key
+from .metrics import count_cache_lookup
+from .models import AttachmentDerivative, Course, Quiz, Question
+
+MEDIA_PUBLIC = "public"
+MEDIA_LOGIN_REQUIRED = "login_required"
+# Cached for names no attachment refers to, as the cache cannot tell None from a miss
+MEDIA_NOT_FOUND = "not_found"
+
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+DERIVATIVE_RE = re.compile(r"^derivatives/[0-9a-f]{2}/([0-9a-f]{64})_\d+\.webp$")
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+class RangeFile:
+    # Limits reads to one byte range while still exposing fileno(), so gunicorn can sendfile() just that range.
+    def __init__(self, file, start: int, length: int):
+        self.file = file
+        self.file.seek(start)
+        self.remaining = length
+
+    def read(self, size: int = -1) -> bytes:
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def fileno(self) -> int:
+        return self.file.fileno()
+
+    def close(self):
+        self.file.close()
+
+
+def _find_media_access(name: str) -> str:
+    match = DERIVATIVE_RE.match(name)
+    if match:
+        variants = AttachmentDerivative.objects.filter(content_hash=match.group(1)).values_list("variants", flat=True)
+        return MEDIA_LOGIN_REQUIRED if any(name in x.values() for x in variants) else MEDIA_NOT_FOUND
+    if Course.objects.filter(attachment=name).exists():
+        return MEDIA_PUBLIC
+    if (Quiz.objects.filter(attachment=name).exists()
+            or Question.objects.filter(Q(attachment_1=name) | Q(attachment_2=name) | Q(attachment_3=name)).exists()):
+        return MEDIA_LOGIN_REQUIRED
+    return MEDIA_NOT_FOUND
+
+
+def get_media_access(name: str) -> Optional[str]:
+    # Only names stored by the app itself are served, never a path leading out of them.
+    if name.startswith("/") or posixpath.normpath(name) != name:
+        return None
+    key = get_media_access_cache_key(name)
+    access = cache.get(key)
+    count_cache_lookup("media_access", access is not None)
+    if access is None:
+        access = _find_media_access(name)
+        cache.set(key, access, settings.MEDIA_ACCESS_CACHE_TIMEOUT)
+    return None if access == MEDIA_NOT_FOUND else access
+
+
+def parse_range(header: str, size: int) -> Optional[tuple]:
+    # Returns the inclusive (start, end) of a single byte range, or None when the whole file should be sent.
+    match = RANGE_RE.match(header.strip()) if header else None
+    if match is None:
+        return None
+    start, end = match.groups()
+    if not start and not end:
+        return None
+    if not start:
+        suffix_length = int(end)
+        if suffix_length == 0:
+            raise RangeNotSatisfiable
+        return max(size - suffix_length, 0), size - 1
+    start = int(start)
+    end = min(int(end), size - 1) if end else size - 1
+    if start >= size:
+        raise RangeNotSatisfiable
+    if end < start:
+        return None
+    return start, end
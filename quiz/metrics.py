@@ -0,0 +1,123 @@
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+from prometheus_client import multiprocess
+
+# Under gunicorn every worker writes its samples into files in PROMETHEUS_MULTIPROC_DIR (set by gunicorn.conf.py),
+# and /metrics sums the files of all workers.
+REQUEST_DURATION = Histogram("quiz_http_request_duration_seconds", "Time until the response of a request is ready.",
+                             ["view", "method", "status"])
+REQUEST_DB_QUERIES = Histogram("quiz_http_request_db_queries", "Database queries run by one request.", ["view"],
+                               buckets=(0, 1, 2, 5, 10, 20, 50, 100, 200, 500))
+REQUEST_DB_DURATION = Histogram("quiz_http_request_db_duration_seconds",
+                                "Time one request spent waiting for database queries.", ["view"])
+EVALUATE_RESPONSE_DURATION = Histogram("quiz_evaluate_response_duration_seconds",
+                                       "Time to score and save a choice answer.", ["type"])
+OPENAI_REQUEST_DURATION = Histogram("quiz_openai_request_duration_seconds",
+                                    "Time of an AI feedback request until the last streamed token.",
+                                    ["model", "outcome"], buckets=(0.5, 1, 2, 5, 10, 20, 30, 60, 120))
+OPENAI_TOKENS = Counter("quiz_openai_tokens", "Tokens used by AI feedback requests.", ["model", "kind"])
+OPENAI_ERRORS = Counter("quiz_openai_errors", "Failed AI feedback requests.", ["model", "error"])
+CACHE_LOOKUPS = Counter("quiz_cache_lookups", "Lookups of values the app caches.", ["cache", "result"])
+
+# Query count and seconds of the request being served; sync_to_async copies it into the threads of async views.
+_request_queries = ContextVar("request_queries", default=None)
+
+
+def record_query(execute, sql, params, many, context):
+    queries = _request_queries.get()
+    if queries is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        queries[0] += 1
+        queries[1] += time.perf_counter() - start
+
+
+def install_query_recorder(connection):
+    # The wrappers stay on the connection object, which is reused when it reconnects.
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def count_cache_lookup(cache_name: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+@contextmanager
+def observe_openai_request(model: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as error:
+        OPENAI_ERRORS.labels(model, type(error).__name__).inc()
+        OPENAI_REQUEST_DURATION.labels(model, "error").observe(time.perf_counter() - start)
+        raise
+    OPENAI_REQUEST_DURATION.labels(model, "ok").observe(time.perf_counter() - start)
+
+
+def count_openai_tokens(model: str, usage):
+    OPENAI_TOKENS.labels(model, "prompt").inc(usage.prompt_tokens)
+    OPENAI_TOKENS.labels(model, "completion").inc(usage.completion_tokens)
+
+
+def render_metrics() -> tuple:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+class MetricsMiddleware:
+    # Times every request and counts its queries, labelled with the name of the URL pattern.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        queries = [0, 0.0]
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, start, queries)
+        return response
+
+    async def __acall__(self, request):
+        queries = [0, 0.0]
+        token = _request_queries.set(queries)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_queries.reset(token)
+        self._observe(request, response, start, queries)
+        return response
+
+    @staticmethod
+    def _observe(request, response, start: float, queries: list):
+        view = getattr(request.resolver_match, "view_name", None) or "unmatched"
+        REQUEST_DURATION.labels(view, request.method, response.status_code).observe(time.perf_counter() - start)
+        REQUEST_DB_QUERIES.labels(view).observe(queries[0])
+        REQUEST_DB_DURATION.labels(view).observe(queries[1])
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.5 on 2026-10-19 05:26
+
+from decimal import Decimal
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def fill_course_scores(apps, schema_editor):
+    UserAnswer = apps.get_model("quiz", "UserAnswer")
+    CourseScore = apps.get_model("quiz", "CourseScore")
+    last_attempts = {}
+    for course_id, user_id, question_id, points in (
+            UserAnswer.objects.order_by("attempt_number")
+            .values_list("question__quiz__course_id", "user_id", "question_id", "points").iterator()):
+        last_attempts[course_id, user_id, question_id] = points or Decimal(0)
+    scores = {}
+    for (course_id, user_id, _), points in last_attempts.items():
+        scores[course_id, user_id] = scores.get((course_id, user_id), Decimal(0)) + points
+    CourseScore.objects.bulk_create(CourseScore(course_id=course_id, user_id=user_id, points=points)
+                                    for (course_id, user_id), points in scores.items())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0010_chatgptlog_archive'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('points', models.DecimalField(decimal_places=2, default=0, max_digits=8)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='quiz.course')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_scores', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['course', '-points'], name='quiz_coursescore_ranking')],
+                'unique_together': {('course', 'user')},
+            },
+        ),
+        migrations.RunPython(fill_course_scores, migrations.RunPython.noop),
+    ]
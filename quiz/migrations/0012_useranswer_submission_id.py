@@ -0,0 +1,18 @@
+# Generated by Django 5.1.5 on 2026-10-19 05:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0011_coursescore'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranswer',
+            name='submission_id',
+            field=models.UUIDField(blank=True, editable=False, null=True, unique=True),
+        ),
+    ]
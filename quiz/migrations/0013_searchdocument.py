@@ -0,0 +1,88 @@
+# Generated by Django 5.1.5 on 2026-10-19 05:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Q, Value
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE quiz_searchdocument_fts USING fts5(text, content='quiz_searchdocument', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER quiz_searchdocument_fts_insert AFTER INSERT ON quiz_searchdocument BEGIN "
+    "INSERT INTO quiz_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER quiz_searchdocument_fts_delete AFTER DELETE ON quiz_searchdocument BEGIN "
+    "INSERT INTO quiz_searchdocument_fts(quiz_searchdocument_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "END",
+    "CREATE TRIGGER quiz_searchdocument_fts_update AFTER UPDATE OF text ON quiz_searchdocument BEGIN "
+    "INSERT INTO quiz_searchdocument_fts(quiz_searchdocument_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO quiz_searchdocument_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+POSTGRESQL_INDEX = [
+    "ALTER TABLE quiz_searchdocument ADD COLUMN search_vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple'::regconfig, text)) STORED",
+    "CREATE INDEX quiz_searchdocument_search_vector ON quiz_searchdocument USING GIN (search_vector)",
+]
+
+
+def create_search_index(apps, schema_editor):
+    statements = {"sqlite": SQLITE_INDEX, "postgresql": POSTGRESQL_INDEX}.get(schema_editor.connection.vendor, [])
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        schema_editor.execute("DROP TABLE quiz_searchdocument_fts")
+
+
+def fill_search_documents(apps, schema_editor):
+    Question = apps.get_model("quiz", "Question")
+    Option = apps.get_model("quiz", "Option")
+    UserAnswer = apps.get_model("quiz", "UserAnswer")
+    SearchDocument = apps.get_model("quiz", "SearchDocument")
+    no_user = Value(None, output_field=models.BigIntegerField())
+    sources = [
+        ("question", Question.objects.values_list("id", "id", "quiz_id", "quiz__course_id", no_user, "text")),
+        ("option", Option.objects.values_list("id", "question_id", "question__quiz_id", "question__quiz__course_id",
+                                              no_user, "text", "feedback")),
+        ("answer", UserAnswer.objects.filter(Q(answer_text__gt="") | Q(admin_feedback__gt="") | Q(ai_feedback__gt=""))
+         .values_list("id", "question_id", "question__quiz_id", "question__quiz__course_id", "user_id", "answer_text",
+                      "admin_feedback", "ai_feedback")),
+    ]
+    for kind, rows in sources:
+        documents = []
+        for object_id, question_id, quiz_id, course_id, user_id, *texts in rows.iterator():
+            text = "\n".join(x for x in texts if x)
+            if text:
+                documents.append(SearchDocument(kind=kind, object_id=object_id, course_id=course_id, quiz_id=quiz_id,
+                                                question_id=question_id, user_id=user_id, text=text))
+        SearchDocument.objects.bulk_create(documents, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0012_useranswer_submission_id'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('question', 'Otázka'), ('option', 'Možnost'), ('answer', 'Odpověď')], max_length=10)),
+                ('object_id', models.PositiveBigIntegerField()),
+                ('text', models.TextField()),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.course')),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.question')),
+                ('quiz', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='quiz.quiz')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('kind', 'object_id')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(fill_search_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-19 06:01
+
+from django.db import migrations, models
+
+
+def fill_selected_option_ids(apps, schema_editor):
+    UserAnswer = apps.get_model("quiz", "UserAnswer")
+    through_model = UserAnswer.selected_options.through
+    batch = []
+    # The rows are ordered by answer, so the options of one answer are consecutive and written in batches.
+    for user_answer_id, option_id in (through_model.objects.order_by("useranswer_id", "option_id")
+                                      .values_list("useranswer_id", "option_id").iterator()):
+        if batch and batch[-1].id == user_answer_id:
+            batch[-1].selected_option_ids.append(option_id)
+            continue
+        if len(batch) == 1000:
+            UserAnswer.objects.bulk_update(batch, ["selected_option_ids"])
+            batch = []
+        batch.append(UserAnswer(id=user_answer_id, selected_option_ids=[option_id]))
+    UserAnswer.objects.bulk_update(batch, ["selected_option_ids"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('quiz', '0013_searchdocument'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranswer',
+            name='selected_option_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(fill_selected_option_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.1.5 on 2026-10-19 06:40
+
+import django.db.models.deletion
+from django.db import migrations, models, transaction
+
+
+def fill_quiz_and_course(apps, schema_editor):
+    Question = apps.get_model("quiz", "Question")
+    UserAnswer = apps.get_model("quiz", "UserAnswer")
+    # One short transaction per question, so the answer table is never locked as a whole.
+    for question_id, quiz_id, course_id in Question.objects.values_list("id", "quiz_id", "quiz__course_id").iterator():
+        with transaction.atomic():
+            UserAnswer.objects.filter(question_id=question_id, quiz__isnull=True).update(quiz_id=quiz_id,
+                                                                                         course_id=course_id)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('quiz', '0014_useranswer_selected_option_ids'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='useranswer',
+            name='quiz',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.RESTRICT, to='quiz.quiz'),
+        ),
+        migrations.AddField(
+            model_name='useranswer',
+            name='course',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.RESTRICT, to='quiz.course'),
+        ),
+        migrations.RunPython(fill_quiz_and_course, migrations.RunPython.noop, atomic=False),
+        migrations.AlterField(
+            model_name='useranswer',
+            name='quiz',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.RESTRICT, to='quiz.quiz'),
+        ),
+        migrations.AlterField(
+            model_name='useranswer',
+            name='course',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.RESTRICT, to='quiz.course'),
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['quiz', 'user'], name='quiz_useranswer_quiz_user'),
+        ),
+        migrations.AddIndex(
+            model_name='useranswer',
+            index=models.Index(fields=['course', 'user'], name='quiz_useranswer_course_user'),
+        ),
+    ]
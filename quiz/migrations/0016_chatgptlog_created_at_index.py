@@ -0,0 +1,36 @@
+# Generated by Django 5.1.5 on 2026-10-19 09:10
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+from django.db.migrations.operations import AddIndex
+
+
+class AddIndexConcurrentlyOnPostgreSQL(AddIndexConcurrently):
+    # The log table is the largest one; a plain CREATE INDEX would block its writes until the index is built.
+    # Other databases have no concurrent build and create the index as usual.
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('quiz', '0015_useranswer_quiz_course'),
+    ]
+
+    operations = [
+        AddIndexConcurrentlyOnPostgreSQL(
+            model_name='chatgptlog',
+            index=models.Index(fields=['created_at'], name='quiz_chatgptlog_created_at'),
+        ),
+    ]
@@ -1,11 +1,21 @@
 import decimal
+import json
 import os
+import time
+import zlib
+from dataclasses import dataclass
 from typing import Optional
 
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
 from django.db import models
-from django.db.models import QuerySet, Q, JSONField, Max
-from openai import OpenAI
+from django.db.models import Q, JSONField, Max, Count
+
+from .ai_clients import get_openai_client
+from .cache import get_answer_key_cache_key, is_cache_process_local
+from .metrics import EVALUATE_RESPONSE_DURATION, count_cache_lookup, count_openai_tokens, observe_openai_request
 
 
 class Course(models.Model):
@@ -53,10 +63,7 @@ class Course(models.Model):
 
     @property
     def has_answers(self) -> bool:
-        for quiz in self.quiz_set.all():
-            if quiz.has_answers:
-                return True
-        return False
+        return self.useranswer_set.exists()
 
     def __str__(self):
         return self.title
@@ -80,17 +87,17 @@ class Quiz(models.Model):
 
     def quiz_completed_questions_ids(self, user: User):
         questions_ids = set(self.question_set.values_list("id", flat=True))
-        user_answers_text_questions_ids = list(UserAnswer.objects.filter(question__quiz=self, user=user,
+        user_answers_text_questions_ids = list(UserAnswer.objects.filter(quiz=self, user=user,
                                                                          question__type__in=[Question.SHORT_TEXT,
                                                                                              Question.LONG_TEXT])
                                                .values_list("question_id", flat=True))
-        user_answers_correct_questions_ids = list(UserAnswer.objects.filter(question__quiz=self, user=user,
+        user_answers_correct_questions_ids = list(UserAnswer.objects.filter(quiz=self, user=user,
                                                                             question__type__in=[
                                                                                 Question.MULTIPLE_CHOICE_SINGLE_ANSWER,
                                                                                 Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER],
                                                                             points__exact=1)
                                                   .values_list("question_id", flat=True))
-        user_answers_incorrect_questions = (UserAnswer.objects.filter(question__quiz=self, user=user,
+        user_answers_incorrect_questions = (UserAnswer.objects.filter(quiz=self, user=user,
                                                                       question__type__in=[
                                                                           Question.MULTIPLE_CHOICE_SINGLE_ANSWER,
                                                                           Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER],
@@ -108,15 +115,24 @@ class Quiz(models.Model):
 
     @property
     def has_answers(self) -> bool:
-        for question in self.question_set.all():
-            if question.useranswer_set.exists():
-                return True
-        return False
+        return self.useranswer_set.exists()
 
     def __str__(self):
         return self.title
 
 
+@dataclass(frozen=True)
+class AnswerKey:
+    quiz_id: int
+    course_id: int
+    option_ids: frozenset
+    correct_option_ids: frozenset
+
+    @property
+    def option_count(self) -> int:
+        return len(self.option_ids)
+
+
 class Question(models.Model):
     SHORT_TEXT = 'ST'
     LONG_TEXT = 'LT'
@@ -153,16 +169,25 @@ class Question(models.Model):
                                [x for x in attachment_list if not is_image(x.path)])
         return ordered_attachments
 
+    @property
+    def attachment_derivatives(self) -> dict:
+        if not hasattr(self, "_attachment_derivatives"):
+            names = [x.name for x in [self.attachment_1, self.attachment_2, self.attachment_3] if x]
+            self._attachment_derivatives = {x.source: x for x in AttachmentDerivative.objects.filter(source__in=names)}
+        return self._attachment_derivatives
+
     def last_question(self, user):
         return self.next_question(user) is None
 
     def next_question(self, user):
-        user_answers = UserAnswer.objects.filter(question__quiz=self.quiz).values_list("question_id", flat=True)
+        user_answers = (UserAnswer.objects.filter(quiz=self.quiz_id, user=user)
+                        .values_list("question_id", flat=True))
         return (self.quiz.question_set.filter(order__gt=self.order).filter(~Q(id__in=user_answers)).order_by("order")
                 .first())
 
     def previous_question(self, user):
-        user_answers = UserAnswer.objects.filter(question__quiz=self.quiz).values_list("question_id", flat=True)
+        user_answers = (UserAnswer.objects.filter(quiz=self.quiz_id, user=user)
+                        .values_list("question_id", flat=True))
         return (self.quiz.question_set.filter(order__lt=self.order).filter(~Q(id__in=user_answers)).order_by("order")
                 .last())
 
@@ -191,47 +216,77 @@ class Question(models.Model):
                     option.save()
 
     @staticmethod
-    def __calculate_points(selected_options_set: set, correct_option_set: set) -> float:
+    def calculate_points(correctly_chosen: int, incorrectly_chosen: int, total_correct_options: int,
+                         missed_correct_options: int) -> float:
         max_points = 1.0
         min_points = 0.0
 
-        correctly_chosen = len(selected_options_set.intersection(correct_option_set))
-        incorrectly_chosen = len(selected_options_set.difference(correct_option_set))
-        total_correct_options = len(correct_option_set)
         if total_correct_options > 0:
             points_for_correct = correctly_chosen / total_correct_options
         else:
             points_for_correct = 0
-        penalty_per_incorrect = 1 / (len(correct_option_set) + len(correct_option_set.difference(selected_options_set)))
+        penalty_per_incorrect = 1 / (total_correct_options + missed_correct_options)
         penalty = incorrectly_chosen * penalty_per_incorrect
         total_points = max_points * points_for_correct - penalty
         return max(min_points, total_points)
 
+    @staticmethod
+    def __calculate_points(selected_options_set: set, correct_option_set: set) -> float:
+        return Question.calculate_points(len(selected_options_set.intersection(correct_option_set)),
+                                         len(selected_options_set.difference(correct_option_set)),
+                                         len(correct_option_set),
+                                         len(correct_option_set.difference(selected_options_set)))
+
+    def _load_answer_key(self) -> AnswerKey:
+        course_id = Quiz.objects.filter(pk=self.quiz_id).values_list("course_id", flat=True).get()
+        options = list(self.option_set.values_list("id", "is_correct"))
+        return AnswerKey(self.quiz_id, course_id, frozenset(x for x, _ in options),
+                         frozenset(x for x, correct in options if correct))
+
+    def get_answer_key(self) -> AnswerKey:
+        # Other workers would keep scoring with a stale key, their copies of a process-local cache are never deleted.
+        if settings.SHARED_CACHE_REQUIRED and is_cache_process_local():
+            return self._load_answer_key()
+        key = get_answer_key_cache_key(self.pk)
+        answer_key = cache.get(key)
+        count_cache_lookup("answer_key", answer_key is not None)
+        if answer_key is None:
+            answer_key = self._load_answer_key()
+            cache.set(key, answer_key, settings.ANSWER_KEY_CACHE_TIMEOUT)
+        return answer_key
+
     def evaluate_response(self, post_data, user):
+        with EVALUATE_RESPONSE_DURATION.labels(self.type).time():
+            return self._evaluate_response(post_data, user)
+
+    def _evaluate_response(self, post_data, user):
+        # Scored against the cached answer key, so a submission only runs the queries of saving the answer.
+        answer_key = self.get_answer_key()
         is_correct = True
-        selected_options = None
-        missing = 0
-        selected_options_queryset = []
+        selected_option_ids = []
         points = 0
         if self.type == self.MULTIPLE_CHOICE_SINGLE_ANSWER:
             user_answer = int(post_data.get("selected_option"))
-            selected_options_queryset = self.option_set.filter(pk=user_answer)
-            is_correct = selected_options_queryset.first().is_correct
+            if user_answer not in answer_key.option_ids:
+                raise ValueError(f"Option {user_answer} does not belong to question {self.pk}")
+            is_correct = user_answer in answer_key.correct_option_ids
+            selected_option_ids = [user_answer]
         elif self.type == self.MULTIPLE_CHOICE_MULTIPLE_ANSWER:
-            selected_options = {key: value for key, value in post_data.items() if 'option_' in key}
-            selected_options_queryset = Option.objects.filter(id__in=selected_options.values())
-            selected_options_set = set(selected_options_queryset.values_list("id", flat=True))
-            correct_option_set = set(self.option_set.filter(is_correct=True).values_list("id", flat=True))
+            selected_options_set = {int(value) for key, value in post_data.items()
+                                    if 'option_' in key} & answer_key.option_ids
+            correct_option_set = set(answer_key.correct_option_ids)
             points = self.__calculate_points(selected_options_set, correct_option_set)
             is_correct = selected_options_set == correct_option_set
-            missing = len(correct_option_set) - len(selected_options_set)
-        user_answer = UserAnswer(question=self, user=user)
+            selected_option_ids = sorted(selected_options_set)
+        user_answer = UserAnswer(question=self, user=user, quiz_id=answer_key.quiz_id, course_id=answer_key.course_id,
+                                 selected_option_ids=selected_option_ids)
         if self.type == self.MULTIPLE_CHOICE_SINGLE_ANSWER:
             user_answer.points = is_correct
         elif self.type == self.MULTIPLE_CHOICE_MULTIPLE_ANSWER:
             user_answer.points = points
         user_answer.save()
-        user_answer.selected_options.set(selected_options_queryset)
+        if settings.SELECTED_OPTIONS_M2M_WRITES:
+            user_answer.selected_options.set(selected_option_ids)
         return user_answer
 
 
@@ -261,7 +316,12 @@ class Option(models.Model):
 class UserAnswer(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     question = models.ForeignKey(Question, on_delete=models.RESTRICT)
+    # Copies of question.quiz and its course, set on insert, so answers are filtered without joining the questions
+    quiz = models.ForeignKey(Quiz, on_delete=models.RESTRICT, db_index=False, editable=False)
+    course = models.ForeignKey(Course, on_delete=models.RESTRICT, db_index=False, editable=False)
+    # Only written with SELECTED_OPTIONS_M2M_WRITES, selected_option_ids is the source of truth
     selected_options = models.ManyToManyField(Option)
+    selected_option_ids = JSONField(default=list, blank=True)
     answered_on = models.DateTimeField(auto_now_add=True)
     answer_text = models.TextField(null=True, blank=True)
     admin_feedback = models.TextField(null=True, blank=True)
@@ -273,6 +333,8 @@ class UserAnswer(models.Model):
                                           related_name="feedback_set")
     attempt_number = models.IntegerField(default=1)
     missing_answers = models.IntegerField(default=0)
+    # Set for answers which went through the write-behind buffer, so a replayed buffer never inserts them twice
+    submission_id = models.UUIDField(null=True, blank=True, unique=True, editable=False)
 
     @property
     def points_formatted(self):
@@ -296,7 +358,7 @@ class UserAnswer(models.Model):
     def get_user_answers_single_question(cls, user_id: int, quiz_id: int, question_id: Optional[int] = None,
                                          question_type_list: Optional[list] = None,
                                          ai_feedback_enabled: Optional[bool] = None):
-        result = cls.objects.filter(question__quiz=user_id, user__id=quiz_id)
+        result = cls.objects.filter(quiz=quiz_id, user_id=user_id)
         if question_id:
             result = result.filter(question_id=question_id)
         max_attempt_number = cls.get_attempt_number_for_queryset(result)
@@ -307,6 +369,25 @@ class UserAnswer(models.Model):
             result = result.filter(question__ai_feedback_enabled=ai_feedback_enabled)
         return result
 
+    VERSION_STAMP_AGGREGATES = [Max("id"), Max("admin_feedback_on"), Max("ai_feedback_on"), Count("admin_feedback_on"),
+                                Count("ai_feedback_on")]
+
+    @classmethod
+    def get_version_stamp(cls, **filters) -> tuple:
+        return tuple(cls.objects.filter(**filters).aggregate(*cls.VERSION_STAMP_AGGREGATES).values())
+
+    @classmethod
+    async def aget_version_stamp(cls, **filters) -> tuple:
+        return tuple((await cls.objects.filter(**filters).aaggregate(*cls.VERSION_STAMP_AGGREGATES)).values())
+
+    @property
+    def chosen_options(self) -> list:
+        # Options of the question are often prefetched for whole lists of answers, then no query is needed.
+        if not self.selected_option_ids:
+            return []
+        options = {x.pk: x for x in self.question.option_set.all()}
+        return [options[x] for x in self.selected_option_ids if x in options]
+
     @property
     def user_answer(self):
         if self.question.type in (Question.SHORT_TEXT, Question.LONG_TEXT):
@@ -322,21 +403,59 @@ class UserAnswer(models.Model):
                 return self.ai_feedback
         elif self.question.type in (Question.MULTIPLE_CHOICE_SINGLE_ANSWER, Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER):
             return "<ol><li>" "</li><li>".join([f"<b>{x.text}</b>: {x.calculated_feedback}"
-                                                for x in self.selected_options.all()]) + "</li></ol>"
+                                                for x in self.chosen_options]) + "</li></ol>"
 
     def __get_option_attrs(self, attr):
         if self.question.type == Question.MULTIPLE_CHOICE_SINGLE_ANSWER:
-            selected_option: Option = self.selected_options.first()
-            return getattr(selected_option, attr)
+            selected_options = self.chosen_options
+            return getattr(selected_options[0], attr) if selected_options else None
         if self.question.type == Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER:
-            selected_options: QuerySet = self.selected_options.all()
-            return f"<ul><li>{'</li><li>'.join([getattr(x, attr) for x in selected_options])}</li></ul>"
+            return f"<ul><li>{'</li><li>'.join([getattr(x, attr) for x in self.chosen_options])}</li></ul>"
 
     def __str__(self):
         return f"{self.user.username}'s answer to {self.question.text}"
 
     class Meta:
         unique_together = ('user', 'question', 'attempt_number')
+        indexes = [models.Index(fields=["quiz", "user"], name="quiz_useranswer_quiz_user"),
+                   models.Index(fields=["course", "user"], name="quiz_useranswer_course_user")]
+
+
+class AttachmentDerivative(models.Model):
+    source = models.CharField(max_length=255, unique=True)
+    content_hash = models.CharField(max_length=64)
+    variants = JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    @property
+    def srcset(self) -> str:
+        return ", ".join(f"{default_storage.url(name)} {width}w" for width, name in self.variants.items())
+
+    @property
+    def largest_url(self) -> str:
+        return default_storage.url(self.variants[max(self.variants, key=int)])
+
+    @property
+    def smallest_url(self) -> str:
+        return default_storage.url(self.variants[min(self.variants, key=int)])
+
+    def __str__(self):
+        return self.source
+
+
+class CourseScore(models.Model):
+    # Sum of the points of the last attempts of a user in a course, kept up to date by quiz.leaderboard.
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name="scores")
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="course_scores")
+    points = models.DecimalField(max_digits=8, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.user} - {self.course}: {self.points}"
+
+    class Meta:
+        unique_together = ('course', 'user')
+        indexes = [models.Index(fields=["course", "-points"], name="quiz_coursescore_ranking")]
 
 
 class ChatGPTLog(models.Model):
@@ -345,24 +464,107 @@ class ChatGPTLog(models.Model):
     created_at = models.DateTimeField("Created At", auto_now_add=True)
     user_answer = models.ForeignKey(UserAnswer, on_delete=models.CASCADE, null=True, blank=True)
 
-    @classmethod
-    def send_request(cls, user_answer: UserAnswer):
-        client = OpenAI(api_key=user_answer.question.quiz.course.ai_api_key)
+    class Meta:
+        # Built concurrently on PostgreSQL, see migration 0016.
+        indexes = [models.Index(fields=["created_at"], name="quiz_chatgptlog_created_at")]
+
+    @staticmethod
+    def build_message(user_answer: UserAnswer) -> str:
         message_content = user_answer.question.quiz.course.ai_prompt_format
         message_content = (message_content.replace("[question_text]", user_answer.question.text)
                            .replace("[answer_text]", user_answer.answer_text))
         if user_answer.question.example_answer:
-            message_content = message_content.replace("[example_answer]", user_answer.answer_text)
-        stream = client.chat.completions.create(
-            model=user_answer.question.quiz.course.ai_model,
-            messages=[{"role": "user", "content": message_content}],
-            stream=True,
-        )
-        response = "".join([part.choices[0].delta.content or "" for part in stream])
-        print(response)
+            message_content = message_content.replace("[example_answer]", user_answer.question.example_answer)
+        return message_content
+
+    @classmethod
+    def stream_request(cls, user_answer: UserAnswer):
+        client = get_openai_client(user_answer.question.quiz.course.ai_api_key, settings.OPENAI_BASE_URL)
+        message_content = cls.build_message(user_answer)
+        model = user_answer.question.quiz.course.ai_model
+        parts = []
+        with observe_openai_request(model):
+            stream = client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": message_content}],
+                stream=True,
+                stream_options={"include_usage": True},
+            )
+            last_flush = time.monotonic()
+            for part in stream:
+                if part.usage:
+                    count_openai_tokens(model, part.usage)
+                delta = part.choices[0].delta.content if part.choices else None
+                if not delta:
+                    continue
+                parts.append(delta)
+                # Partial feedback is persisted now and then, so a dropped connection does not lose the whole response.
+                if time.monotonic() - last_flush >= settings.AI_FEEDBACK_FLUSH_INTERVAL:
+                    UserAnswer.objects.filter(pk=user_answer.pk).update(ai_feedback="".join(parts))
+                    last_flush = time.monotonic()
+                yield delta
+        response = "".join(parts)
         log_item = cls(message=message_content, response=response, user_answer=user_answer)
         log_item.save()
         user_answer.ai_feedback = response
         user_answer.ai_feedback_on = log_item.created_at
         user_answer.save()
 
+    @classmethod
+    def send_request(cls, user_answer: UserAnswer):
+        for _ in cls.stream_request(user_answer):
+            pass
+
+
+class ChatGPTLogArchive(models.Model):
+    # One batch of archived logs, stored as zlib-compressed JSON lines.
+    payload = models.BinaryField()
+    entry_count = models.PositiveIntegerField()
+    first_created_at = models.DateTimeField()
+    last_created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    @staticmethod
+    def compress(logs: list) -> bytes:
+        return zlib.compress("\n".join(json.dumps(x, ensure_ascii=False) for x in logs).encode(), 9)
+
+    def read_logs(self) -> list:
+        return [json.loads(x) for x in zlib.decompress(self.payload).decode().split("\n")]
+
+    def __str__(self):
+        return f"{self.entry_count} logs {self.first_created_at:%Y-%m-%d} - {self.last_created_at:%Y-%m-%d}"
+
+
+class ChatGPTLogArchiveEntry(models.Model):
+    # Index of the archived logs, so the logs of an answer are found without decompressing every archive.
+    archive = models.ForeignKey(ChatGPTLogArchive, on_delete=models.CASCADE, related_name="entries")
+    position = models.PositiveIntegerField()
+    log_id = models.PositiveBigIntegerField(unique=True)
+    user_answer = models.ForeignKey(UserAnswer, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField()
+
+
+class SearchDocument(models.Model):
+    # Searchable text of a question, an option or an answer, indexed by quiz.search with FTS5 or a tsvector.
+    QUESTION = "question"
+    OPTION = "option"
+    ANSWER = "answer"
+    KINDS = [
+        (QUESTION, "Otázka"),
+        (OPTION, "Možnost"),
+        (ANSWER, "Odpověď"),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KINDS)
+    object_id = models.PositiveBigIntegerField()
+    course = models.ForeignKey(Course, on_delete=models.CASCADE)
+    quiz = models.ForeignKey(Quiz, on_delete=models.CASCADE)
+    question = models.ForeignKey(Question, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    text = models.TextField()
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id}"
+
+    class Meta:
+        unique_together = ('kind', 'object_id')
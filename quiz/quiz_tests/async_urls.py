@@ -0,0 +1,10 @@
+from django.urls import path, include
+
+from ..async_views import AsyncQuizListView, AsyncQuestionView, AsyncUserTestReviewView
+
+urlpatterns = [
+    path("courses/<int:course_id>/", AsyncQuizListView.as_view(), name="quiz_list"),
+    path("question/<int:question_id>/", AsyncQuestionView.as_view(), name="question"),
+    path("user-quiz-review/<int:quiz_id>/", AsyncUserTestReviewView.as_view(), name="quiz_review"),
+    path("", include("CzechitasQuizApp.urls")),
+]
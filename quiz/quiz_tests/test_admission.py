@@ -0,0 +1,62 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..admission import acquire_slot, get_admission_stats, release_slot
+from ..models import Course, Quiz, Question, UserAnswer
+
+
+class AdmissionControlTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='userpass')
+        cls.course = Course.objects.create(title="Test Course", description="Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Test Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Test Question", type=Question.SHORT_TEXT)
+        cls.client = Client()
+
+    def setUp(self):
+        cache.clear()
+        self.client.login(username='user', password='userpass')
+        self.url = reverse('question', kwargs={'question_id': self.question.id})
+        self.data = {"question_id": self.question.id, "answer_text": "Odpověď"}
+
+    def test_repeated_submit_rejected(self):
+        self.assertEqual(self.client.post(self.url, self.data).status_code, 200)
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "1")
+        self.assertEqual(UserAnswer.objects.count(), 1)
+        self.assertEqual(get_admission_stats(), {"in_flight": 0, "admitted": 1, "rejected_rate": 1,
+                                                 "rejected_overload": 0})
+
+    @override_settings(SUBMISSION_MAX_CONCURRENT=0, SUBMISSION_RETRY_AFTER=3)
+    def test_overload_rejected(self):
+        response = self.client.post(self.url, self.data)
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response["Retry-After"], "3")
+        self.assertFalse(UserAnswer.objects.exists())
+        self.assertEqual(get_admission_stats()["rejected_overload"], 1)
+
+    @override_settings(SUBMISSION_ADMISSION_CONTROL=False)
+    def test_disabled(self):
+        for _ in range(3):
+            self.assertEqual(self.client.post(self.url, self.data).status_code, 200)
+
+    @override_settings(SUBMISSION_MAX_CONCURRENT=2)
+    def test_slots(self):
+        first, second = acquire_slot(), acquire_slot()
+        self.assertIsNone(acquire_slot())
+        self.assertEqual(get_admission_stats()["in_flight"], 2)
+        release_slot(first)
+        third = acquire_slot()
+        self.assertIsNotNone(third)
+        # The second slot timed out and was taken by another submission, which keeps it.
+        cache.delete(second[0])
+        fourth = acquire_slot()
+        release_slot(second)
+        self.assertEqual(cache.get(fourth[0]), fourth[1])
+        release_slot(third)
+        release_slot(fourth)
+        self.assertEqual(get_admission_stats()["in_flight"], 0)
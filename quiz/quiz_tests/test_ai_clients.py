@@ -0,0 +1,59 @@
+from django.test import TestCase, override_settings
+
+from .. import ai_clients
+from ..ai_clients import get_openai_client
+from ..fake_openai import FakeOpenAIServer
+from ..models import Course
+
+
+class OpenAIClientRegistryTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title="Test Course", ai_api_key="old-key")
+
+    def setUp(self):
+        ai_clients._clients.clear()
+
+    def test_client_reused_for_same_key(self):
+        client = get_openai_client("old-key")
+        self.assertIs(get_openai_client("old-key"), client)
+        self.assertIsNot(get_openai_client("other-key"), client)
+
+    def test_client_evicted_when_api_key_changes(self):
+        client = get_openai_client("old-key")
+        self.course.ai_api_key = "new-key"
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.save()
+        self.assertIsNot(get_openai_client("old-key"), client)
+
+    def test_client_evicted_when_course_deleted(self):
+        client = get_openai_client("old-key")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.course.delete()
+        self.assertIsNot(get_openai_client("old-key"), client)
+
+    @override_settings(OPENAI_CLIENT_CACHE_SIZE=2)
+    def test_registry_is_bounded(self):
+        first = get_openai_client("key-1")
+        get_openai_client("key-2")
+        get_openai_client("key-3")
+        self.assertEqual(len(ai_clients._clients), 2)
+        self.assertIsNot(get_openai_client("key-1"), first)
+
+    def test_evicted_client_keeps_streaming(self):
+        with FakeOpenAIServer(tokens=["Ahoj", " světe"]) as server:
+            client = get_openai_client("old-key", server.base_url)
+            stream = client.chat.completions.create(model="gpt-4o-mini", stream=True,
+                                                    messages=[{"role": "user", "content": "Ahoj"}])
+            with self.captureOnCommitCallbacks(execute=True):
+                self.course.delete()
+            self.assertEqual("".join(x.choices[0].delta.content or "" for x in stream if x.choices), "Ahoj světe")
+
+    def test_connection_reused_across_requests(self):
+        with FakeOpenAIServer(tokens=["Ok"]) as server:
+            for _ in range(3):
+                stream = get_openai_client("old-key", server.base_url).chat.completions.create(
+                    model="gpt-4", messages=[{"role": "user", "content": "Hi"}], stream=True)
+                list(stream)
+            self.assertEqual(server.request_count, 3)
+            self.assertEqual(server.connection_count, 1)
@@ -0,0 +1,75 @@
+import json
+
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..fake_openai import FakeOpenAIServer
+from ..models import Course, Quiz, Question, UserAnswer, ChatGPTLog
+
+
+def parse_events(content: bytes) -> list:
+    events = []
+    for block in content.decode().strip().split("\n\n"):
+        name, data = block.split("\n")
+        events.append((name.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+    return events
+
+
+class AIFeedbackStreamTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.user = User.objects.create_user(username='user', password='userpass')
+        cls.course = Course.objects.create(title="Test Course", ai_api_key="test-key",
+                                           ai_prompt_format="[question_text] [answer_text] [example_answer]")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Test Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Test Question", type=Question.SHORT_TEXT,
+                                               example_answer="Example", ai_feedback_enabled=True)
+        cls.user_answer = UserAnswer.objects.create(user=cls.user, question=cls.question, answer_text="Answer")
+        cls.client = Client()
+
+    def setUp(self):
+        self.server = FakeOpenAIServer(tokens=["Dobrá ", "odpo", "věď."]).__enter__()
+        self.settings_override = override_settings(OPENAI_BASE_URL=self.server.base_url)
+        self.settings_override.enable()
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.server.__exit__()
+
+    def test_stream_view_forwards_tokens(self):
+        self.client.login(username='admin', password='adminpass')
+        response = self.client.get(reverse('ai_feedback_stream', kwargs={'quiz_id': self.quiz.id,
+                                                                          'user_id': self.user.id}))
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = parse_events(b"".join(response.streaming_content))
+        self.assertEqual([x[0] for x in events], ["start", "delta", "delta", "delta", "done", "end"])
+        self.assertEqual("".join(x[1]["text"] for x in events if x[0] == "delta"), "Dobrá odpověď.")
+
+        self.user_answer.refresh_from_db()
+        self.assertEqual(self.user_answer.ai_feedback, "Dobrá odpověď.")
+        self.assertIsNotNone(self.user_answer.ai_feedback_on)
+        self.assertEqual(ChatGPTLog.objects.get(user_answer=self.user_answer).message,
+                         "Test Question Answer Example")
+
+    def test_stream_view_denied_to_regular_user(self):
+        self.client.login(username='user', password='userpass')
+        response = self.client.get(reverse('ai_feedback_stream', kwargs={'quiz_id': self.quiz.id,
+                                                                          'user_id': self.user.id}))
+        self.assertEqual(response.status_code, 403)
+
+    @override_settings(AI_FEEDBACK_FLUSH_INTERVAL=0)
+    def test_partial_feedback_is_persisted(self):
+        stream = ChatGPTLog.stream_request(self.user_answer)
+        self.assertEqual(next(stream), "Dobrá ")
+        self.assertEqual(UserAnswer.objects.get(pk=self.user_answer.pk).ai_feedback, "Dobrá ")
+        self.assertFalse(ChatGPTLog.objects.exists())
+        list(stream)
+        self.assertTrue(ChatGPTLog.objects.exists())
+
+    def test_feedback_does_not_change_attempt_number(self):
+        attempt_number = self.user_answer.attempt_number
+        ChatGPTLog.send_request(self.user_answer)
+        self.user_answer.refresh_from_db()
+        self.assertEqual(self.user_answer.attempt_number, attempt_number)
@@ -0,0 +1,114 @@
+import glob
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from .. import answer_buffer
+from ..answer_buffer import append_text_answer, flush_buffer, get_buffered_answers, _read_entries
+from ..models import Course, Quiz, Question, UserAnswer, CourseScore
+
+
+class AnswerBufferTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='userpass')
+        cls.course = Course.objects.create(title="Test Course", description="Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Test Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Test Question", type=Question.SHORT_TEXT)
+        cls.client = Client()
+
+    def setUp(self):
+        cache.clear()
+        self.buffer_dir = tempfile.mkdtemp()
+        self.settings_override = override_settings(TEXT_ANSWER_WRITE_BEHIND=True,
+                                                   TEXT_ANSWER_BUFFER_DIR=self.buffer_dir)
+        self.settings_override.enable()
+        self.client.login(username='user', password='userpass')
+        self.url = reverse('question', kwargs={'question_id': self.question.id})
+
+    def tearDown(self):
+        self.settings_override.disable()
+        shutil.rmtree(self.buffer_dir)
+
+    def test_buffered_answer_visible_before_flush(self):
+        etag = self.client.get(self.url)["ETag"]
+        response = self.client.post(self.url, {"question_id": self.question.id, "answer_text": "Bufferovaná"})
+        self.assertContains(response, "Odpověď byla uložena")
+        self.assertFalse(UserAnswer.objects.exists())
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "Odpověď byla uložena")
+        response = self.client.get(reverse('quiz_review', kwargs={'quiz_id': self.quiz.id}))
+        self.assertContains(response, "Bufferovaná")
+
+    def test_buffered_answers_indexed_per_user(self):
+        other = User.objects.create_user(username='other', password='userpass')
+        append_text_answer(other.pk, self.question.pk, "Cizí")
+        entry = append_text_answer(self.user.pk, self.question.pk, "Moje")
+        # Pages read the index in the cache, not the buffer files.
+        with mock.patch("quiz.answer_buffer.open", side_effect=AssertionError, create=True):
+            self.assertEqual(get_buffered_answers(self.user.pk), {self.question.pk: entry})
+        self.assertEqual(get_buffered_answers(self.user.pk, [self.question.pk + 1]), {})
+        self.assertEqual(flush_buffer(), 2)
+        self.assertEqual(get_buffered_answers(self.user.pk), {})
+        self.assertEqual(get_buffered_answers(other.pk), {})
+
+    def test_flush_assigns_attempt_numbers(self):
+        UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Uložená", points=1)
+        first = append_text_answer(self.user.pk, self.question.pk, "První")
+        append_text_answer(self.user.pk, self.question.pk, "Druhá")
+        self.assertEqual(flush_buffer(), 2)
+        self.assertEqual(list(UserAnswer.objects.order_by("attempt_number")
+                              .values_list("answer_text", "attempt_number")),
+                         [("Uložená", 2), ("První", 3), ("Druhá", 4)])
+        self.assertEqual(str(UserAnswer.objects.get(answer_text="První").submission_id), first["submission_id"])
+        self.assertEqual(UserAnswer.objects.filter(quiz=self.quiz, course=self.course).count(), 3)
+        self.assertEqual(CourseScore.objects.get(course=self.course, user=self.user).points, 0)
+        self.assertEqual(flush_buffer(), 0)
+
+        response = self.client.get(reverse('quiz_review', kwargs={'quiz_id': self.quiz.id}))
+        self.assertContains(response, "Druhá")
+
+    def test_replay_after_crash_skips_stored_answers(self):
+        append_text_answer(self.user.pk, self.question.pk, "Odpověď")
+        entries = _read_entries(os.path.join(self.buffer_dir, "active.jsonl"))
+        shutil.copy(os.path.join(self.buffer_dir, "active.jsonl"), os.path.join(self.buffer_dir, "crash.jsonl"))
+        self.assertEqual(flush_buffer(), 1)
+        # The flusher died after inserting, before it removed the file.
+        os.rename(os.path.join(self.buffer_dir, "crash.jsonl"), os.path.join(self.buffer_dir, "pending-1-1.jsonl"))
+        append_text_answer(self.user.pk, self.question.pk, "Další")
+        self.assertEqual(flush_buffer(), 1)
+        self.assertEqual(UserAnswer.objects.count(), 2)
+        self.assertEqual(UserAnswer.objects.filter(submission_id=entries[0]["submission_id"]).count(), 1)
+        self.assertEqual(glob.glob(os.path.join(self.buffer_dir, "pending-*")), [])
+
+    def test_bad_entries_do_not_block_flush(self):
+        deleted = Question.objects.create(quiz=self.quiz, text="Deleted Question", type=Question.SHORT_TEXT)
+        append_text_answer(self.user.pk, deleted.pk, "Smazaná")
+        deleted.delete()
+        append_text_answer(self.user.pk, self.question.pk, "Dobrá")
+        failing = append_text_answer(self.user.pk, self.question.pk, "Špatná")
+        insert_batch = answer_buffer._insert_batch
+
+        def fail_on_entry(entries):
+            if failing in entries:
+                raise IntegrityError
+            return insert_batch(entries)
+
+        with mock.patch("quiz.answer_buffer._insert_batch", side_effect=fail_on_entry), \
+                self.assertLogs("quiz.answer_buffer", "WARNING"):
+            self.assertEqual(flush_buffer(), 1)
+        self.assertEqual(list(UserAnswer.objects.values_list("answer_text", flat=True)), ["Dobrá"])
+        self.assertEqual(glob.glob(os.path.join(self.buffer_dir, "pending-*")), [])
+        failed_file, = glob.glob(os.path.join(self.buffer_dir, "failed-pending-*"))
+        self.assertEqual(_read_entries(failed_file), [failing])
+        append_text_answer(self.user.pk, self.question.pk, "Další")
+        self.assertEqual(flush_buffer(), 1)
@@ -0,0 +1,79 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Course, Quiz, Question, Option, UserAnswer
+
+
+class AnswerKeyTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.other_course = Course.objects.create(title="Other Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.multiple = Question.objects.create(quiz=cls.quiz, text="Pick two", order=1,
+                                               type=Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER)
+        cls.multiple_options = [Option.objects.create(question=cls.multiple, text=f"Option {x}", is_correct=x < 2)
+                                for x in range(4)]
+        cls.single = Question.objects.create(quiz=cls.quiz, text="Pick one", order=2,
+                                             type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        cls.single_options = [Option.objects.create(question=cls.single, text=f"Option {x}", is_correct=x == 0)
+                              for x in range(3)]
+        cls.client = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def _answer_multiple(self, options) -> UserAnswer:
+        return self.multiple.evaluate_response({f"option_{x.id}": str(x.id) for x in options}, self.user)
+
+    def test_scoring_reads_no_content(self):
+        answer_key = self.multiple.get_answer_key()
+        self.assertEqual((answer_key.quiz_id, answer_key.course_id, answer_key.option_count),
+                         (self.quiz.pk, self.course.pk, 4))
+        self.assertEqual(answer_key.correct_option_ids, {x.pk for x in self.multiple_options[:2]})
+        with CaptureQueriesContext(connection) as queries:
+            user_answer = self._answer_multiple(self.multiple_options[:2])
+        self.assertEqual(user_answer.points, 1)
+        self.assertEqual((user_answer.quiz_id, user_answer.course_id), (self.quiz.pk, self.course.pk))
+        tables = ['"quiz_option"', '"quiz_question"', '"quiz_quiz"']
+        self.assertEqual([x["sql"] for x in queries if any(table in x["sql"] for table in tables)], [])
+
+    @override_settings(SHARED_CACHE_REQUIRED=True)
+    def test_not_cached_in_process_local_cache(self):
+        self.multiple.get_answer_key()
+        Option.objects.filter(pk=self.multiple_options[2].pk).update(is_correct=True)
+        self.assertEqual(self.multiple.get_answer_key().correct_option_ids,
+                         {x.pk for x in self.multiple_options[:3]})
+
+    def test_option_changes_invalidate_key(self):
+        self.assertEqual(self._answer_multiple(self.multiple_options[:2]).points, 1)
+        self.multiple_options[2].is_correct = True
+        self.multiple_options[2].save()
+        self.assertEqual(self._answer_multiple(self.multiple_options[:3]).points, 1)
+        option = Option.objects.create(question=self.single, text="Option 3", is_correct=True)
+        self.assertTrue(self.single.evaluate_response({"selected_option": str(option.id)}, self.user).points)
+        option.delete()
+        with self.assertRaises(ValueError):
+            self.single.evaluate_response({"selected_option": str(option.id)}, self.user)
+
+    def test_key_follows_moved_quiz(self):
+        self.single.get_answer_key()
+        self.quiz.course = self.other_course
+        self.quiz.save()
+        user_answer = self.single.evaluate_response({"selected_option": str(self.single_options[0].id)}, self.user)
+        self.assertEqual(user_answer.course_id, self.other_course.pk)
+
+    def test_options_of_other_questions_are_rejected(self):
+        self.client.login(username='user', password='password')
+        url = reverse('question', kwargs={'question_id': self.single.id})
+        response = self.client.post(url, {"question_id": self.single.id,
+                                          "selected_option": self.multiple_options[0].id})
+        self.assertEqual(response.status_code, 400)
+        user_answer = self._answer_multiple([self.multiple_options[0], self.single_options[0]])
+        self.assertEqual(user_answer.selected_option_ids, [self.multiple_options[0].pk])
+        self.assertFalse(UserAnswer.objects.filter(question=self.single).exists())
@@ -0,0 +1,162 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import zipfile
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from ..archive import export_course, import_course
+from ..leaderboard import find_score_mismatches
+from ..models import Course, Quiz, Question, Option, UserAnswer, CourseScore
+from ..search import SearchResults
+
+
+class CourseArchiveTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root, ATTACHMENT_DERIVATIVE_WORKERS=0)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.coach = User.objects.create_superuser(username='coach', password='password')
+        cls.student = User.objects.create_user(username='student', password='password', email="student@example.com")
+        cls.course = Course.objects.create(title="Python 2026", description="Course Description",
+                                           ai_api_key="secret-key", ai_prompt_format="[question_text]")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Datové typy", ai_prompt_quiz_text="Python")
+        cls.choice = Question.objects.create(quiz=cls.quiz, text="Vyber měnitelný typ", order=1, max_attempts=3,
+                                             type=Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER)
+        cls.options = [Option.objects.create(question=cls.choice, text=text, is_correct=correct, feedback="Ano")
+                       for text, correct in [("list", True), ("dict", True), ("tuple", False)]]
+        cls.text = Question.objects.create(quiz=cls.quiz, text="Popiš n-tici", order=2, type=Question.SHORT_TEXT)
+        cls.choice_answer = cls.choice.evaluate_response({f"option_{x.id}": str(x.id) for x in cls.options[:2]},
+                                                         cls.student)
+        cls.text_answer = UserAnswer.objects.create(user=cls.student, question=cls.text,
+                                                    answer_text="Neměnitelný seznam", points=Decimal("0.5"),
+                                                    admin_feedback="Výborně", admin_feedback_by=cls.coach,
+                                                    admin_feedback_on=timezone.now())
+
+    def setUp(self):
+        default_storage.save("attachments/schema.pdf", ContentFile(b"%PDF schema"))
+        self.choice.attachment_1 = "attachments/schema.pdf"
+        self.choice.save()
+
+    def tearDown(self):
+        shutil.rmtree(os.path.join(self.media_root, "attachments"), ignore_errors=True)
+
+    def _export(self, **kwargs) -> io.BytesIO:
+        archive = io.BytesIO()
+        export_course(self.course, archive, **kwargs)
+        archive.seek(0)
+        return archive
+
+    def _snapshot(self, course: Course) -> dict:
+        return {
+            "course": Course.objects.filter(pk=course.pk).values("title", "description", "ai_prompt_format").get(),
+            "quizzes": list(Quiz.objects.filter(course=course).values("title", "ai_prompt_quiz_text")),
+            "questions": list(Question.objects.filter(quiz__course=course).order_by("order").values(
+                "quiz__title", "text", "type", "order", "max_attempts", "attachment_1")),
+            "options": list(Option.objects.filter(question__quiz__course=course).order_by("text").values(
+                "question__text", "text", "is_correct", "feedback", "option_order")),
+            "answers": [(x.user.username, x.question.text, x.attempt_number, x.answered_on, x.answer_text, x.points,
+                         x.admin_feedback, x.admin_feedback_by.username if x.admin_feedback_by else None,
+                         [y.text for y in x.chosen_options])
+                        for x in UserAnswer.objects.filter(course=course).order_by("question__order")],
+        }
+
+    def test_round_trip(self):
+        # Answers stored before deleted options were removed from them may still refer to those.
+        deleted = Option.objects.create(question=self.choice, text="set", is_correct=False)
+        deleted_id = deleted.pk
+        deleted.delete()
+        UserAnswer.objects.filter(pk=self.choice_answer.pk).update(
+            selected_option_ids=[*self.choice_answer.selected_option_ids, deleted_id])
+        expected = self._snapshot(self.course)
+        archive = self._export(include_answers=True)
+        self.student.delete()
+        self.course.delete()
+        default_storage.delete("attachments/schema.pdf")
+
+        course, counts = import_course(archive)
+        self.assertEqual(self._snapshot(course), expected)
+        self.assertEqual((counts["questions created"], counts["options created"], counts["answers created"]), (2, 3, 2))
+        self.assertIsNone(course.ai_api_key)
+        student = User.objects.get(username="student")
+        self.assertEqual(student.email, "student@example.com")
+        self.assertFalse(student.has_usable_password())
+        with default_storage.open("attachments/schema.pdf") as stored:
+            self.assertEqual(stored.read(), b"%PDF schema")
+        self.assertEqual(CourseScore.objects.get(course=course, user=student).points, Decimal("1.5"))
+        self.assertEqual(find_score_mismatches(), [])
+        self.assertEqual(len(SearchResults("neměnitelný", course_id=course.pk)[0:20]), 1)
+
+    def test_import_is_idempotent(self):
+        archive = self._export(include_answers=True)
+        for _ in range(2):
+            archive.seek(0)
+            course, counts = import_course(archive)
+            self.assertEqual(course, self.course)
+            self.assertEqual({name: count for name, count in counts.items() if count and name != "attachments"},
+                             {"courses updated": 1})
+        self.assertEqual(UserAnswer.objects.count(), 2)
+        self.assertEqual(os.listdir(os.path.join(self.media_root, "attachments")), ["schema.pdf"])
+
+    def test_changed_content_is_updated(self):
+        archive = self._export()
+        Option.objects.filter(pk=self.options[2].pk).update(is_correct=True)
+        self.options[0].delete()
+        course, counts = import_course(archive)
+        self.assertEqual((counts["options created"], counts["options updated"]), (1, 1))
+        correct_options = Option.objects.filter(question=self.choice, is_correct=True)
+        self.assertEqual(set(correct_options.values_list("text", flat=True)), {"list", "dict"})
+
+    def test_different_file_with_same_name_is_kept(self):
+        archive = self._export()
+        with default_storage.open("attachments/schema.pdf", "wb") as stored:
+            stored.write(b"%PDF other")
+        for _ in range(2):
+            archive.seek(0)
+            import_course(archive)
+            self.choice.refresh_from_db()
+            self.assertNotEqual(self.choice.attachment_1.name, "attachments/schema.pdf")
+            with default_storage.open(self.choice.attachment_1.name) as stored:
+                self.assertEqual(stored.read(), b"%PDF schema")
+        with default_storage.open("attachments/schema.pdf") as stored:
+            self.assertEqual(stored.read(), b"%PDF other")
+        self.assertEqual(len(os.listdir(os.path.join(self.media_root, "attachments"))), 2)
+
+    def test_archive_contents(self):
+        with zipfile.ZipFile(self._export()) as archive:
+            self.assertEqual(json.loads(archive.read("manifest.json"))["counts"]["questions"], 2)
+            self.assertNotIn("answers.jsonl", archive.namelist())
+            self.assertEqual(archive.getinfo("files/attachments/schema.pdf").compress_type, zipfile.ZIP_STORED)
+            self.assertNotIn(b"secret-key", archive.read("course.jsonl"))
+
+    def test_commands(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "course.zip")
+        call_command("export_course", self.course.pk, path, "--answers", stdout=io.StringIO())
+        out = io.StringIO()
+        call_command("import_course", path, stdout=out)
+        self.assertIn('"Python 2026"', out.getvalue())
+        with zipfile.ZipFile(path, "w") as archive:
+            archive.writestr("manifest.json", json.dumps({"format": 99}))
+        with self.assertRaisesMessage(Exception, "Unsupported archive format 99"):
+            call_command("import_course", path, stdout=io.StringIO())
@@ -0,0 +1,75 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.views import View
+
+from ..async_views import AsyncConditionalGetMixin
+from ..models import Course, Quiz, Question, Option, UserAnswer
+
+
+@override_settings(ROOT_URLCONF="quiz.quiz_tests.async_urls")
+class AsyncViewsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.question1 = Question.objects.create(quiz=cls.quiz, text="Sample Question 1", type=Question.SHORT_TEXT,
+                                                order=1)
+        cls.question2 = Question.objects.create(quiz=cls.quiz, text="Sample Question 2",
+                                                type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER, order=2)
+        cls.correct_option = Option.objects.create(question=cls.question2, text="Right", is_correct=True)
+        cls.client = Client()
+
+    def test_redirect_if_not_logged_in(self):
+        response = self.client.get(f"/question/{self.question1.id}/")
+        self.assertRedirects(response, f"/accounts/login/?next=/question/{self.question1.id}/")
+
+    def test_question_view_get(self):
+        self.client.login(username='user', password='password')
+        response = self.client.get(f"/question/{self.question1.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'question.html')
+        self.assertEqual(response.context['question'], self.question1)
+        self.assertEqual(response.context['next_question'], self.question2)
+        self.assertTrue(response.context['allow_answer'])
+
+        # The first response sets the CSRF cookie, which is part of the ETag.
+        etag = self.client.get(f"/question/{self.question1.id}/")["ETag"]
+        response = self.client.get(f"/question/{self.question1.id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_question_view_missing_question(self):
+        self.client.login(username='user', password='password')
+        self.assertEqual(self.client.get("/question/999/").status_code, 404)
+
+    def test_question_view_shows_last_answer(self):
+        self.client.login(username='user', password='password')
+        response = self.client.post(f"/question/{self.question2.id}/", {
+            'question_id': self.question2.id, 'selected_option': self.correct_option.id})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(f"/question/{self.question2.id}/")
+        self.assertEqual(response.context['feedback_type'], "success")
+        self.assertEqual(response.context['selected_option'], self.correct_option)
+
+    def test_quiz_list_view(self):
+        self.client.login(username='user', password='password')
+        response = self.client.get(f"/courses/{self.course.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['quizzes'], [self.quiz])
+        self.assertEqual(response.context['quiz_questions'], {self.quiz.id: self.question1.id})
+
+    def test_review_page_context(self):
+        UserAnswer.objects.create(user=self.user, question=self.question1, answer_text="First")
+        UserAnswer.objects.create(user=self.user, question=self.question1, answer_text="Second")
+        self.client.login(username='user', password='password')
+        response = self.client.get(f"/user-quiz-review/{self.quiz.id}/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([x.answer_text for x in response.context['answers']], ["Second"])
+
+    def test_hooks_are_required(self):
+        class IncompleteView(AsyncConditionalGetMixin, View):
+            async def _aget_etag_parts(self):
+                return []
+
+        with self.assertRaises(TypeError):
+            IncompleteView()
@@ -0,0 +1,76 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..cloning import clone_course, clone_quiz
+from ..models import Course, Quiz, Question, Option, UserAnswer
+from ..search import SearchResults
+
+
+class CloneTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Python 2026", description="Course Description",
+                                           ai_prompt_format="[question_text] [answer_text]")
+        cls.quizzes = [Quiz.objects.create(course=cls.course, title=f"Quiz {x}") for x in range(2)]
+        cls.question = Question.objects.create(quiz=cls.quizzes[0], text="Vyber datový typ", order=1,
+                                               type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER,
+                                               attachment_1="attachments/schema.png")
+        cls.options = [Option.objects.create(question=cls.question, text=f"Možnost {x}", is_correct=x == 0)
+                       for x in range(3)]
+        Question.objects.create(quiz=cls.quizzes[1], text="Popiš cyklus", order=1, type=Question.SHORT_TEXT)
+        UserAnswer.objects.create(user=cls.user, question=cls.question, points=1)
+        cls.client = Client()
+
+    def test_clone_course(self):
+        clone = clone_course(self.course)
+        self.assertEqual(clone.title, "Python 2026 (kopie)")
+        self.assertEqual(clone.ai_prompt_format, self.course.ai_prompt_format)
+        self.assertEqual(list(clone.quiz_set.order_by("pk").values_list("title", flat=True)), ["Quiz 0", "Quiz 1"])
+        question = Question.objects.get(quiz__course=clone, type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        self.assertEqual(question.attachment_1.name, "attachments/schema.png")
+        self.assertEqual(list(question.option_set.order_by("pk").values_list("text", "is_correct", "option_order")),
+                         [(x.text, x.is_correct, x.option_order) for x in self.options])
+        self.assertFalse(clone.has_answers)
+        self.assertEqual(Question.objects.filter(quiz__course=self.course).count(), 2)
+        self.assertEqual(len(SearchResults("datový", course_id=clone.pk)[0:20]), 1)
+        option = question.option_set.get(text="Možnost 0")
+        user_answer = question.evaluate_response({"selected_option": str(option.id)}, self.user)
+        self.assertEqual((user_answer.course_id, user_answer.points), (clone.pk, 1))
+
+    def test_clone_quiz_into_other_course(self):
+        other_course = Course.objects.create(title="Python 2027", description="Course Description")
+        clone = clone_quiz(self.quizzes[0], other_course, "Datové typy")
+        self.assertEqual((clone.course, clone.title), (other_course, "Datové typy"))
+        self.assertEqual(Option.objects.filter(question__quiz=clone).count(), 3)
+        self.assertEqual(clone_quiz(self.quizzes[1]).title, "Quiz 1 (kopie)")
+
+    def test_large_course_uses_bulk_inserts(self):
+        quiz = self.quizzes[1]
+        questions = Question.objects.bulk_create(Question(quiz=quiz, text=f"Otázka {x}", order=x,
+                                                          type=Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER)
+                                                 for x in range(500))
+        Option.objects.bulk_create(Option(question=x, text=f"Možnost {y}", is_correct=y < 2)
+                                   for x in questions for y in range(4))
+        with CaptureQueriesContext(connection) as queries:
+            clone = clone_course(self.course)
+        # Inserted in batches, not row by row.
+        self.assertLess(len(queries), 100)
+        self.assertEqual(Option.objects.filter(question__quiz__course=clone).count(), 2003)
+
+    def test_admin_action_and_command(self):
+        self.client.login(username='admin', password='adminpass')
+        self.client.post(reverse('admin:quiz_quiz_changelist'),
+                         {"action": "clone", "_selected_action": [self.quizzes[1].pk]})
+        self.assertTrue(Quiz.objects.filter(course=self.course, title="Quiz 1 (kopie)").exists())
+        out = io.StringIO()
+        call_command("clone_content", course=self.course.pk, title="Python 2027", stdout=out)
+        self.assertIn('"Python 2027"', out.getvalue())
+        self.assertEqual(Course.objects.get(title="Python 2027").quiz_set.count(), 3)
@@ -0,0 +1,110 @@
+import random
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.test import SimpleTestCase, TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..clustering import BANDS, PRIME, ROWS, SEED, _shingle_hashes, cluster_texts, minhash_signatures
+from ..fake_openai import FakeOpenAIServer
+from ..leaderboard import find_score_mismatches
+from ..models import Course, Quiz, Question, UserAnswer, ChatGPTLog, SearchDocument
+from ..search import SearchResults
+
+
+class ClusterTextsTest(SimpleTestCase):
+    def test_near_duplicates_are_grouped(self):
+        texts = ["Seznam je měnitelný, n-tice ne.", "seznam je  měnitelný, n-tice ne", "Nevím",
+                 "Seznam je měnitelný, n-tice ne!", "for cyklus projde všechny prvky", ""]
+        self.assertEqual(cluster_texts(texts), [[0, 1, 3], [2], [4], [5]])
+
+    def test_threshold(self):
+        texts = ["Funkce vrací hodnotu pomocí return", "Funkce vrací hodnotu pomocí yield"]
+        self.assertEqual(cluster_texts(texts, threshold=0.95), [[0], [1]])
+        self.assertEqual(cluster_texts(texts, threshold=0.5), [[0, 1]])
+
+    def test_signatures_are_exact(self):
+        import numpy as np
+
+        texts = ["Seznam je měnitelný, n-tice ne.", "Nevím"]
+        hashes, owners = _shingle_hashes(texts)
+        generator = np.random.default_rng(SEED)
+        a = [int(x) for x in generator.integers(1, PRIME, BANDS * ROWS, dtype=np.uint64)]
+        b = [int(x) for x in generator.integers(0, PRIME, BANDS * ROWS, dtype=np.uint64)]
+        expected = [[min((x * int(h) + y) % PRIME for h, owner in zip(hashes, owners) if owner == text)
+                     for x, y in zip(a, b)] for text in range(len(texts))]
+        self.assertEqual(minhash_signatures(texts).tolist(), expected)
+
+    def test_many_answers(self):
+        generator = random.Random(0)
+        wordings = ["Seznam je měnitelný, n-tice ne.", "for cyklus projde všechny prvky seznamu",
+                    "Funkce vrací hodnotu pomocí return"]
+        texts = [generator.choice(wordings) + generator.choice(["", " ", ".", "!"]) for _ in range(3000)]
+        clusters = cluster_texts(texts)
+        self.assertEqual(len(clusters), 3)
+        for cluster in clusters:
+            self.assertEqual(len({texts[x].rstrip(" .!") for x in cluster}), 1)
+
+
+class AnswerClusterViewTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.users = [User.objects.create_user(username=f'user{x}', password='password') for x in range(4)]
+        cls.course = Course.objects.create(title="Test Course", ai_api_key="test-key",
+                                           ai_prompt_format="[question_text] [answer_text]")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Test Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Jaký je rozdíl mezi seznamem a n-ticí?",
+                                               type=Question.SHORT_TEXT, ai_feedback_enabled=True)
+        UserAnswer.objects.create(user=cls.users[0], question=cls.question, answer_text="Nevím")
+        cls.answers = [UserAnswer.objects.create(user=x, question=cls.question,
+                                                 answer_text="Seznam je měnitelný, n-tice ne.")
+                       for x in cls.users[:3]]
+        cls.other = UserAnswer.objects.create(user=cls.users[3], question=cls.question, answer_text="Nevím")
+        cls.client = Client()
+
+    def setUp(self):
+        self.client.login(username='admin', password='adminpass')
+
+    def test_clusters_use_last_attempts(self):
+        response = self.client.get(reverse('answer_clusters', kwargs={'question_id': self.question.id}))
+        clusters = response.context["clusters"]
+        self.assertEqual([[x.pk for x in cluster.members] for cluster in clusters],
+                         [[x.pk for x in self.answers], [self.other.pk]])
+        self.assertEqual(clusters[0].representative, self.answers[0])
+
+    def test_feedback_applied_to_selected_answers(self):
+        response = self.client.post(reverse('answer_clusters', kwargs={'question_id': self.question.id}),
+                                    {"answer_ids": [self.answers[0].pk, self.answers[1].pk],
+                                     "feedback": "Správně", "points": "0,5"})
+        self.assertRedirects(response, reverse('answer_clusters', kwargs={'question_id': self.question.id}))
+        graded = UserAnswer.objects.filter(admin_feedback="Správně", points=Decimal("0.5"),
+                                           admin_feedback_by=self.superuser)
+        self.assertEqual(sorted(graded.values_list("pk", flat=True)), [self.answers[0].pk, self.answers[1].pk])
+        self.assertEqual(find_score_mismatches(), [])
+        self.assertEqual(len(SearchResults("správně")[0:20]), 2)
+
+    def test_answers_of_other_questions_are_rejected(self):
+        question = Question.objects.create(quiz=self.quiz, text="Jiná otázka", type=Question.SHORT_TEXT)
+        user_answer = UserAnswer.objects.create(user=self.users[0], question=question, answer_text="Nevím")
+        self.client.post(reverse('answer_clusters', kwargs={'question_id': self.question.id}),
+                         {"answer_ids": [user_answer.pk], "feedback": "Správně", "points": "1"})
+        user_answer.refresh_from_db()
+        self.assertIsNone(user_answer.admin_feedback)
+
+    def test_ai_feedback_requested_once_per_cluster(self):
+        with FakeOpenAIServer(tokens=["Dobrá ", "odpověď."]) as server, \
+                override_settings(OPENAI_BASE_URL=server.base_url):
+            self.client.get(reverse('answer_clusters_ai_feedback', kwargs={'question_id': self.question.id}))
+            self.assertEqual(server.request_count, 2)
+        self.assertEqual(ChatGPTLog.objects.count(), 2)
+        for user_answer in [*self.answers, self.other]:
+            user_answer.refresh_from_db()
+            self.assertEqual(user_answer.ai_feedback, "Dobrá odpověď.")
+            self.assertIsNotNone(user_answer.ai_feedback_on)
+        self.assertTrue(SearchDocument.objects.filter(object_id=self.answers[2].pk, text__contains="Dobrá").exists())
+
+    def test_superuser_only(self):
+        self.client.login(username='user0', password='password')
+        response = self.client.get(reverse('answer_clusters', kwargs={'question_id': self.question.id}))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,88 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.views.generic import TemplateView
+
+from ..checks import check_shared_cache
+from ..models import Course, Quiz, Question, UserAnswer
+from ..views import ConditionalGetMixin
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Sample Question", type=Question.SHORT_TEXT)
+        cls.client = Client()
+
+    def setUp(self):
+        self.client.login(username='user', password='password')
+
+    def _assert_not_modified_until_change(self, url, change):
+        # The first response may set the CSRF cookie, which is part of the ETag.
+        self.client.get(url)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response["ETag"]
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_question_view_changes_after_answer(self):
+        self._assert_not_modified_until_change(
+            reverse('question', kwargs={'question_id': self.question.id}),
+            lambda: UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Answer"))
+
+    def test_question_view_changes_after_question_edit(self):
+        def change():
+            self.question.text = "Updated Question"
+            self.question.save()
+
+        self._assert_not_modified_until_change(reverse('question', kwargs={'question_id': self.question.id}), change)
+
+    def test_review_view_changes_after_feedback(self):
+        user_answer = UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Answer")
+
+        def change():
+            user_answer.admin_feedback = "Good"
+            user_answer.admin_feedback_on = timezone.now()
+            user_answer.save()
+
+        self._assert_not_modified_until_change(reverse('quiz_review', kwargs={'quiz_id': self.quiz.id}), change)
+
+    def test_quiz_list_view_changes_after_new_quiz(self):
+        self._assert_not_modified_until_change(
+            reverse('quiz_list', kwargs={'course_id': self.course.id}),
+            lambda: Quiz.objects.create(course=self.course, title="Another Quiz"))
+
+    def test_etag_is_private_to_user(self):
+        url = reverse('quiz_review', kwargs={'quiz_id': self.quiz.id})
+        etag = self.client.get(url)["ETag"]
+        User.objects.create_user(username='other_user', password='password')
+        self.client.login(username='other_user', password='password')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("private", response["Cache-Control"])
+
+    def test_etag_parts_are_required(self):
+        class IncompleteView(ConditionalGetMixin, TemplateView):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteView()
+
+    @override_settings(SHARED_CACHE_REQUIRED=True)
+    def test_shared_cache_required(self):
+        self.assertEqual([x.id for x in check_shared_cache(None)], ["quiz.E001"])
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.db.DatabaseCache",
+                                                   "LOCATION": "quiz_cache"}}):
+            self.assertEqual(check_shared_cache(None), [])
@@ -0,0 +1,42 @@
+import multiprocessing
+import os
+import runpy
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..db_pool import get_pool_options
+
+
+class DatabasePoolTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.user = User.objects.create_user(username='user', password='userpass')
+        cls.client = Client()
+
+    def test_pool_size_split_between_workers(self):
+        self.assertEqual(get_pool_options(workers=4, threads=8, max_connections=40)["max_size"], 8)
+        self.assertEqual(get_pool_options(workers=8, threads=8, max_connections=40)["max_size"], 5)
+        self.assertEqual(get_pool_options(workers=80, threads=8, max_connections=40)["max_size"], 1)
+        options = get_pool_options(workers=1, threads=1, max_connections=40)
+        self.assertLessEqual(options["min_size"], options["max_size"])
+
+    def test_gunicorn_exports_worker_count(self):
+        with tempfile.TemporaryDirectory() as metrics_dir, mock.patch.dict(os.environ, clear=True,
+                                                                           PROMETHEUS_MULTIPROC_DIR=metrics_dir):
+            config = runpy.run_path(str(settings.BASE_DIR / "gunicorn.conf.py"))
+            self.assertEqual(config["workers"], multiprocessing.cpu_count() * 2 + 1)
+            self.assertEqual(os.environ["WEB_CONCURRENCY"], str(config["workers"]))
+            self.assertEqual(os.environ["WEB_THREADS"], str(config["threads"]))
+
+    def test_stats_view(self):
+        self.client.login(username='user', password='userpass')
+        self.assertEqual(self.client.get(reverse('db_pool_stats')).status_code, 403)
+        self.client.login(username='admin', password='adminpass')
+        response = self.client.get(reverse('db_pool_stats'))
+        self.assertEqual(response.json()["pools"], {"default": {}})
@@ -0,0 +1,81 @@
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.db import router
+from django.http import HttpResponse
+from django.template import engines
+from django.template.response import SimpleTemplateResponse
+from django.test import SimpleTestCase, RequestFactory, AsyncRequestFactory, override_settings
+from django.views import View
+
+from ..db_routing import PRIMARY_PIN_COOKIE, PrimaryPinMiddleware, ReplicaReadMixin, replica_reads
+from ..models import Course
+
+
+def read_alias():
+    return router.db_for_read(Course)
+
+
+class ProbeView(ReplicaReadMixin, View):
+    def get(self, request):
+        return HttpResponse(read_alias())
+
+    def post(self, request):
+        return HttpResponse(read_alias())
+
+
+class TemplateProbeView(ReplicaReadMixin, View):
+    def get(self, request):
+        return SimpleTemplateResponse(engines["django"].from_string("{{ probe }}"), {"probe": read_alias})
+
+
+class AsyncProbeView(ReplicaReadMixin, View):
+    async def get(self, request):
+        return HttpResponse(read_alias())
+
+
+@override_settings(REPLICA_DATABASE="replica")
+class ReplicaRoutingTest(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_reads_outside_views_use_primary(self):
+        self.assertEqual(read_alias(), "default")
+        with replica_reads():
+            self.assertEqual(read_alias(), "replica")
+            self.assertEqual(router.db_for_write(Course), "default")
+
+    def test_database_cache_reads_use_primary(self):
+        with replica_reads():
+            self.assertEqual(router.db_for_read(DatabaseCache("quiz_cache", {}).cache_model_class), "default")
+
+    @override_settings(REPLICA_DATABASE=None)
+    def test_without_replica(self):
+        with replica_reads():
+            self.assertEqual(read_alias(), "default")
+
+    def test_read_only_view_uses_replica(self):
+        self.assertEqual(ProbeView.as_view()(self.factory.get("/")).content, b"replica")
+        self.assertEqual(ProbeView.as_view()(self.factory.post("/")).content, b"default")
+
+    def test_lazy_template_rendered_on_replica(self):
+        self.assertEqual(TemplateProbeView.as_view()(self.factory.get("/")).content, b"replica")
+        self.assertEqual(read_alias(), "default")
+
+    async def test_async_view_uses_replica(self):
+        response = await AsyncProbeView.as_view()(AsyncRequestFactory().get("/"))
+        self.assertEqual(response.content, b"replica")
+
+    def test_client_pinned_to_primary_after_write(self):
+        middleware = PrimaryPinMiddleware(ProbeView.as_view())
+        response = middleware(self.factory.post("/"))
+        pinned_until = response.cookies[PRIMARY_PIN_COOKIE].value
+        self.assertGreater(float(pinned_until), time.time())
+
+        request = self.factory.get("/")
+        request.COOKIES[PRIMARY_PIN_COOKIE] = pinned_until
+        self.assertEqual(middleware(request).content, b"default")
+        self.assertNotIn(PRIMARY_PIN_COOKIE, middleware(request).cookies)
+
+        request.COOKIES[PRIMARY_PIN_COOKIE] = str(time.time() - 1)
+        self.assertEqual(middleware(request).content, b"replica")
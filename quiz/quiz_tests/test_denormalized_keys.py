@@ -0,0 +1,53 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+from ..leaderboard import find_score_mismatches
+from ..models import Course, Quiz, Question, UserAnswer, CourseScore
+
+migration = import_module("quiz.migrations.0015_useranswer_quiz_course")
+
+
+class DenormalizedKeysTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.other_course = Course.objects.create(title="Other Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.other_quiz = Quiz.objects.create(course=cls.other_course, title="Other Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Otázka", type=Question.SHORT_TEXT)
+
+    def test_keys_set_on_insert(self):
+        user_answer = UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Odpověď")
+        user_answer.refresh_from_db()
+        self.assertEqual((user_answer.quiz, user_answer.course), (self.quiz, self.course))
+        self.assertTrue(self.course.has_answers)
+        self.assertFalse(self.other_course.has_answers)
+
+    def test_keys_follow_moved_question(self):
+        UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Odpověď", points=2)
+        self.question.quiz = self.other_quiz
+        self.question.save()
+        self.assertEqual(list(UserAnswer.objects.values_list("quiz_id", "course_id")),
+                         [(self.other_quiz.pk, self.other_course.pk)])
+        self.assertEqual(CourseScore.objects.get(course=self.other_course, user=self.user).points, 2)
+        self.assertEqual(find_score_mismatches(), [])
+
+    def test_keys_follow_moved_quiz(self):
+        UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Odpověď", points=1)
+        self.quiz.course = self.other_course
+        self.quiz.save()
+        self.assertEqual(list(UserAnswer.objects.values_list("quiz_id", "course_id")),
+                         [(self.quiz.pk, self.other_course.pk)])
+        self.assertEqual(find_score_mismatches(), [])
+
+    def test_backfill_runs_one_update_per_question(self):
+        user_answer = UserAnswer.objects.create(user=self.user, question=self.question, answer_text="Odpověď")
+        UserAnswer.objects.filter(pk=user_answer.pk).update(quiz=self.other_quiz, course=self.other_course)
+        with self.assertNumQueries(4):
+            migration.fill_quiz_and_course(apps, None)
+        # Only empty keys are filled, rows which already have them are left alone.
+        self.assertEqual(UserAnswer.objects.get(pk=user_answer.pk).course_id, self.other_course.pk)
@@ -0,0 +1,74 @@
+import io
+import os
+import shutil
+import tempfile
+
+from PIL import Image
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Course, Quiz, Question, AttachmentDerivative
+
+
+def create_image_upload(name="screenshot.png", size=(800, 600)) -> SimpleUploadedFile:
+    content = io.BytesIO()
+    Image.new("RGB", size, "red").save(content, "PNG")
+    return SimpleUploadedFile(name, content.getvalue(), content_type="image/png")
+
+
+class AttachmentDerivativeTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root, ATTACHMENT_DERIVATIVE_WORKERS=0)
+        cls.settings_override.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.client = Client()
+
+    def _create_question(self) -> Question:
+        with self.captureOnCommitCallbacks(execute=True):
+            return Question.objects.create(quiz=self.quiz, text="Sample Question", attachment_1=create_image_upload())
+
+    def test_derivatives_built_on_upload(self):
+        question = self._create_question()
+        derivative = AttachmentDerivative.objects.get(source=question.attachment_1.name)
+        self.assertEqual(sorted(derivative.variants, key=int), ["160", "320", "640", "800"])
+        for name in derivative.variants.values():
+            self.assertTrue(default_storage.exists(name))
+        with Image.open(default_storage.path(derivative.variants["160"])) as image:
+            self.assertEqual(image.size, (160, 120))
+
+    def test_identical_uploads_share_derivatives(self):
+        first = AttachmentDerivative.objects.get(source=self._create_question().attachment_1.name)
+        second = AttachmentDerivative.objects.get(source=self._create_question().attachment_1.name)
+        self.assertNotEqual(first.source, second.source)
+        self.assertEqual(first.variants, second.variants)
+
+    def test_question_page_uses_srcset(self):
+        question = self._create_question()
+        self.client.login(username='user', password='password')
+        response = self.client.get(reverse('question', kwargs={'question_id': question.id}))
+        self.assertContains(response, 'srcset="/media/derivatives/')
+
+    def test_backfill_command_uses_process_pool(self):
+        question = self._create_question()
+        AttachmentDerivative.objects.all().delete()
+        call_command("build_attachment_derivatives", workers=1, stdout=io.StringIO())
+        derivative = AttachmentDerivative.objects.get(source=question.attachment_1.name)
+        self.assertTrue(os.path.exists(default_storage.path(derivative.variants["320"])))
@@ -0,0 +1,35 @@
+from django.contrib.auth.models import User
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Course, Quiz, Question
+
+
+class FragmentCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.course = Course.objects.create(title="Test Course", description="Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Test Quiz")
+        cls.other_quiz = Quiz.objects.create(course=cls.course, title="Other Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Původní zadání", type=Question.SHORT_TEXT)
+        cls.other_question = Question.objects.create(quiz=cls.other_quiz, text="Jiný kvíz", type=Question.SHORT_TEXT)
+        cls.client = Client()
+
+    def setUp(self):
+        self.client.login(username='admin', password='adminpass')
+
+    def test_question_content_reused_until_content_changes(self):
+        url = reverse('question', kwargs={'question_id': self.question.id})
+        self.assertContains(self.client.get(url), "Původní zadání")
+        # A queryset update skips the signals, so the content version stays and the cached fragment is served.
+        Question.objects.filter(pk=self.question.pk).update(text="Tiše změněno")
+        self.assertContains(self.client.get(url), "Původní zadání")
+        self.question.text = "Nové zadání"
+        self.question.save()
+        self.assertContains(self.client.get(url), "Nové zadání")
+
+    def test_admin_review_lists_questions_of_quiz(self):
+        response = self.client.get(reverse('admin_quiz_review', kwargs={'quiz_id': self.quiz.id}))
+        self.assertContains(response, "Původní zadání")
+        self.assertNotContains(response, "Jiný kvíz")
@@ -0,0 +1,91 @@
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..leaderboard import get_top_scores, find_score_mismatches
+from ..models import Course, Quiz, Question, Option, UserAnswer, CourseScore
+from ..regrade import regrade_questions
+
+
+class LeaderboardTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.alice = User.objects.create_user(username='alice', password='password')
+        cls.bob = User.objects.create_user(username='bob', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.single = Question.objects.create(quiz=cls.quiz, text="Pick one",
+                                             type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER, max_attempts=3)
+        cls.options = [Option.objects.create(question=cls.single, text=f"Option {x}", is_correct=x == 0)
+                       for x in range(3)]
+        cls.text = Question.objects.create(quiz=cls.quiz, text="Explain", type=Question.SHORT_TEXT)
+        cls.client = Client()
+
+    def _answer(self, user, option) -> UserAnswer:
+        return self.single.evaluate_response({"selected_option": str(option.id)}, user)
+
+    def _points(self, user) -> Decimal:
+        return CourseScore.objects.get(course=self.course, user=user).points
+
+    def test_only_last_attempt_counts(self):
+        self._answer(self.alice, self.options[0])
+        self.assertEqual(self._points(self.alice), 1)
+        self._answer(self.alice, self.options[1])
+        self.assertEqual(self._points(self.alice), 0)
+        self._answer(self.alice, self.options[0])
+        self.assertEqual(self._points(self.alice), 1)
+        self.assertEqual(find_score_mismatches(), [])
+
+    def test_coach_feedback_updates_score(self):
+        user_answer = UserAnswer.objects.create(user=self.bob, question=self.text, answer_text="Answer")
+        self.client.login(username='admin', password='adminpass')
+        self.client.post(reverse('admin_feedback', kwargs={'quiz_id': self.quiz.id, 'user_id': self.bob.id}),
+                         {f"feedback_{user_answer.id}": "Dobře", f"points_{user_answer.id}": "0,5"})
+        self.assertEqual(self._points(self.bob), Decimal("0.5"))
+        self.client.post(reverse('admin_feedback', kwargs={'quiz_id': self.quiz.id, 'user_id': self.bob.id}),
+                         {f"feedback_{user_answer.id}": ""})
+        self.assertEqual(self._points(self.bob), 0)
+
+    def test_delete_updates_score(self):
+        self._answer(self.alice, self.options[1])
+        last = self._answer(self.alice, self.options[0])
+        last.delete()
+        self.assertEqual(self._points(self.alice), 0)
+
+    def test_regrade_updates_score(self):
+        self._answer(self.alice, self.options[1])
+        Option.objects.filter(pk=self.options[1].pk).update(is_correct=True)
+        regrade_questions(Question.objects.filter(pk=self.single.pk))
+        self.assertEqual(self._points(self.alice), 1)
+
+    def test_ranking(self):
+        carol = User.objects.create_user(username='carol', password='password')
+        self._answer(self.alice, self.options[0])
+        self._answer(carol, self.options[0])
+        self._answer(self.bob, self.options[1])
+        self.assertEqual([(x.user.username, x.rank) for x in get_top_scores(self.course.id)],
+                         [("alice", 1), ("carol", 1), ("bob", 3)])
+
+    def test_rebuild_command(self):
+        self._answer(self.alice, self.options[0])
+        CourseScore.objects.update(points=5)
+        with self.assertRaises(CommandError):
+            call_command("rebuild_leaderboard", check=True, stdout=io.StringIO())
+        call_command("rebuild_leaderboard", stdout=io.StringIO())
+        self.assertEqual(self._points(self.alice), 1)
+        call_command("rebuild_leaderboard", check=True, stdout=io.StringIO())
+
+    def test_leaderboard_view(self):
+        self._answer(self.alice, self.options[0])
+        self.client.login(username='alice', password='password')
+        url = reverse('course_leaderboard', kwargs={'course_id': self.course.id})
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.login(username='admin', password='adminpass')
+        response = self.client.get(url)
+        self.assertContains(response, "alice")
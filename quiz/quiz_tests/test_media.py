@@ -0,0 +1,117 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, Client, override_settings
+
+from ..models import AttachmentDerivative, Course, Quiz, Question
+
+
+class MediaViewTest(TestCase):
+    content = bytes(range(256)) * 40
+
+    @classmethod
+    def setUpClass(cls):
+        # setUpTestData uploads files, so the media root has to be swapped before it runs.
+        cls.media_root = tempfile.mkdtemp()
+        cls.settings_override = override_settings(MEDIA_ROOT=cls.media_root, MEDIA_SENDFILE=None)
+        cls.settings_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+        super().tearDownClass()
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description",
+                                           attachment=SimpleUploadedFile("syllabus.pdf", cls.content))
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Sample Question",
+                                               attachment_1=SimpleUploadedFile("lecture.pdf", cls.content))
+        cls.client = Client()
+
+    def setUp(self):
+        # Changes of attachments are rolled back after each test, the cached access levels are not.
+        cache.clear()
+
+    def test_public_attachment_with_cache_headers(self):
+        response = self.client.get(self.course.attachment.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), self.content)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        self.assertEqual(response["Cache-Control"], "max-age=31536000, public")
+
+        response = self.client.get(self.course.attachment.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(response.status_code, 304)
+
+    def test_question_attachment_requires_login(self):
+        response = self.client.get(self.question.attachment_1.url)
+        self.assertEqual(response.status_code, 302)
+        self.client.login(username='user', password='password')
+        response = self.client.get(self.question.attachment_1.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "max-age=31536000, private")
+
+    def test_access_cached_until_attachment_changes(self):
+        url = self.course.attachment.url
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.course.attachment = None
+        self.course.save()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_unknown_file_not_found(self):
+        self.assertEqual(self.client.get("/media/attachments/missing.pdf").status_code, 404)
+        self.assertEqual(self.client.get("/media/../settings.py").status_code, 404)
+
+    def test_derivatives_only_when_stored(self):
+        content_hash = "ab" * 32
+        name = f"derivatives/ab/{content_hash}_160.webp"
+        for path in [name, "secret.txt", f"derivatives/ab/{content_hash}_320.webp"]:
+            os.makedirs(os.path.dirname(os.path.join(self.media_root, path)), exist_ok=True)
+            with open(os.path.join(self.media_root, path), "wb") as file:
+                file.write(self.content)
+        self.client.login(username='user', password='password')
+        self.assertEqual(self.client.get("/media/" + name).status_code, 404)
+        AttachmentDerivative.objects.create(source=self.question.attachment_1.name, content_hash=content_hash,
+                                            variants={"160": name})
+        response = self.client.get("/media/" + name)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Cache-Control"], "max-age=31536000, private, immutable")
+        self.assertEqual(self.client.get(f"/media/derivatives/ab/{content_hash}_320.webp").status_code, 404)
+        for url in ["/media/secret.txt", "/media/derivatives/../secret.txt", "/media/derivatives/%2e%2e/secret.txt",
+                    "/media/derivatives/ab/../../secret.txt"]:
+            self.assertEqual(self.client.get(url).status_code, 404, url)
+
+    def test_range_request(self):
+        response = self.client.get(self.course.attachment.url, HTTP_RANGE="bytes=100-199")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], f"bytes 100-199/{len(self.content)}")
+        self.assertEqual(response["Content-Length"], "100")
+        self.assertEqual(b"".join(response.streaming_content), self.content[100:200])
+
+        response = self.client.get(self.course.attachment.url, HTTP_RANGE="bytes=-10")
+        self.assertEqual(b"".join(response.streaming_content), self.content[-10:])
+
+        response = self.client.get(self.course.attachment.url, HTTP_RANGE=f"bytes={len(self.content)}-")
+        self.assertEqual(response.status_code, 416)
+
+    def test_range_ignored_when_if_range_does_not_match(self):
+        response = self.client.get(self.course.attachment.url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"stale"')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(MEDIA_SENDFILE="x-accel-redirect")
+    def test_offloaded_to_proxy(self):
+        response = self.client.get(self.course.attachment.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Accel-Redirect"], "/protected-media/" + self.course.attachment.name)
+        self.assertEqual(response.content, b"")
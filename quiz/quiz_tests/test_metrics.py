@@ -0,0 +1,114 @@
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from prometheus_client import REGISTRY
+
+from ..cache import get_content_version
+from ..fake_openai import FakeOpenAIServer
+from ..metrics import observe_openai_request
+from ..models import Course, Quiz, Question, Option, UserAnswer, ChatGPTLog
+
+WORKER = """
+from quiz.metrics import count_cache_lookup
+count_cache_lookup("answer_key", True)
+"""
+SCRAPE = """
+from quiz.metrics import render_metrics
+print(render_metrics()[0].decode())
+"""
+
+
+def sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+class MetricsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Test Course", ai_api_key="test-key",
+                                           ai_prompt_format="[question_text] [answer_text]")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Test Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Pick one",
+                                               type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        cls.option = Option.objects.create(question=cls.question, text="Option", is_correct=True)
+        cls.client = Client()
+
+    def test_request_latency_and_queries(self):
+        self.client.login(username='user', password='password')
+        labels = {"view": "quiz_list", "method": "GET", "status": "200"}
+        count = sample("quiz_http_request_duration_seconds_count", **labels)
+        queries = sample("quiz_http_request_db_queries_sum", view="quiz_list")
+        with CaptureQueriesContext(connection) as captured:
+            self.client.get(reverse('quiz_list', kwargs={'course_id': self.course.id}))
+        self.assertEqual(sample("quiz_http_request_duration_seconds_count", **labels), count + 1)
+        self.assertEqual(sample("quiz_http_request_db_queries_sum", view="quiz_list") - queries, len(captured))
+        self.client.get("/does-not-exist/")
+        self.assertGreater(sample("quiz_http_request_duration_seconds_count", view="unmatched", method="GET",
+                                  status="404"), 0)
+
+    def test_evaluate_response_and_cache_lookups(self):
+        count = sample("quiz_evaluate_response_duration_seconds_count", type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        misses = sample("quiz_cache_lookups_total", cache="answer_key", result="miss")
+        hits = sample("quiz_cache_lookups_total", cache="answer_key", result="hit")
+        for _ in range(2):
+            self.question.evaluate_response({"selected_option": str(self.option.id)}, self.user)
+        self.assertEqual(sample("quiz_evaluate_response_duration_seconds_count",
+                                type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER), count + 2)
+        self.assertEqual(sample("quiz_cache_lookups_total", cache="answer_key", result="miss"), misses + 1)
+        self.assertEqual(sample("quiz_cache_lookups_total", cache="answer_key", result="hit"), hits + 1)
+        hits = sample("quiz_cache_lookups_total", cache="content_version", result="hit")
+        get_content_version(self.course.pk)
+        self.assertEqual(sample("quiz_cache_lookups_total", cache="content_version", result="hit"), hits + 1)
+
+    def test_openai_requests(self):
+        question = Question.objects.create(quiz=self.quiz, text="Popiš cyklus", type=Question.SHORT_TEXT)
+        user_answer = UserAnswer.objects.create(user=self.user, question=question, answer_text="Opakuje kód")
+        tokens = sample("quiz_openai_tokens_total", model="gpt-4", kind="completion")
+        count = sample("quiz_openai_request_duration_seconds_count", model="gpt-4", outcome="ok")
+        with FakeOpenAIServer(tokens=["Dobrá ", "odpověď."]) as server, \
+                override_settings(OPENAI_BASE_URL=server.base_url):
+            ChatGPTLog.send_request(user_answer)
+        self.assertEqual(sample("quiz_openai_tokens_total", model="gpt-4", kind="completion"), tokens + 2)
+        self.assertEqual(sample("quiz_openai_request_duration_seconds_count", model="gpt-4", outcome="ok"),
+                         count + 1)
+        errors = sample("quiz_openai_errors_total", model="gpt-4", error="TimeoutError")
+        with self.assertRaises(TimeoutError), observe_openai_request("gpt-4"):
+            raise TimeoutError
+        self.assertEqual(sample("quiz_openai_errors_total", model="gpt-4", error="TimeoutError"), errors + 1)
+
+    @override_settings(METRICS_TOKEN="scrape-token")
+    def test_endpoint_access(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertContains(response, "quiz_http_request_duration_seconds_bucket")
+        self.client.login(username='admin', password='adminpass')
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+    def test_workers_are_aggregated(self):
+        with tempfile.TemporaryDirectory() as directory:
+            env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": directory}
+            for _ in range(2):
+                subprocess.run([sys.executable, "-c", WORKER], env=env, cwd=settings.BASE_DIR, check=True)
+            result = subprocess.run([sys.executable, "-c", SCRAPE], env=env, cwd=settings.BASE_DIR, check=True,
+                                    capture_output=True, text=True)
+        self.assertIn('quiz_cache_lookups_total{cache="answer_key",result="hit"} 2.0', result.stdout)
+
+    def test_production_middleware(self):
+        with mock.patch.dict(os.environ, AZURE_POSTGRESQL_CONNECTIONSTRING="dbname=quiz host=db user=quiz password=x"):
+            production = runpy.run_module("CzechitasQuizApp.production")
+        self.assertTrue(production["METRICS_ENABLED"])
+        self.assertEqual(production["MIDDLEWARE"][0], "quiz.metrics.MetricsMiddleware")
+        self.assertIn("quiz.db_routing.PrimaryPinMiddleware", production["MIDDLEWARE"])
@@ -0,0 +1,86 @@
+import io
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from ..models import Course, Quiz, Question, Option, UserAnswer
+from ..regrade import regrade_questions
+
+
+class RegradeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.multiple = Question.objects.create(quiz=cls.quiz, text="Pick two",
+                                               type=Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER)
+        cls.multiple_options = [Option.objects.create(question=cls.multiple, text=f"Option {x}", is_correct=x < 2)
+                                for x in range(4)]
+        cls.single = Question.objects.create(quiz=cls.quiz, text="Pick one",
+                                             type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        cls.single_options = [Option.objects.create(question=cls.single, text=f"Option {x}", is_correct=x == 0)
+                              for x in range(3)]
+
+    def setUp(self):
+        # The answer keys cached by a test outlive the rollback of its option updates.
+        cache.clear()
+
+    def _answer_multiple(self, options) -> UserAnswer:
+        return self.multiple.evaluate_response({f"option_{x.id}": str(x.id) for x in options}, self.user)
+
+    def test_regrade_matches_evaluate_response(self):
+        answers = [self._answer_multiple(self.multiple_options[:2]), self._answer_multiple(self.multiple_options[1:3])]
+        Option.objects.filter(pk=self.multiple_options[0].pk).update(is_correct=False)
+        Option.objects.filter(pk=self.multiple_options[2].pk).update(is_correct=True)
+
+        changes = regrade_questions(Question.objects.filter(pk=self.multiple.pk))
+        self.assertEqual(len(changes), 2)
+        for user_answer in answers:
+            expected = self.multiple.evaluate_response({f"option_{x.id}": str(x.id)
+                                                        for x in user_answer.chosen_options}, self.user)
+            expected.refresh_from_db()
+            user_answer.refresh_from_db()
+            self.assertEqual(user_answer.points, expected.points)
+
+    def test_dry_run_does_not_save(self):
+        user_answer = self.single.evaluate_response({"selected_option": str(self.single_options[1].id)}, self.user)
+        Option.objects.filter(pk=self.single_options[1].pk).update(is_correct=True)
+
+        changes = regrade_questions(Question.objects.filter(quiz=self.quiz), dry_run=True)
+        self.assertEqual([(x.user_answer_id, x.old_points, x.new_points) for x in changes],
+                         [(user_answer.pk, Decimal("0"), Decimal("1"))])
+        user_answer.refresh_from_db()
+        self.assertEqual(user_answer.points, 0)
+
+        regrade_questions(Question.objects.filter(quiz=self.quiz))
+        user_answer.refresh_from_db()
+        self.assertEqual(user_answer.points, 1)
+
+    def test_review_not_cached_after_regrade(self):
+        self.single.evaluate_response({"selected_option": str(self.single_options[1].id)}, self.user)
+        client = Client()
+        client.login(username='user', password='password')
+        url = reverse('quiz_review', kwargs={'quiz_id': self.quiz.id})
+        client.get(url)
+        etag = client.get(url)["ETag"]
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        Option.objects.filter(pk=self.single_options[1].pk).update(is_correct=True)
+        regrade_questions(Question.objects.filter(quiz=self.quiz))
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_unchanged_answers_not_reported(self):
+        self._answer_multiple(self.multiple_options[:2])
+        self.assertEqual(regrade_questions(Question.objects.filter(quiz=self.quiz)), [])
+
+    def test_command_reports_changes(self):
+        self._answer_multiple(self.multiple_options[:2])
+        Option.objects.filter(pk=self.multiple_options[3].pk).update(is_correct=True)
+        output = io.StringIO()
+        call_command("regrade_answers", quiz=[self.quiz.pk], dry_run=True, stdout=output)
+        self.assertIn("1.00 -> 0.67", output.getvalue())
+        self.assertIn("Would change points of 1 answers.", output.getvalue())
@@ -0,0 +1,54 @@
+import io
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from ..models import Course, Quiz, Question, UserAnswer, ChatGPTLog, ChatGPTLogArchive, ChatGPTLogArchiveEntry
+from ..retention import archive_chatgpt_logs, get_chatgpt_logs
+
+
+class ChatGPTLogRetentionTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='user', password='userpass')
+        course = Course.objects.create(title="Test Course")
+        quiz = Quiz.objects.create(course=course, title="Test Quiz")
+        question = Question.objects.create(quiz=quiz, text="Test Question", type=Question.SHORT_TEXT)
+        cls.user_answer = UserAnswer.objects.create(user=user, question=question, answer_text="Answer")
+        cls.other_answer = UserAnswer.objects.create(user=user, question=question, answer_text="Other")
+        now = timezone.now()
+        for number in range(5):
+            log = ChatGPTLog.objects.create(message=f"Otázka {number}", response=f"Odpověď {number}",
+                                            user_answer=cls.user_answer if number % 2 else cls.other_answer)
+            ChatGPTLog.objects.filter(pk=log.pk).update(created_at=now - timedelta(days=100 + number))
+        cls.recent_log = ChatGPTLog.objects.create(message="Nová", response="Nová odpověď",
+                                                   user_answer=cls.user_answer)
+
+    def test_old_logs_archived_in_batches(self):
+        archived = archive_chatgpt_logs(timezone.now() - timedelta(days=90), batch_size=2)
+        self.assertEqual(archived, 5)
+        self.assertEqual(ChatGPTLogArchive.objects.count(), 3)
+        self.assertEqual(ChatGPTLogArchiveEntry.objects.count(), 5)
+        self.assertEqual(list(ChatGPTLog.objects.values_list("id", flat=True)), [self.recent_log.id])
+
+    def test_max_batches(self):
+        self.assertEqual(archive_chatgpt_logs(timezone.now() - timedelta(days=90), batch_size=2, max_batches=1), 2)
+        self.assertEqual(ChatGPTLog.objects.count(), 4)
+
+    def test_archived_logs_found_by_user_answer(self):
+        archive_chatgpt_logs(timezone.now() - timedelta(days=90), batch_size=2)
+        logs = get_chatgpt_logs(self.user_answer.id)
+        self.assertEqual([x["message"] for x in logs], ["Otázka 3", "Otázka 1", "Nová"])
+        self.assertEqual(logs[0]["response"], "Odpověď 3")
+        self.assertTrue(all(x["user_answer_id"] == self.user_answer.id for x in logs))
+
+    def test_command_dry_run(self):
+        output = io.StringIO()
+        call_command("archive_chatgpt_logs", days=90, dry_run=True, stdout=output)
+        self.assertIn("Would archive 5 logs", output.getvalue())
+        self.assertEqual(ChatGPTLog.objects.count(), 6)
+        call_command("archive_chatgpt_logs", days=90, stdout=io.StringIO())
+        self.assertEqual(ChatGPTLog.objects.count(), 1)
@@ -0,0 +1,105 @@
+import io
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Course, Quiz, Question, Option, UserAnswer, SearchDocument
+from ..search import SearchResults
+
+
+class SearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.superuser = User.objects.create_superuser(username='admin', password='adminpass')
+        cls.alice = User.objects.create_user(username='alice', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.other_course = Course.objects.create(title="Other Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.other_quiz = Quiz.objects.create(course=cls.other_course, title="Other Quiz")
+        cls.question = Question.objects.create(quiz=cls.quiz, text="Vysvětli list comprehension",
+                                               type=Question.SHORT_TEXT)
+        cls.choice = Question.objects.create(quiz=cls.other_quiz, text="Vyber datový typ",
+                                             type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        cls.option = Option.objects.create(question=cls.choice, text="Slovník", is_correct=True,
+                                           feedback="Slovník mapuje klíče na hodnoty")
+        cls.client = Client()
+
+    def _search(self, query: str, **kwargs) -> list:
+        return [(x.kind, x.object_id) for x in SearchResults(query, **kwargs)[0:20]]
+
+    def test_index_follows_saves(self):
+        user_answer = UserAnswer.objects.create(user=self.alice, question=self.question,
+                                                answer_text="Zkrácený zápis cyklu for")
+        self.assertEqual(self._search("cyklu"), [(SearchDocument.ANSWER, user_answer.pk)])
+        user_answer.admin_feedback = "Chybí podmínka"
+        user_answer.save()
+        self.assertEqual(self._search("podmínka"), [(SearchDocument.ANSWER, user_answer.pk)])
+        self.question.text = "Vysvětli generator expression"
+        self.question.save()
+        self.assertEqual(self._search("comprehension"), [])
+        user_answer.delete()
+        self.assertEqual(self._search("cyklu"), [])
+
+    def test_options_and_feedback_are_indexed(self):
+        self.assertEqual(self._search("slovník"), [(SearchDocument.OPTION, self.option.pk)])
+        self.assertEqual(self._search("hodnoty"), [(SearchDocument.OPTION, self.option.pk)])
+        self.option.delete()
+        self.assertEqual(self._search("slovník"), [])
+
+    def test_prefix_diacritics_and_filters(self):
+        self.assertEqual(self._search("slovnik"), [(SearchDocument.OPTION, self.option.pk)])
+        self.assertEqual(self._search("compreh"), [(SearchDocument.QUESTION, self.question.pk)])
+        self.assertEqual(self._search("vysvětli typ"), [])
+        self.assertEqual(self._search("slovník", course_id=self.course.pk), [])
+        self.assertEqual(self._search("slovník", kinds=[SearchDocument.QUESTION]), [])
+
+    def test_query_syntax_is_not_interpreted(self):
+        for query in ['"', "NOT slovník", "slovník OR", "a*b:c", "(", "", "   "]:
+            SearchResults(query).count()
+            SearchResults(query)[0:20]
+
+    def test_snippet_is_escaped_and_highlighted(self):
+        UserAnswer.objects.create(user=self.alice, question=self.question, answer_text="<script>cyklus</script>")
+        result = SearchResults("cyklus")[0:1][0]
+        self.assertIn("<mark>cyklus</mark>", result.snippet)
+        self.assertIn("&lt;script&gt;", result.snippet)
+
+    def test_choice_answers_without_text_are_not_indexed(self):
+        user_answer = self.choice.evaluate_response({"selected_option": str(self.option.id)}, self.alice)
+        self.assertFalse(SearchDocument.objects.filter(kind=SearchDocument.ANSWER, object_id=user_answer.pk).exists())
+
+    def test_rebuild(self):
+        UserAnswer.objects.create(user=self.alice, question=self.question, answer_text="Zkrácený zápis cyklu for")
+        expected = sorted(SearchDocument.objects.values_list("kind", "object_id", "course_id", "user_id", "text"))
+        SearchDocument.objects.all().delete()
+        out = io.StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn("Indexed 4 documents", out.getvalue())
+        self.assertEqual(sorted(SearchDocument.objects.values_list("kind", "object_id", "course_id", "user_id",
+                                                                   "text")), expected)
+        self.assertEqual(len(self._search("cyklu")), 1)
+
+    def test_search_view(self):
+        for number in range(25):
+            UserAnswer.objects.create(user=self.alice, question=self.question, answer_text=f"Cyklus {number}")
+        self.client.login(username='alice', password='password')
+        self.assertEqual(self.client.get(reverse('search'), {"q": "cyklus"}).status_code, 403)
+        self.client.login(username='admin', password='adminpass')
+        response = self.client.get(reverse('search'), {"q": "cyklus", "course": self.course.pk})
+        self.assertEqual(response.context["paginator"].count, 25)
+        self.assertEqual(len(response.context["results"]), 20)
+        self.assertContains(response, "<mark>Cyklus</mark>")
+        response = self.client.get(reverse('search'), {"q": "cyklus", "page": 2})
+        self.assertEqual(len(response.context["results"]), 5)
+        response = self.client.get(reverse('search'))
+        self.assertEqual(list(response.context["results"]), [])
+
+    @override_settings(SEARCH_MAX_RESULTS=3)
+    def test_only_newest_matches_are_ranked(self):
+        user_answers = [UserAnswer.objects.create(user=self.alice, question=self.question, answer_text="Cyklus")
+                        for _ in range(5)]
+        results = SearchResults("cyklus")
+        self.assertEqual(results.count(), 3)
+        self.assertEqual(sorted(x.object_id for x in results[0:20]), [x.pk for x in user_answers[2:]])
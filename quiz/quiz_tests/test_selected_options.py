@@ -0,0 +1,76 @@
+from importlib import import_module
+
+from django.apps import apps
+from django.contrib.auth.models import User
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from ..models import Course, Quiz, Question, Option, UserAnswer
+
+migration = import_module("quiz.migrations.0014_useranswer_selected_option_ids")
+
+
+class SelectedOptionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        cls.multiple = Question.objects.create(quiz=cls.quiz, text="Pick two", order=1,
+                                               type=Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER)
+        cls.multiple_options = [Option.objects.create(question=cls.multiple, text=f"Option {x}", is_correct=x < 2)
+                                for x in range(4)]
+        cls.single = Question.objects.create(quiz=cls.quiz, text="Pick one", order=2,
+                                             type=Question.MULTIPLE_CHOICE_SINGLE_ANSWER)
+        cls.single_options = [Option.objects.create(question=cls.single, text=f"Option {x}", is_correct=x == 0)
+                              for x in range(3)]
+        cls.client = Client()
+
+    def _answer_multiple(self, options) -> UserAnswer:
+        return self.multiple.evaluate_response({f"option_{x.id}": str(x.id) for x in options}, self.user)
+
+    def test_ids_stored_on_answer(self):
+        user_answer = self._answer_multiple([self.multiple_options[2], self.multiple_options[0]])
+        user_answer.refresh_from_db()
+        self.assertEqual(user_answer.selected_option_ids, [self.multiple_options[0].pk, self.multiple_options[2].pk])
+        self.assertEqual(user_answer.chosen_options, [self.multiple_options[0], self.multiple_options[2]])
+        self.assertFalse(UserAnswer.selected_options.through.objects.exists())
+        single = self.single.evaluate_response({"selected_option": str(self.single_options[1].id)}, self.user)
+        self.assertEqual(single.user_answer, "Option 1")
+        self.assertEqual(single.points, 0)
+
+    @override_settings(SELECTED_OPTIONS_M2M_WRITES=True)
+    def test_m2m_compatibility_writes(self):
+        user_answer = self._answer_multiple(self.multiple_options[:2])
+        self.assertEqual(set(user_answer.selected_options.all()), set(self.multiple_options[:2]))
+
+    def test_deleted_option_removed_from_answers(self):
+        user_answer = self._answer_multiple(self.multiple_options[:3])
+        other = self._answer_multiple(self.multiple_options[1:2])
+        self.multiple_options[0].delete()
+        user_answer.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(user_answer.selected_option_ids, [x.pk for x in self.multiple_options[1:3]])
+        self.assertEqual(other.selected_option_ids, [self.multiple_options[1].pk])
+
+    def test_backfill(self):
+        user_answer = UserAnswer.objects.create(user=self.user, question=self.multiple)
+        user_answer.selected_options.set([self.multiple_options[3], self.multiple_options[1]])
+        other = UserAnswer.objects.create(user=self.user, question=self.single)
+        other.selected_options.set([self.single_options[0]])
+        migration.fill_selected_option_ids(apps, None)
+        user_answer.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(user_answer.selected_option_ids, [self.multiple_options[1].pk, self.multiple_options[3].pk])
+        self.assertEqual(other.selected_option_ids, [self.single_options[0].pk])
+
+    def test_review_does_not_query_per_answer(self):
+        self._answer_multiple(self.multiple_options[:2])
+        self.single.evaluate_response({"selected_option": str(self.single_options[0].id)}, self.user)
+        self.client.login(username='user', password='password')
+        response = self.client.get(reverse('quiz_review', kwargs={'quiz_id': self.quiz.id}))
+        self.assertContains(response, "Option 1")
+        with self.assertNumQueries(0):
+            for answer in response.context["answers"]:
+                answer.user_answer
+                answer.answer_feedback
@@ -0,0 +1,84 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from ..models import Course, Quiz, Question
+from ..slow_queries import JsonFormatter, normalize_sql, get_fingerprint
+
+
+class NormalizeSqlTest(SimpleTestCase):
+    def test_values_and_list_lengths_are_dropped(self):
+        self.assertEqual(normalize_sql('SELECT "id" FROM "quiz_option" WHERE "id" IN (%s, %s, %s) AND "x" = 5'),
+                         'SELECT "id" FROM "quiz_option" WHERE "id" IN (...) AND "x" = ?')
+        self.assertEqual(normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s), (%s, %s)"),
+                         normalize_sql("INSERT INTO t (a, b) VALUES (%s, %s)"))
+        self.assertEqual(normalize_sql("SELECT * FROM t WHERE name = 'it''s'\n  AND attachment_1 = 2"),
+                         "SELECT * FROM t WHERE name = ? AND attachment_1 = ?")
+        self.assertEqual(get_fingerprint(normalize_sql("SELECT 1")), get_fingerprint(normalize_sql("SELECT  2")))
+
+
+class SlowQueryLogTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='user', password='password')
+        cls.course = Course.objects.create(title="Sample Course", description="Course Description")
+        cls.quiz = Quiz.objects.create(course=cls.course, title="Sample Quiz")
+        Question.objects.create(quiz=cls.quiz, text="Otázka", type=Question.SHORT_TEXT)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0)
+    def test_query_logged_with_call_site(self):
+        with self.assertLogs("quiz.slow_queries", "WARNING") as logs:
+            self.quiz.quiz_completed_questions_ids(self.user)
+        call_sites = {x.call_site for x in logs.records}
+        self.assertIn(f"quiz/models.py:{Quiz.quiz_completed_questions_ids.__code__.co_firstlineno + 1} "
+                      "Quiz.quiz_completed_questions_ids", call_sites)
+        entry = json.loads(JsonFormatter().format(logs.records[0]))
+        self.assertEqual(entry["database"], "default")
+        self.assertIn('FROM "quiz_question"', entry["statement"])
+        self.assertEqual(len(entry["fingerprint"]), 16)
+
+    @override_settings(SLOW_QUERY_THRESHOLD_MS=0, SLOW_QUERY_SAMPLE_RATE=0)
+    def test_sampling(self):
+        with self.assertNoLogs("quiz.slow_queries"):
+            self.quiz.quiz_completed(self.user)
+
+    def test_queries_below_threshold_are_not_logged(self):
+        with self.assertNoLogs("quiz.slow_queries"):
+            self.quiz.quiz_completed(self.user)
+
+
+class SlowQueryReportTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.path = os.path.join(self.directory, "slow_queries.log")
+
+    def _write(self, path: str, entries: list):
+        with open(path, "w", encoding="utf-8") as log:
+            for time, fingerprint, duration_ms, call_site, sample_rate in entries:
+                log.write(json.dumps({"time": time, "fingerprint": fingerprint, "statement": f"SELECT {fingerprint}",
+                                      "duration_ms": duration_ms, "call_site": call_site,
+                                      "sample_rate": sample_rate}) + "\n")
+
+    def test_report(self):
+        self._write(self.path + ".1", [
+            ("2026-10-18T10:00:00", "aaa", 300, "quiz/views.py:10 QuizListView.get", 1),
+            ("2026-10-18T10:00:01", "bbb", 3000, "quiz/search.py:20 SearchResults.count", 1),
+        ])
+        self._write(self.path, [("2026-10-19T10:00:00", "aaa", 400, "quiz/models.py:95 Quiz.quiz_completed", 0.1)])
+        out = io.StringIO()
+        call_command("slow_query_report", file=self.path, stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertTrue(lines[0].startswith("aaa  ~11 queries (2 logged), ~4.3 s total"))
+        self.assertIn("quiz/models.py:95 Quiz.quiz_completed", out.getvalue())
+        self.assertIn("2 distinct slow queries in 2 files.", lines[-1])
+
+        out = io.StringIO()
+        call_command("slow_query_report", file=self.path, order_by="max", since="2026-10-18T10:00:01", stdout=out)
+        self.assertTrue(out.getvalue().startswith("bbb  ~1 queries"))
@@ -0,0 +1,15 @@
+import json
+
+from django.test import SimpleTestCase
+
+from ..management.commands.benchmark_startup import Command
+from ..templatetags.custom_filters import convert_markdown_to_html
+
+
+class StartupTest(SimpleTestCase):
+    def test_heavy_dependencies_not_imported_at_boot(self):
+        result = json.loads(Command._boot().stdout)
+        self.assertEqual(result["heavy"], [])
+
+    def test_markdown_imported_on_first_use(self):
+        self.assertEqual(convert_markdown_to_html("**tučně**"), "<p><strong>tučně</strong></p>")
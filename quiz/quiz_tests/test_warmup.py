@@ -0,0 +1,29 @@
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, Client
+from django.urls import reverse
+
+from ..cache import CONTENT_VERSION_KEY
+from ..models import Course
+from ..warmup import warm_up
+
+
+class WarmUpTest(TransactionTestCase):
+    def test_warm_up_primes_caches(self):
+        course = Course.objects.create(title="Test Course", description="Description")
+        cache.clear()
+        result = warm_up()
+        self.assertEqual(result["courses"], 1)
+        self.assertGreater(result["templates"], 10)
+        self.assertIsNotNone(cache.get(CONTENT_VERSION_KEY.format(course_id=course.id)))
+
+
+class HealthCheckTest(TestCase):
+    def test_healthz(self):
+        response = Client().get(reverse("healthz"))
+        self.assertEqual(response.content, b"ok")
+        self.assertIn("no-cache", response["Cache-Control"])
+
+    def test_readyz(self):
+        response = Client().get(reverse("readyz"))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ready": True, "checks": {"database:default": "ok", "cache": "ok"}})
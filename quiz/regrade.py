@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import QuerySet
+
+from .cache import bump_content_version, delete_answer_keys
+from .leaderboard import rebuild_course_scores
+from .models import Question, Option, UserAnswer
+
+POINTS_QUANTUM = Decimal("0.01")
+
+
+@dataclass
+class RegradeChange:
+    user_answer_id: int
+    user_id: int
+    question_id: int
+    attempt_number: int
+    old_points: Optional[Decimal]
+    new_points: Decimal
+
+    def __str__(self):
+        return (f"answer {self.user_answer_id} (user {self.user_id}, question {self.question_id}, "
+                f"attempt {self.attempt_number}): {self.old_points} -> {self.new_points}")
+
+
+def _to_points(value: float) -> Decimal:
+    return UserAnswer._meta.get_field("points").to_python(value).quantize(POINTS_QUANTUM)
+
+
+def _load_option_bits(question_ids: list) -> tuple:
+    # Each option becomes one bit of its question's mask, so set operations reduce to integer arithmetic.
+    option_bits = {}
+    correct_masks = dict.fromkeys(question_ids, 0)
+    next_bit = dict.fromkeys(question_ids, 1)
+    for option_id, question_id, is_correct in (Option.objects.filter(question_id__in=question_ids).order_by("id")
+                                               .values_list("id", "question_id", "is_correct")):
+        bit = next_bit[question_id]
+        next_bit[question_id] = bit << 1
+        option_bits[option_id] = bit
+        if is_correct:
+            correct_masks[question_id] |= bit
+    return option_bits, correct_masks
+
+
+def _load_selected_masks(question_ids: list, option_bits: dict) -> dict:
+    selected_masks = {}
+    for user_answer_id, option_ids in (UserAnswer.objects.filter(question_id__in=question_ids)
+                                       .values_list("id", "selected_option_ids")):
+        selected_masks[user_answer_id] = sum(option_bits.get(x, 0) for x in set(option_ids))
+    return selected_masks
+
+
+def score_mask(question_type: str, selected_mask: int, correct_mask: int) -> float:
+    if question_type == Question.MULTIPLE_CHOICE_SINGLE_ANSWER:
+        return float(bool(selected_mask & correct_mask))
+    if correct_mask == 0:
+        return 0.0
+    return Question.calculate_points((selected_mask & correct_mask).bit_count(),
+                                     (selected_mask & ~correct_mask).bit_count(),
+                                     correct_mask.bit_count(),
+                                     (correct_mask & ~selected_mask).bit_count())
+
+
+def regrade_questions(questions: QuerySet, dry_run: bool = False, chunk_size: int = 500) -> list:
+    question_types = dict(questions.filter(type__in=[Question.MULTIPLE_CHOICE_SINGLE_ANSWER,
+                                                     Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER])
+                          .values_list("id", "type"))
+    question_ids = list(question_types)
+    # Options changed with update() or raw SQL skip the signals, new answers have to be scored with them too.
+    delete_answer_keys(question_ids)
+    option_bits, correct_masks = _load_option_bits(question_ids)
+    selected_masks = _load_selected_masks(question_ids, option_bits)
+
+    changes = []
+    for user_answer_id, user_id, question_id, attempt_number, old_points in (
+            UserAnswer.objects.filter(question_id__in=question_ids).order_by("id")
+            .values_list("id", "user_id", "question_id", "attempt_number", "points")):
+        new_points = _to_points(score_mask(question_types[question_id], selected_masks.get(user_answer_id, 0),
+                                           correct_masks[question_id]))
+        if old_points is None or old_points != new_points:
+            changes.append(RegradeChange(user_answer_id, user_id, question_id, attempt_number, old_points,
+                                         new_points))
+
+    if not dry_run and changes:
+        with transaction.atomic():
+            for start in range(0, len(changes), chunk_size):
+                UserAnswer.objects.bulk_update([UserAnswer(id=x.user_answer_id, points=x.new_points)
+                                                for x in changes[start:start + chunk_size]], ["points"])
+            # bulk_update skips the signals which maintain the leaderboard, so the affected scores are rebuilt.
+            course_ids = set(questions.values_list("quiz__course_id", flat=True))
+            rebuild_course_scores(course_ids, {x.user_id for x in changes})
+            # The review pages show the points, but their ETags only follow new answers and the content version.
+            for course_id in course_ids:
+                bump_content_version(course_id)
+    return changes
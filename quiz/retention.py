@@ -0,0 +1,60 @@
+from datetime import datetime
+
+from django.db import connection, transaction
+
+from .models import ChatGPTLog, ChatGPTLogArchive, ChatGPTLogArchiveEntry
+
+LOG_FIELDS = ("id", "message", "response", "created_at", "user_answer_id")
+
+
+def _serialize_log(log: dict) -> dict:
+    return {**log, "created_at": log["created_at"].isoformat()}
+
+
+def _archive_batch(older_than: datetime, batch_size: int) -> int:
+    with transaction.atomic():
+        logs = ChatGPTLog.objects.filter(created_at__lt=older_than).order_by("id")
+        if connection.features.has_select_for_update_skip_locked:
+            logs = logs.select_for_update(skip_locked=True)
+        logs = list(logs.values(*LOG_FIELDS)[:batch_size])
+        if not logs:
+            return 0
+        archive = ChatGPTLogArchive.objects.create(
+            payload=ChatGPTLogArchive.compress([_serialize_log(x) for x in logs]), entry_count=len(logs),
+            first_created_at=min(x["created_at"] for x in logs), last_created_at=max(x["created_at"] for x in logs))
+        ChatGPTLogArchiveEntry.objects.bulk_create(
+            ChatGPTLogArchiveEntry(archive=archive, position=position, log_id=log["id"],
+                                   user_answer_id=log["user_answer_id"], created_at=log["created_at"])
+            for position, log in enumerate(logs))
+        ChatGPTLog.objects.filter(pk__in=[x["id"] for x in logs]).delete()
+    return len(logs)
+
+
+def archive_chatgpt_logs(older_than: datetime, batch_size: int = 500, max_batches: int = None) -> int:
+    # Every batch is a short transaction of its own, so the log table is never locked for the whole run.
+    archived = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = _archive_batch(older_than, batch_size)
+        if not count:
+            break
+        archived += count
+        batches += 1
+    return archived
+
+
+def get_archived_chatgpt_logs(user_answer_id: int) -> list:
+    entries = (ChatGPTLogArchiveEntry.objects.filter(user_answer_id=user_answer_id).select_related("archive")
+               .order_by("created_at"))
+    archives = {}
+    logs = []
+    for entry in entries:
+        if entry.archive_id not in archives:
+            archives[entry.archive_id] = entry.archive.read_logs()
+        logs.append(archives[entry.archive_id][entry.position])
+    return logs
+
+
+def get_chatgpt_logs(user_answer_id: int) -> list:
+    live_logs = [_serialize_log(x) for x in ChatGPTLog.objects.filter(user_answer_id=user_answer_id)
+                 .order_by("created_at").values(*LOG_FIELDS)]
+    return get_archived_chatgpt_logs(user_answer_id) + live_logs
@@ -0,0 +1,171 @@
+import re
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import NotSupportedError, connections, router, transaction
+from django.db.models import Q
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from .models import Option, Question, SearchDocument, UserAnswer
+
+FTS_TABLE = "quiz_searchdocument_fts"
+MAX_TERMS = 10
+SNIPPET_TOKENS = 24
+# Control characters never occur in the indexed text, so the matches are marked before the snippet is escaped.
+MARK_START, MARK_END = "\x02", "\x03"
+
+MODELS = {SearchDocument.QUESTION: Question, SearchDocument.OPTION: Option, SearchDocument.ANSWER: UserAnswer}
+TEXT_FIELDS = {
+    SearchDocument.QUESTION: ["text"],
+    SearchDocument.OPTION: ["text", "feedback"],
+    SearchDocument.ANSWER: ["answer_text", "admin_feedback", "ai_feedback"],
+}
+
+
+def get_document_text(kind: str, instance) -> str:
+    return "\n".join(x for x in (getattr(instance, field) for field in TEXT_FIELDS[kind]) if x)
+
+
+def remove_documents(kind: str, object_ids: Iterable):
+    SearchDocument.objects.filter(kind=kind, object_id__in=object_ids).delete()
+
+
+def index_documents(kind: str, instances: Iterable) -> int:
+    texts = {x.pk: (x, get_document_text(kind, x)) for x in instances}
+    indexed = {pk: values for pk, values in texts.items() if values[1]}
+    empty = [pk for pk, values in texts.items() if not values[1]]
+    if empty:
+        remove_documents(kind, empty)
+    if not indexed:
+        return 0
+    question_ids = {pk if kind == SearchDocument.QUESTION else x.question_id for pk, (x, _) in indexed.items()}
+    questions = {x[0]: x[1:] for x in Question.objects.filter(pk__in=question_ids)
+                 .values_list("pk", "quiz_id", "quiz__course_id")}
+    documents = []
+    for pk, (instance, text) in indexed.items():
+        question_id = pk if kind == SearchDocument.QUESTION else instance.question_id
+        quiz_id, course_id = questions[question_id]
+        documents.append(SearchDocument(kind=kind, object_id=pk, course_id=course_id, quiz_id=quiz_id,
+                                        question_id=question_id, user_id=getattr(instance, "user_id", None),
+                                        text=text))
+    SearchDocument.objects.bulk_create(documents, update_conflicts=True, unique_fields=["kind", "object_id"],
+                                       update_fields=["course", "quiz", "question", "user", "text"])
+    return len(documents)
+
+
+def rebuild_search_index(batch_size: int = 1000) -> int:
+    text_answers = Q(answer_text__gt="") | Q(admin_feedback__gt="") | Q(ai_feedback__gt="")
+    count = 0
+    with transaction.atomic():
+        SearchDocument.objects.all().delete()
+        for kind, model in MODELS.items():
+            objects = model.objects.filter(text_answers) if kind == SearchDocument.ANSWER else model.objects.all()
+            fields = ["pk", *TEXT_FIELDS[kind]]
+            if kind != SearchDocument.QUESTION:
+                fields.append("question_id")
+            if kind == SearchDocument.ANSWER:
+                fields.append("user_id")
+            batch = []
+            for instance in objects.only(*fields).iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) == batch_size:
+                    count += index_documents(kind, batch)
+                    batch = []
+            count += index_documents(kind, batch)
+        connection = connections[router.db_for_write(SearchDocument)]
+        if connection.vendor == "sqlite":
+            # Merges the index segments written batch by batch.
+            with connection.cursor() as cursor:
+                cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    return count
+
+
+def get_search_terms(query: str) -> list:
+    return re.findall(r"\w+", query)[:MAX_TERMS]
+
+
+class SearchResults:
+    # Lazy and sliceable, so a Paginator runs one count and one query for the requested page only.
+    # Only the newest SEARCH_MAX_RESULTS matches are ranked, which bounds the cost of very common terms.
+    def __init__(self, query: str, course_id: Optional[int] = None, kinds: Optional[Iterable] = None):
+        self.terms = get_search_terms(query)
+        self.filters, self.filter_params = [], []
+        if course_id:
+            self.filters.append("d.course_id = %s")
+            self.filter_params.append(course_id)
+        if kinds:
+            kinds = list(kinds)
+            self.filters.append(f"d.kind IN ({', '.join(['%s'] * len(kinds))})")
+            self.filter_params.extend(kinds)
+        self._count = None
+        self._first_id = None
+
+    def _match(self, vendor: str) -> tuple:
+        if vendor == "sqlite":
+            # Every term is a quoted prefix query, so user input can never be parsed as FTS5 syntax.
+            return (f"FROM {FTS_TABLE} JOIN quiz_searchdocument d ON d.id = {FTS_TABLE}.rowid",
+                    f"{FTS_TABLE}.rowid", f"{FTS_TABLE} MATCH %s", " ".join(f'"{x}"*' for x in self.terms))
+        if vendor == "postgresql":
+            return ("FROM quiz_searchdocument d", "d.id", "d.search_vector @@ to_tsquery('simple', %s)",
+                    " & ".join(f"{x}:*" for x in self.terms))
+        raise NotSupportedError(f"Full-text search is not available on {vendor}.")
+
+    def _page_query(self, vendor: str, limit: int, offset: int) -> tuple:
+        source, row_id, match, match_param = self._match(vendor)
+        where = " AND ".join([match, f"{row_id} >= %s", *self.filters])
+        params = [match_param, self._first_id, *self.filter_params, limit, offset]
+        if vendor == "sqlite":
+            return (f"SELECT d.id, snippet({FTS_TABLE}, 0, %s, %s, '…', {SNIPPET_TOKENS}) {source} WHERE {where} "
+                    f"ORDER BY {FTS_TABLE}.rank, d.id LIMIT %s OFFSET %s", [MARK_START, MARK_END, *params])
+        # The headline is only built for the rows of the page, not for every match.
+        return (f"SELECT id, ts_headline('simple', text, to_tsquery('simple', %s), %s) FROM ("
+                f"SELECT d.id, d.text, ts_rank(d.search_vector, to_tsquery('simple', %s)) AS rank {source} "
+                f"WHERE {where} ORDER BY rank DESC, d.id LIMIT %s OFFSET %s) page ORDER BY rank DESC, id",
+                [match_param, f'StartSel="{MARK_START}", StopSel="{MARK_END}", MaxFragments=2, '
+                              f'FragmentDelimiter=" … "', match_param, *params])
+
+    def count(self) -> int:
+        if self._count is None:
+            self._count, self._first_id = 0, 0
+            if self.terms:
+                connection = connections[router.db_for_read(SearchDocument)]
+                source, row_id, match, match_param = self._match(connection.vendor)
+                where = " AND ".join([match, *self.filters])
+                with connection.cursor() as cursor:
+                    cursor.execute(f"SELECT {row_id} {source} WHERE {where} ORDER BY {row_id} DESC LIMIT 1 OFFSET %s",
+                                   [match_param, *self.filter_params, settings.SEARCH_MAX_RESULTS - 1])
+                    row = cursor.fetchone()
+                    if row:
+                        self._count, self._first_id = settings.SEARCH_MAX_RESULTS, row[0]
+                    else:
+                        cursor.execute(f"SELECT COUNT(*) {source} WHERE {where}", [match_param, *self.filter_params])
+                        self._count = cursor.fetchone()[0]
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, item: slice) -> list:
+        if not isinstance(item, slice) or item.step:
+            raise TypeError("Search results can only be sliced.")
+        start, stop = item.start or 0, min(item.stop if item.stop is not None else self.count(), self.count())
+        if stop <= start:
+            return []
+        alias = router.db_for_read(SearchDocument)
+        connection = connections[alias]
+        with connection.cursor() as cursor:
+            cursor.execute(*self._page_query(connection.vendor, stop - start, start))
+            snippets = cursor.fetchall()
+        documents = (SearchDocument.objects.using(alias).select_related("course", "quiz", "question", "user")
+                     .in_bulk([x[0] for x in snippets]))
+        results = []
+        for pk, snippet in snippets:
+            # A document removed between the two queries is left out.
+            document = documents.get(pk)
+            if document is None:
+                continue
+            document.snippet = mark_safe(escape(snippet).replace(MARK_START, "<mark>").replace(MARK_END, "</mark>"))
+            results.append(document)
+        return results
+
@@ -1,8 +1,25 @@
 import random
 
-from django.db.models.signals import pre_save, post_init
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models import Q
+from django.db.models.signals import pre_save, post_init, post_save, pre_delete, post_delete
 from django.dispatch import receiver
-from .models import Option, UserAnswer
+
+from .ai_clients import evict_openai_clients
+from .cache import bump_content_version, delete_answer_keys, delete_media_access
+from .derivatives import schedule_derivatives
+from .leaderboard import add_course_score, get_course_id, get_question_score, rebuild_course_scores
+from .metrics import install_query_recorder
+from .models import Course, Quiz, Question, Option, UserAnswer, AttachmentDerivative, SearchDocument
+from .search import index_documents, remove_documents
+from .slow_queries import install_slow_query_logger
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    install_query_recorder(connection)
+    install_slow_query_logger(connection)
 
 
 @receiver(pre_save, sender=Option)
@@ -13,5 +30,212 @@ def question_added(sender, instance: Option, **kwargs):
 
 @receiver(pre_save, sender=UserAnswer)
 def set_attempt_number(sender, instance: UserAnswer, **kwargs):
+    if not instance._state.adding:
+        return
     instance.attempt_number = (UserAnswer.get_attempt_number_for_user_question(instance.user.pk, instance.question.pk)
                                + 1)
+
+
+@receiver(pre_save, sender=UserAnswer)
+def set_quiz_and_course(sender, instance: UserAnswer, **kwargs):
+    # evaluate_response sets them from the answer key already.
+    if not instance._state.adding or instance.course_id is not None:
+        return
+    instance.quiz_id, instance.course_id = (Question.objects.filter(pk=instance.question_id)
+                                            .values_list("quiz_id", "quiz__course_id").get())
+
+
+@receiver([pre_save, pre_delete], sender=UserAnswer)
+def remember_question_score(sender, instance: UserAnswer, **kwargs):
+    instance._course_id = instance.course_id if instance._state.adding else get_course_id(instance.question_id)
+    instance._previous_score = get_question_score(instance.user_id, instance.question_id)
+
+
+@receiver(post_save, sender=UserAnswer)
+def user_answer_score_saved(sender, instance: UserAnswer, created: bool, **kwargs):
+    delta = get_question_score(instance.user_id, instance.question_id) - instance._previous_score
+    # Every student who answered is ranked, even with no points yet.
+    if delta or created:
+        add_course_score(instance._course_id, instance.user_id, delta)
+
+
+@receiver(post_delete, sender=UserAnswer)
+def user_answer_score_deleted(sender, instance: UserAnswer, **kwargs):
+    # The score row may already be gone when the user is deleted, it must not be created again then.
+    add_course_score(instance._course_id, instance.user_id,
+                     get_question_score(instance.user_id, instance.question_id) - instance._previous_score,
+                     create=False)
+
+
+@receiver(pre_save, sender=Course)
+def course_api_key_changed(sender, instance: Course, **kwargs):
+    if instance._state.adding:
+        return
+    old_api_key = Course.objects.filter(pk=instance.pk).values_list("ai_api_key", flat=True).first()
+    if old_api_key and old_api_key != instance.ai_api_key:
+        transaction.on_commit(lambda: evict_openai_clients(old_api_key))
+
+
+@receiver(post_delete, sender=Course)
+def course_deleted(sender, instance: Course, **kwargs):
+    if instance.ai_api_key:
+        transaction.on_commit(lambda: evict_openai_clients(instance.ai_api_key))
+
+
+@receiver([post_save, post_delete], sender=Course)
+def course_content_changed(sender, instance: Course, **kwargs):
+    bump_content_version(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Quiz)
+def quiz_content_changed(sender, instance: Quiz, **kwargs):
+    bump_content_version(instance.course_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_content_changed(sender, instance: Question, **kwargs):
+    course_id = Quiz.objects.filter(pk=instance.quiz_id).values_list("course_id", flat=True).first()
+    if course_id:
+        bump_content_version(course_id)
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_content_changed(sender, instance: Option, **kwargs):
+    course_id = Question.objects.filter(pk=instance.question_id).values_list("quiz__course_id", flat=True).first()
+    if course_id:
+        bump_content_version(course_id)
+
+
+@receiver([post_save, post_delete], sender=Question)
+def question_answer_key_changed(sender, instance: Question, **kwargs):
+    delete_answer_keys([instance.pk])
+
+
+@receiver([post_save, post_delete], sender=Option)
+def option_answer_key_changed(sender, instance: Option, **kwargs):
+    delete_answer_keys([instance.question_id])
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_answer_keys_changed(sender, instance: Quiz, created: bool, **kwargs):
+    # The answer keys hold the course of the quiz.
+    if not created:
+        delete_answer_keys(Question.objects.filter(quiz=instance).values_list("pk", flat=True))
+
+
+ATTACHMENT_FIELDS = {Course: ["attachment"], Quiz: ["attachment"],
+                     Question: ["attachment_1", "attachment_2", "attachment_3"]}
+
+
+@receiver(pre_save, sender=Course)
+@receiver(pre_save, sender=Quiz)
+@receiver(pre_save, sender=Question)
+def remember_attachment_names(sender, instance, **kwargs):
+    # A replaced attachment must lose its cached access level as well.
+    instance._old_attachment_names = [] if instance._state.adding else list(
+        sender.objects.filter(pk=instance.pk).values_list(*ATTACHMENT_FIELDS[sender]).first() or [])
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_save, sender=Quiz)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Course)
+@receiver(post_delete, sender=Quiz)
+@receiver(post_delete, sender=Question)
+def attachment_access_changed(sender, instance, **kwargs):
+    names = [getattr(instance, x).name for x in ATTACHMENT_FIELDS[sender]]
+    delete_media_access(names + getattr(instance, "_old_attachment_names", []))
+
+
+@receiver(post_save, sender=Question)
+def question_attachments_saved(sender, instance: Question, **kwargs):
+    names = [x.name for x in [instance.attachment_1, instance.attachment_2, instance.attachment_3] if x]
+    if names:
+        transaction.on_commit(lambda: schedule_derivatives(names))
+
+
+@receiver(post_delete, sender=AttachmentDerivative)
+def attachment_derivative_deleted(sender, instance: AttachmentDerivative, **kwargs):
+    delete_media_access(instance.variants.values())
+
+
+@receiver(post_save, sender=AttachmentDerivative)
+def attachment_derivative_saved(sender, instance: AttachmentDerivative, **kwargs):
+    delete_media_access(instance.variants.values())
+    # Pages rendered before the derivatives existed link the original image, so they must not be reused.
+    for course_id in set(Question.objects.filter(Q(attachment_1=instance.source) | Q(attachment_2=instance.source)
+                                                 | Q(attachment_3=instance.source))
+                         .values_list("quiz__course_id", flat=True)):
+        bump_content_version(course_id)
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_answers_moved(sender, instance: Quiz, created: bool, **kwargs):
+    if created:
+        return
+    user_answers = UserAnswer.objects.filter(quiz=instance).exclude(course=instance.course_id)
+    old_course_ids = set(user_answers.values_list("course_id", flat=True))
+    if old_course_ids:
+        user_answers.update(course=instance.course_id)
+        rebuild_course_scores(old_course_ids | {instance.course_id})
+
+
+@receiver(post_save, sender=Question)
+def question_answers_moved(sender, instance: Question, created: bool, **kwargs):
+    if created:
+        return
+    user_answers = UserAnswer.objects.filter(question=instance).exclude(quiz=instance.quiz_id)
+    old_course_ids = set(user_answers.values_list("course_id", flat=True))
+    if old_course_ids:
+        course_id = instance.quiz.course_id
+        user_answers.update(quiz=instance.quiz_id, course=course_id)
+        rebuild_course_scores(old_course_ids | {course_id})
+
+
+@receiver(post_save, sender=Quiz)
+def quiz_search_documents_moved(sender, instance: Quiz, created: bool, **kwargs):
+    if not created:
+        SearchDocument.objects.filter(quiz=instance).exclude(course=instance.course_id).update(
+            course=instance.course_id)
+
+
+@receiver(post_save, sender=Question)
+def question_indexed(sender, instance: Question, **kwargs):
+    index_documents(SearchDocument.QUESTION, [instance])
+    # Options and answers follow the question when it is moved to another quiz.
+    SearchDocument.objects.filter(question=instance).exclude(quiz=instance.quiz_id).update(
+        quiz=instance.quiz_id, course=instance.quiz.course_id)
+
+
+@receiver(post_save, sender=Option)
+def option_indexed(sender, instance: Option, **kwargs):
+    index_documents(SearchDocument.OPTION, [instance])
+
+
+@receiver(post_save, sender=UserAnswer)
+def user_answer_indexed(sender, instance: UserAnswer, created: bool, **kwargs):
+    # Choice answers have no text until a coach writes feedback, so there is nothing to index or remove yet.
+    if created and not instance.answer_text:
+        return
+    index_documents(SearchDocument.ANSWER, [instance])
+
+
+@receiver(post_delete, sender=Option)
+def option_removed_from_index(sender, instance: Option, **kwargs):
+    remove_documents(SearchDocument.OPTION, [instance.pk])
+
+
+@receiver(post_delete, sender=Option)
+def option_removed_from_answers(sender, instance: Option, **kwargs):
+    # The id list has no foreign key which would drop it, as the old many-to-many table did. JSON containment is
+    # not available on SQLite, so the answers of the question are filtered here.
+    user_answers = [UserAnswer(pk=pk, selected_option_ids=[x for x in option_ids if x != instance.pk])
+                    for pk, option_ids in UserAnswer.objects.filter(question_id=instance.question_id)
+                    .exclude(selected_option_ids=[]).values_list("pk", "selected_option_ids")
+                    if instance.pk in option_ids]
+    UserAnswer.objects.bulk_update(user_answers, ["selected_option_ids"], batch_size=500)
+
+
+@receiver(post_delete, sender=UserAnswer)
+def user_answer_removed_from_index(sender, instance: UserAnswer, **kwargs):
+    remove_documents(SearchDocument.ANSWER, [instance.pk])
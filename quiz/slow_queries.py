@@ -0,0 +1,83 @@
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import sys
+import sysconfig
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Frames of these files wrap the query, they never issued it.
+WRAPPER_FILES = {__file__, os.path.join(os.path.dirname(__file__), "metrics.py")}
+LIBRARY_PATHS = tuple({sysconfig.get_paths()[x] for x in ["stdlib", "platstdlib", "purelib", "platlib"]})
+MAX_STATEMENT_LENGTH = 2000
+
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_ROW_LISTS = re.compile(r"\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    # Values and the lengths of IN lists and bulk inserts differ between calls of the same code, so they are dropped.
+    sql = sql.replace("%s", "?")
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _PLACEHOLDER_LISTS.sub("(...)", sql)
+    sql = _ROW_LISTS.sub("(...)", sql)
+    return _WHITESPACE.sub(" ", sql).strip()
+
+
+def get_fingerprint(statement: str) -> str:
+    return hashlib.sha1(statement.encode()).hexdigest()[:16]
+
+
+def get_call_site() -> str:
+    # The innermost frame of the app's own code, e.g. "quiz/models.py:95 Quiz.quiz_completed_questions_ids".
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if (filename not in WRAPPER_FILES and not filename.startswith(LIBRARY_PATHS)
+                and filename.startswith(str(settings.BASE_DIR))):
+            return (f"{os.path.relpath(filename, settings.BASE_DIR)}:{frame.f_lineno} "
+                    f"{frame.f_code.co_qualname}")
+        frame = frame.f_back
+    return "unknown"
+
+
+def log_slow_query(execute, sql, params, many, context):
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - start) * 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS and random.random() < settings.SLOW_QUERY_SAMPLE_RATE:
+            statement = normalize_sql(sql)[:MAX_STATEMENT_LENGTH]
+            call_site = get_call_site()
+            logger.warning("Slow query %.1f ms at %s", duration_ms, call_site, extra={
+                "duration_ms": round(duration_ms, 3), "fingerprint": get_fingerprint(statement),
+                "statement": statement, "call_site": call_site, "database": context["connection"].alias,
+                "many": many, "sample_rate": settings.SLOW_QUERY_SAMPLE_RATE})
+
+
+def install_slow_query_logger(connection):
+    if settings.SLOW_QUERY_LOG and log_slow_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_slow_query)
+
+
+class JsonFormatter(logging.Formatter):
+    # One JSON object per line, so the log can be read back by slow_query_report.
+    FIELDS = ["duration_ms", "fingerprint", "statement", "call_site", "database", "many", "sample_rate"]
+
+    def format(self, record):
+        entry = {"time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(), "pid": record.process,
+                 "message": record.getMessage()}
+        entry.update({x: getattr(record, x) for x in self.FIELDS if hasattr(record, x)})
+        return json.dumps(entry, ensure_ascii=False)
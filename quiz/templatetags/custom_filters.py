@@ -1,7 +1,5 @@
 import random
 
-import markdown
-
 from django import template
 from django.db.models import QuerySet
 
@@ -32,5 +30,7 @@ def filename(file_path) -> bool:
 
 @register.filter
 def convert_markdown_to_html(markdown_text: str) -> str:
+    import markdown
+
     md = markdown.Markdown(extensions=["fenced_code", "tables"])
     return md.convert(markdown_text)
@@ -1,69 +1,149 @@
+import hmac
+import json
+import logging
+import mimetypes
+import os
+from abc import ABC, abstractmethod
+from urllib.parse import quote
+
+from django.conf import settings
 from django.contrib.auth import logout
 from django.contrib.auth.models import User
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.contrib.auth.models import User
-from django.contrib.auth.views import PasswordChangeView, LogoutView
+from django.contrib.auth.views import PasswordChangeView, LogoutView, redirect_to_login
+from django.contrib import messages
 from django.contrib.messages.views import SuccessMessageMixin
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+from django.core.cache import cache
+from django.db import DatabaseError, connections
 from django.db.models import Max, Count, Case, When, IntegerField, Sum, Value
 from django.db.models.functions import Coalesce
-from django.shortcuts import render, redirect
+from django.http import Http404, HttpResponse, HttpResponseBadRequest, FileResponse, StreamingHttpResponse, \
+    JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse_lazy
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.decorators import method_decorator
+from django.utils.http import quote_etag, http_date, parse_http_date_safe
 from django.views import View
+from django.views.decorators.cache import never_cache
 from django.views.generic import DetailView, CreateView, DeleteView, UpdateView, TemplateView
 from django.views.generic.list import ListView
 
-from .forms import CourseForm, QuizForm, QuestionForm, UserForm, CustomUserCreationForm
+from .admission import admission_control, get_admission_stats
+from .answer_buffer import append_text_answer, build_user_answer, get_buffered_answers, get_buffered_stamp, \
+    merge_buffered_answers
+from .cache import get_content_version, make_request_etag
+from .clustering import cluster_answers, get_last_text_answers, grade_answers, request_cluster_ai_feedback
+from .db_pool import get_pool_stats
+from .db_routing import ReplicaReadMixin
+from .forms import CourseForm, QuizForm, QuestionForm, UserForm, CustomUserCreationForm, SearchForm, \
+    ClusterFeedbackForm
+from .leaderboard import get_top_scores
+from .media import MEDIA_PUBLIC, RangeFile, RangeNotSatisfiable, get_media_access, parse_range
+from .metrics import render_metrics
 from .models import Course, Question, Quiz, UserAnswer, ChatGPTLog
+from .search import SearchResults
 
+logger = logging.getLogger(__name__)
 
-class CourseListView(ListView):
+
+class ConditionalGetMixin(ABC):
+    # Subclasses return everything the rendered page depends on; None skips the conditional handling.
+    @abstractmethod
+    def _get_etag_parts(self):
+        pass
+
+    def get(self, request, *args, **kwargs):
+        etag_parts = self._get_etag_parts()
+        if etag_parts is None:
+            return super().get(request, *args, **kwargs)
+        etag = make_request_etag(request, self.__class__.__name__, etag_parts)
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response["ETag"] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
+class CourseListView(ReplicaReadMixin, ListView):
     model = Course
     context_object_name = 'courses'
     template_name = 'course_list.html'
 
 
-class QuizListView(LoginRequiredMixin, ListView):
+class QuizListView(ReplicaReadMixin, LoginRequiredMixin, ConditionalGetMixin, ListView):
     model = Quiz
     context_object_name = 'quizzes'
     template_name = 'quiz_list.html'
 
+    def _get_etag_parts(self):
+        course_id = self.kwargs["course_id"]
+        stamp_filters = {"course": course_id}
+        if not self.request.user.is_superuser:
+            # Superusers also see whether anybody answered a quiz, so their stamp covers all users.
+            stamp_filters["user"] = self.request.user
+        return [course_id, get_content_version(course_id), *UserAnswer.get_version_stamp(**stamp_filters)]
+
     def _get_course(self):
         return Course.objects.get(pk=self.kwargs["course_id"])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context["quiz_questions"] = self._get_course().get_quiz_question_counts(self.request.user)
-        context["quiz_completion"] = self._get_course().quiz_completion_info(self.request.user)
+        course = self._get_course()
+        context["course"] = course
+        context["quiz_questions"] = course.get_quiz_question_counts(self.request.user)
+        context["quiz_completion"] = course.quiz_completion_info(self.request.user)
         return context
 
     def get_queryset(self):
         return Quiz.objects.filter(course_id=self.kwargs['course_id'])
 
 
-class QuestionView(LoginRequiredMixin, DetailView):
+class QuestionView(ReplicaReadMixin, LoginRequiredMixin, ConditionalGetMixin, DetailView):
     model = Question
     template_name = 'question.html'
     context_object_name = 'question'
     pk_url_kwarg = 'question_id'
 
+    def _get_etag_parts(self):
+        question_id = self.kwargs["question_id"]
+        quiz_ids = Question.objects.filter(pk=question_id).values_list("quiz_id", "quiz__course_id").first()
+        if quiz_ids is None:
+            return None
+        quiz_id, course_id = quiz_ids
+        return [question_id, get_content_version(course_id),
+                *UserAnswer.get_version_stamp(user=self.request.user, quiz=quiz_id),
+                *get_buffered_stamp(self.request.user.pk)]
+
     def __update_context_question(self, context: dict) -> dict:
         question = self.get_object()
         attempts_remaining = question.max_attempts
         context.update({"quiz": self._quiz, "question": question, "next_question":
                         question.next_question(self.request.user),
                         "previous_question": question.previous_question(self.request.user),
-                        "attempts_remaining": attempts_remaining, "allow_answer": True, "continue": False})
+                        "attempts_remaining": attempts_remaining, "allow_answer": True, "continue": False,
+                        "content_version": get_content_version(question.quiz.course_id)})
 
     def __update_context_user_answer(self, context: dict, user_answer: UserAnswer):
         question = self.get_object()
+        context.update(self._get_user_answer_context(
+            question, UserAnswer.get_attempt_number_for_user_question(self.request.user.pk, question.pk),
+            user_answer, user_answer.chosen_options))
+
+    @staticmethod
+    def _get_user_answer_context(question: Question, attempt_number: int, user_answer: UserAnswer,
+                                 selected_options: list) -> dict:
+        context = {}
         if question.type in (Question.SHORT_TEXT, Question.LONG_TEXT):
             context.update({"feedback": [["", "Odpověď byla uložena"]], "continue": True, "allow_answer": False,
                             "continue": True})
         elif question.type in (Question.MULTIPLE_CHOICE_SINGLE_ANSWER, Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER):
-            attempts_remaining = ((question.max_attempts -
-                                  UserAnswer.get_attempt_number_for_user_question(self.request.user.pk, question.pk))
-                                  + 1)
+            attempts_remaining = question.max_attempts - attempt_number + 1
             context.update({"missing": user_answer.missing_answers, "attempts_remaining": attempts_remaining,
                             "allow_answer": attempts_remaining > 0, "continue": attempts_remaining == 0})
             if user_answer.points == 1:
@@ -72,13 +152,12 @@ class QuestionView(LoginRequiredMixin, DetailView):
             else:
                 context["feedback_type"] = "warning"
             if question.type == Question.MULTIPLE_CHOICE_SINGLE_ANSWER:
-                selected_options = user_answer.selected_options.all()
-                context["feedback"] = [[selected_options.first().text, selected_options.first().calculated_feedback]]
-                context["selected_option"] = selected_options.first()
+                context["feedback"] = [[selected_options[0].text, selected_options[0].calculated_feedback]]
+                context["selected_option"] = selected_options[0]
             elif question.type == Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER:
-                selected_options = user_answer.selected_options.all()
                 context["feedback"] = [[x.text, x.calculated_feedback] for x in selected_options]
                 context["selected_options_ids"] = [selected_option.id for selected_option in selected_options]
+        return context
 
     @property
     def _quiz(self):
@@ -89,24 +168,34 @@ class QuestionView(LoginRequiredMixin, DetailView):
         self.__update_context_question(context)
         user_answers = UserAnswer.get_user_answers_single_question(self.request.user.pk, self._quiz.pk,
                                                                    self.get_object().pk)
-        if user_answers.exists():
+        buffered_answer = get_buffered_answers(self.request.user.pk, [self.get_object().pk]).get(self.get_object().pk)
+        if buffered_answer:
+            self.__update_context_user_answer(context, build_user_answer(buffered_answer, self.request.user,
+                                                                         self.get_object()))
+        elif user_answers.exists():
             user_answer = user_answers.order_by("attempt_number").last()
             self.__update_context_user_answer(context, user_answer)
         return context
 
+    @method_decorator(admission_control)
     def post(self, request, *args, **kwargs):
         post_data = request.POST.copy()
         question_id = post_data['question_id']
         question = Question.objects.get(pk=int(question_id))
         context = {}
         self.__update_context_question(context)
-        if question.type in (Question.SHORT_TEXT, Question.LONG_TEXT):
+        if question.type in (Question.SHORT_TEXT, Question.LONG_TEXT) and settings.TEXT_ANSWER_WRITE_BEHIND:
+            entry = append_text_answer(self.request.user.pk, question.pk, post_data["answer_text"])
+            self.__update_context_user_answer(context, build_user_answer(entry, self.request.user, question))
+        elif question.type in (Question.SHORT_TEXT, Question.LONG_TEXT):
             user_answer = UserAnswer.objects.create(question=question, answer_text=post_data["answer_text"],
                                                     user=self.request.user)
-            user_answer.save()
             self.__update_context_user_answer(context, user_answer)
         elif question.type in (Question.MULTIPLE_CHOICE_SINGLE_ANSWER, Question.MULTIPLE_CHOICE_MULTIPLE_ANSWER):
-            user_answer: UserAnswer = question.evaluate_response(post_data, request.user)
+            try:
+                user_answer: UserAnswer = question.evaluate_response(post_data, request.user)
+            except (TypeError, ValueError):
+                return HttpResponseBadRequest("Neplatná odpověď.")
             self.__update_context_user_answer(context, user_answer)
         return render(request, self.template_name, context)
 
@@ -169,22 +258,33 @@ class QuestionAddView(UserPassesTestMixin, CreateView):
             return render(request, self.template_name, {'form': form})
 
 
-class UserTestReviewView(LoginRequiredMixin, ListView):
+class UserTestReviewView(ReplicaReadMixin, LoginRequiredMixin, ConditionalGetMixin, ListView):
     model = UserAnswer
     context_object_name = 'answers'
     template_name = 'user_quiz_review.html'
 
+    def _get_etag_parts(self):
+        quiz_id = self.kwargs["quiz_id"]
+        course_id = Quiz.objects.filter(pk=quiz_id).values_list("course_id", flat=True).first()
+        if course_id is None:
+            return None
+        return [quiz_id, get_content_version(course_id),
+                *UserAnswer.get_version_stamp(user=self.request.user, quiz=quiz_id),
+                *get_buffered_stamp(self.request.user.pk)]
+
     @property
     def _quiz(self):
         return Quiz.objects.get(id=self.kwargs['quiz_id'])
 
     def get_queryset(self):
         quiz = self._quiz
-        return [x for x in UserAnswer.objects.filter(question__quiz=quiz)
-                .filter(user=self.request.user).order_by("question__order") if x.is_last_attempt]
+        answers = [x for x in UserAnswer.objects.filter(quiz=quiz, user=self.request.user)
+                   .select_related("question").prefetch_related("question__option_set").order_by("question__order")
+                   if x.is_last_attempt]
+        return merge_buffered_answers(answers, self.request.user, quiz.pk)
 
 
-class AdminQuizReviewView(UserPassesTestMixin, ListView):
+class AdminQuizReviewView(ReplicaReadMixin, UserPassesTestMixin, ListView):
     model = Question
     context_object_name = 'questions'
     template_name = 'admin_quiz_review.html'
@@ -192,6 +292,18 @@ class AdminQuizReviewView(UserPassesTestMixin, ListView):
     def test_func(self):
         return self.request.user.is_superuser
 
+    @property
+    def _quiz(self):
+        return get_object_or_404(Quiz, pk=self.kwargs["quiz_id"])
+
+    def get_queryset(self):
+        return Question.objects.filter(quiz=self.kwargs["quiz_id"]).order_by("order")
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["content_version"] = get_content_version(self._quiz.course_id)
+        return context
+
 
 class QuestionDeleteView(UserPassesTestMixin, DeleteView):
     model = Question
@@ -235,7 +347,7 @@ class QuestionUpdateView(UserPassesTestMixin, UpdateView):
             return render(request, self.template_name, {'form': form})
 
 
-class QuizFeedbackBaseListView(UserPassesTestMixin, TemplateView):
+class QuizFeedbackBaseListView(ReplicaReadMixin, UserPassesTestMixin, TemplateView):
     def test_func(self):
         return self.request.user.is_superuser
 
@@ -247,7 +359,7 @@ class QuizFeedbackBaseListView(UserPassesTestMixin, TemplateView):
         user_answers_query = self._get_user_answers_query()
         context["user_quizzes"] = (self._get_user_answers_query()
                                    .filter(question__type__in=[Question.SHORT_TEXT, Question.LONG_TEXT])
-                                   .values('user__id', 'user__username', "question__quiz__id", "question__quiz__title")
+                                   .values('user__id', 'user__username', "quiz__id", "quiz__title")
                                    .annotate(total=Count('question__id', distinct=True),
                                              feedback_missing=Coalesce(
                                                  Sum(Case(
@@ -262,17 +374,98 @@ class QuizFeedbackListView(QuizFeedbackBaseListView):
     template_name = "admin_quiz_answers_feedback_list.html"
 
     def _get_user_answers_query(self):
-        return UserAnswer.objects.filter(question__quiz=self.kwargs["quiz_id"])
+        return UserAnswer.objects.filter(quiz=self.kwargs["quiz_id"])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["text_questions"] = Question.objects.filter(quiz=self.kwargs["quiz_id"],
+                                                            type__in=[Question.SHORT_TEXT, Question.LONG_TEXT])
+        return context
 
 
 class CourseFeedbackListView(QuizFeedbackBaseListView):
     template_name = "admin_course_answers_feedback_list.html"
 
     def _get_user_answers_query(self):
-        return UserAnswer.objects.filter(question__quiz__course=self.kwargs["course_id"])
+        return UserAnswer.objects.filter(course=self.kwargs["course_id"])
+
 
+class CourseLeaderboardView(ReplicaReadMixin, UserPassesTestMixin, TemplateView):
+    template_name = "course_leaderboard.html"
 
-class QuizFeedbackView(UserPassesTestMixin, ListView):
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["course"] = get_object_or_404(Course, pk=self.kwargs["course_id"])
+        context["scores"] = get_top_scores(self.kwargs["course_id"], settings.LEADERBOARD_SIZE)
+        return context
+
+
+class SearchView(ReplicaReadMixin, UserPassesTestMixin, ListView):
+    template_name = "search.html"
+    context_object_name = "results"
+    paginate_by = 20
+
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get_queryset(self):
+        self.form = SearchForm(self.request.GET or None)
+        if not self.form.is_valid():
+            return []
+        course, kind = self.form.cleaned_data["course"], self.form.cleaned_data["kind"]
+        return SearchResults(self.form.cleaned_data["q"], course.pk if course else None, [kind] if kind else None)
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["form"] = self.form
+        return context
+
+
+class AnswerClusterView(ReplicaReadMixin, UserPassesTestMixin, TemplateView):
+    template_name = "answer_clusters.html"
+
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def _get_question(self) -> Question:
+        return get_object_or_404(Question.objects.select_related("quiz"), pk=self.kwargs["question_id"],
+                                 type__in=[Question.SHORT_TEXT, Question.LONG_TEXT])
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context["question"] = self._get_question()
+        context["clusters"] = cluster_answers(context["question"])
+        return context
+
+    def post(self, request, *args, **kwargs):
+        question = self._get_question()
+        data = request.POST.copy()
+        data["points"] = data.get("points", "").replace(",", ".")
+        form = ClusterFeedbackForm(data, answer_ids=get_last_text_answers(question.pk).values_list("pk", flat=True))
+        if form.is_valid():
+            grade_answers(question, form.cleaned_data["answer_ids"], form.cleaned_data["feedback"],
+                          form.cleaned_data["points"], request.user)
+        else:
+            messages.error(request, "Hodnocení se nepodařilo uložit, odpovědi se mezitím změnily nebo jsou body "
+                                    "zadány chybně.")
+        return redirect("answer_clusters", question_id=question.pk)
+
+
+class AnswerClusterAIFeedbackView(UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get(self, request, *args, **kwargs):
+        question = get_object_or_404(Question.objects.select_related("quiz__course"), pk=self.kwargs["question_id"],
+                                     type__in=[Question.SHORT_TEXT, Question.LONG_TEXT], ai_feedback_enabled=True)
+        request_cluster_ai_feedback(question)
+        return redirect("answer_clusters", question_id=question.pk)
+
+
+class QuizFeedbackView(ReplicaReadMixin, UserPassesTestMixin, ListView):
     model = UserAnswer
     context_object_name = 'user_answers'
     template_name = 'admin_quiz_answers_feedback.html'
@@ -285,7 +478,7 @@ class QuizFeedbackView(UserPassesTestMixin, ListView):
         return self.request.user.is_superuser
 
     def get_queryset(self):
-        return UserAnswer.objects.filter(question__quiz=self.kwargs["quiz_id"], user__id=self.kwargs["user_id"],
+        return UserAnswer.objects.filter(quiz=self.kwargs["quiz_id"], user_id=self.kwargs["user_id"],
                                          question__type__in=[Question.SHORT_TEXT, Question.LONG_TEXT])
 
     def get_success_url(self):
@@ -359,6 +552,69 @@ class CourseDeleteView(UserPassesTestMixin, DeleteView):
         return self.request.user.is_superuser
 
 
+@method_decorator(never_cache, name="dispatch")
+class HealthView(View):
+    # Liveness: the worker answers requests, nothing else is checked.
+    def get(self, request, *args, **kwargs):
+        return HttpResponse("ok", content_type="text/plain")
+
+
+@method_decorator(never_cache, name="dispatch")
+class ReadinessView(View):
+    # Readiness: the worker can serve pages, so the databases and the cache must be reachable.
+    def get(self, request, *args, **kwargs):
+        checks = {}
+        for alias in settings.DATABASES:
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute("SELECT 1")
+                checks[f"database:{alias}"] = "ok"
+            except DatabaseError as error:
+                logger.warning("Readiness check of database %s failed: %s", alias, error)
+                checks[f"database:{alias}"] = "failed"
+        try:
+            cache.set("quiz:readyz", os.getpid(), 10)
+            checks["cache"] = "ok" if cache.get("quiz:readyz") == os.getpid() else "failed"
+        except Exception as error:
+            logger.warning("Readiness check of the cache failed: %s", error)
+            checks["cache"] = "failed"
+        ready = all(x == "ok" for x in checks.values())
+        return JsonResponse({"ready": ready, "checks": checks}, status=200 if ready else 503)
+
+
+class DatabasePoolStatsView(UserPassesTestMixin, View):
+    # Statistics of the connection pool of the worker process which happens to serve the request.
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse({"pid": os.getpid(), "pools": {x: get_pool_stats(x) for x in settings.DATABASES}})
+
+
+class AdmissionStatsView(UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(get_admission_stats())
+
+
+@method_decorator(never_cache, name="dispatch")
+class MetricsView(UserPassesTestMixin, View):
+    # Scraped by Prometheus with the METRICS_TOKEN bearer token; superusers can look at it in the browser.
+    raise_exception = True
+
+    def test_func(self):
+        authorization = self.request.headers.get("Authorization", "")
+        if settings.METRICS_TOKEN and hmac.compare_digest(authorization, f"Bearer {settings.METRICS_TOKEN}"):
+            return True
+        return self.request.user.is_superuser
+
+    def get(self, request, *args, **kwargs):
+        content, content_type = render_metrics()
+        return HttpResponse(content, content_type=content_type)
+
+
 class UserAnswerAIEvaluationView(UserPassesTestMixin, View):
     def test_func(self):
         return self.request.user.is_superuser
@@ -373,6 +629,38 @@ class UserAnswerAIEvaluationView(UserPassesTestMixin, View):
                                                                "user_id": self.kwargs["user_id"]}))
 
 
+class UserAnswerAIFeedbackStreamView(UserPassesTestMixin, View):
+    def test_func(self):
+        return self.request.user.is_superuser
+
+    @staticmethod
+    def _event(name: str, data: dict) -> str:
+        return f"event: {name}\ndata: {json.dumps(data)}\n\n"
+
+    def _stream_events(self, user_answers: list):
+        for user_answer in user_answers:
+            yield self._event("start", {"answer_id": user_answer.pk})
+            try:
+                for delta in ChatGPTLog.stream_request(user_answer):
+                    yield self._event("delta", {"answer_id": user_answer.pk, "text": delta})
+            except Exception:
+                logger.exception("Streaming AI feedback for answer %s failed", user_answer.pk)
+                yield self._event("failed", {"answer_id": user_answer.pk})
+                continue
+            yield self._event("done", {"answer_id": user_answer.pk})
+        yield self._event("end", {})
+
+    def get(self, request, *args, **kwargs):
+        user_answers = list(UserAnswer.get_user_answers_single_question(
+            self.kwargs["user_id"], self.kwargs["quiz_id"], question_type_list=[Question.SHORT_TEXT, Question.LONG_TEXT],
+            ai_feedback_enabled=True).select_related("question__quiz__course"))
+        response = StreamingHttpResponse(self._stream_events(user_answers), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        # Tell nginx not to buffer the stream, otherwise the tokens arrive all at once.
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
 class UserUpdateView(LoginRequiredMixin, UpdateView):
     model = User
     form_class = UserForm
@@ -404,3 +692,64 @@ class CustomLogoutView(View):
     def get(self, request, *args, **kwargs):
         logout(request)
         return redirect(reverse_lazy('course_list'))
+
+
+class MediaView(View):
+    def get(self, request, path, *args, **kwargs):
+        access = get_media_access(path)
+        if access is None:
+            raise Http404
+        if access != MEDIA_PUBLIC and not request.user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        try:
+            file_path = default_storage.path(path)
+            file_stat = os.stat(file_path)
+        except (SuspiciousFileOperation, FileNotFoundError, NotADirectoryError):
+            raise Http404
+        etag = quote_etag(f"{file_stat.st_size:x}-{file_stat.st_mtime_ns:x}")
+        last_modified = int(file_stat.st_mtime)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self._get_file_response(request, path, file_path, file_stat.st_size, etag, last_modified)
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        # patch_cache_control writes False values as "public=False", so only the directives which apply are passed.
+        directives = {"public": True} if access == MEDIA_PUBLIC else {"private": True}
+        if path.startswith("derivatives/"):
+            directives["immutable"] = True
+        patch_cache_control(response, max_age=settings.MEDIA_CACHE_MAX_AGE, **directives)
+        return response
+
+    @staticmethod
+    def _get_file_response(request, path, file_path, size, etag, last_modified):
+        content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if settings.MEDIA_SENDFILE == "x-accel-redirect":
+            # nginx serves the internal location itself, including byte ranges.
+            response = HttpResponse(content_type=content_type)
+            response["X-Accel-Redirect"] = settings.MEDIA_SENDFILE_PREFIX + quote(path)
+            return response
+        if settings.MEDIA_SENDFILE == "x-sendfile":
+            response = HttpResponse(content_type=content_type)
+            response["X-Sendfile"] = file_path
+            return response
+
+        if_range = request.headers.get("If-Range")
+        if if_range and if_range != etag and parse_http_date_safe(if_range) != last_modified:
+            byte_range = None
+        else:
+            try:
+                byte_range = parse_range(request.headers.get("Range"), size)
+            except RangeNotSatisfiable:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+        if byte_range is None:
+            response = FileResponse(open(file_path, "rb"), content_type=content_type)
+        else:
+            start, end = byte_range
+            response = FileResponse(RangeFile(open(file_path, "rb"), start, end - start + 1),
+                                    content_type=content_type, status=206)
+            response["Content-Length"] = str(end - start + 1)
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Accept-Ranges"] = "bytes"
+        return response
@@ -0,0 +1,50 @@
+import logging
+import os
+
+from django.db import connections
+from django.template import TemplateDoesNotExist, TemplateSyntaxError, engines
+from django.template.utils import get_app_template_dirs
+from django.urls import get_resolver
+
+from .cache import get_content_version
+from .models import Course
+
+logger = logging.getLogger(__name__)
+
+
+def _template_names(engine) -> set:
+    names = set()
+    for directory in [*engine.engine.dirs, *get_app_template_dirs("templates")]:
+        for root, _, files in os.walk(directory):
+            names.update(os.path.relpath(os.path.join(root, x), directory) for x in files if x.endswith(".html"))
+    return names
+
+
+def warm_up() -> dict:
+    # Meant to run in the gunicorn master before the workers are forked, so they share the warmed state.
+    resolver = get_resolver()
+    resolver.url_patterns
+    resolver.reverse_dict
+
+    templates = 0
+    for engine in engines.all():
+        if not hasattr(engine, "engine"):
+            continue
+        engine.engine.template_libraries
+        for name in _template_names(engine):
+            try:
+                engine.get_template(name)
+                templates += 1
+            except (TemplateDoesNotExist, TemplateSyntaxError) as error:
+                logger.warning("Template %s could not be compiled: %s", name, error)
+
+    course_ids = list(Course.objects.values_list("id", flat=True))
+    for course_id in course_ids:
+        get_content_version(course_id)
+
+    # Forked workers must never share the master's database connections or pools.
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+        if getattr(connection, "pool", None):
+            connection.close_pool()
+    return {"templates": templates, "courses": len(course_ids)}